@@ -4,6 +4,8 @@ from django.contrib import messages
 from .decorators import company_access_required
 from vendors.models import Vendor, Worker
 from requests.models import Request
+from requests.counters import company_stats
+from requests.rollups import vendor_status_durations
 from django.db.models import Q, Count
 
 
@@ -81,18 +83,22 @@ def vendor_dashboard(request):
         # جلب الطلبات المرتبطة بعمال هذا المورد فقط
         # نستثني المسودات (draft) لأن المورد لا يجب أن يراها حتى يتم إرسالها
         base_requests = Request.objects.filter(
-            worker__vendor__company=user_company
-        ).exclude(status='draft')
-        
-        # حساب الإحصائيات
+            vendor_company=user_company
+        ).exclude(status='draft').select_related('client_company', 'request_type')
+
+        # حساب الإحصائيات (من جدول العدادات باستعلام واحد بدلاً من عدة COUNT)
+        counters = company_stats(user_company)
+        by_status = counters['by_status']
         stats = {
             'workers_count': Worker.objects.filter(vendor__company=user_company).count(),
-            'total_incoming': base_requests.count(),
-            'new_requests': base_requests.filter(status='submitted').count(),
-            'in_progress': base_requests.filter(status='in_progress').count(),
-            'completed': base_requests.filter(status='completed').count(),
-            'returned_rejected': base_requests.filter(status__in=['returned', 'rejected']).count(),
-            'recent_requests': base_requests.order_by('-created_at')[:5]
+            'total_incoming': counters['total'],
+            'new_requests': by_status.get('submitted', 0),
+            'in_progress': by_status.get('in_progress', 0),
+            'completed': by_status.get('completed', 0),
+            'returned_rejected': by_status.get('returned', 0) + by_status.get('rejected', 0),
+            'recent_requests': base_requests.order_by('-created_at')[:5],
+            # متوسط مدد الحالات من جدول التجميع (manage.py rollup_request_durations)
+            'status_durations': vendor_status_durations(user_company),
         }
     else:
         stats = {}
@@ -115,6 +115,28 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# طريقة إرسال المرفقات بعد التحقق من الصلاحية:
+# django (مع Range و ETag) / nginx (X-Accel-Redirect) / sendfile (X-Sendfile)
+ATTACHMENT_SERVE_MODE = os.environ.get('ATTACHMENT_SERVE_MODE', 'django')
+# location داخلي في nginx يشير إلى MEDIA_ROOT (مع internal;)
+ATTACHMENT_ACCEL_PREFIX = os.environ.get('ATTACHMENT_ACCEL_PREFIX', '/protected-media/')
+
+# صيغة النسخ المصغرة للصور (WEBP / JPEG)
+IMAGE_DERIVATIVE_FORMAT = os.environ.get('IMAGE_DERIVATIVE_FORMAT', 'WEBP')
+# صور شركات التوريد: cloudinary (الحالي) / local (تخزين محلي مع نسخ مصغرة)
+AVATAR_STORAGE = os.environ.get('AVATAR_STORAGE', 'cloudinary')
+
+# المسودات التي لم تُعدّل منذ هذه المدة تُحذف عبر manage.py purge_stale_drafts
+DRAFT_EXPIRY_DAYS = int(os.environ.get('DRAFT_EXPIRY_DAYS', 30))
+
+# تخزين قيم الحقول الديناميكية: rows (صف لكل حقل في RequestFieldValue) / document (Request.field_data)
+# التحويل بين الطريقتين: manage.py migrate_field_storage
+REQUEST_FIELD_STORAGE = os.environ.get('REQUEST_FIELD_STORAGE', 'rows')
+
+# حقول choice التي تتجاوز خياراتها هذا العدد تُخزن خياراتها في جدول RequestFieldOption
+# وتُبحث من الـ Wizard بدلاً من إرسالها مع المخطط. بعد تغييره: manage.py sync_field_options
+CHOICE_OPTIONS_THRESHOLD = int(os.environ.get('CHOICE_OPTIONS_THRESHOLD', 100))
+
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'accounts.User'
@@ -125,3 +147,7 @@ cloudinary.config(
   api_key = os.environ.get('CLOUDINARY_API_KEY'),
   api_secret = os.environ.get('CLOUDINARY_API_SECRET')
 )
+
+
+# تنفيذ رسائل صندوق الصادر مباشرة بعد الـ commit (للتطوير المحلي بدون process_outbox)
+OUTBOX_EAGER = os.environ.get('OUTBOX_EAGER', 'False') == 'True'
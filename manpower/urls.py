@@ -16,6 +16,6 @@ urlpatterns = [
 ]
 
 
+# ملفات MEDIA (المرفقات) لا تُنشر مباشرة: تُحمّل عبر requests:attachment بعد التحقق من الصلاحية
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
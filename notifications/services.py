@@ -0,0 +1,51 @@
+"""
+خدمة توزيع الإشعارات (Fan-out)
+
+تُستخدم من أي مسار يحتاج لإشعار عدد كبير من المستخدمين:
+- يتم تحديد المستلمين باستعلام واحد مفلتر (is_active داخل SQL وليس في بايثون).
+- يتم إنشاء الإشعارات عبر bulk_create على دفعات.
+"""
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+
+from .models import Notification
+
+BATCH_SIZE = 500
+
+
+def active_company_staff(company_id):
+    """معرّفات المستخدمين النشطين في الجهة (استعلام واحد، بدون تحميل كائنات المستخدمين)."""
+    return (
+        get_user_model().objects
+        .filter(company_id=company_id, is_active=True)
+        .values_list("id", flat=True)
+        .order_by()
+    )
+
+
+def fan_out(recipient_ids, request_obj, title, message, batch_size=BATCH_SIZE):
+    """
+    إنشاء نفس الإشعار لكل المستلمين على دفعات، وإرجاع عدد الإشعارات المنشأة.
+    recipient_ids: أي iterable من المعرّفات (قائمة أو values_list).
+    """
+    if hasattr(recipient_ids, "iterator"):
+        recipient_ids = recipient_ids.iterator(chunk_size=batch_size)
+    ids = iter(recipient_ids)
+    request_id = getattr(request_obj, "pk", request_obj)
+
+    created = 0
+    while True:
+        batch = list(islice(ids, batch_size))
+        if not batch:
+            return created
+        Notification.objects.bulk_create([
+            Notification(recipient_id=uid, request_id=request_id, title=title, message=message)
+            for uid in batch
+        ])
+        created += len(batch)
+
+
+def notify_company_staff(company_id, request_obj, title, message, batch_size=BATCH_SIZE):
+    """إشعار جميع الموظفين النشطين في جهة معينة (مثل موظفي شركة التوريد)."""
+    return fan_out(active_company_staff(company_id), request_obj, title, message, batch_size)
@@ -1,3 +1,22 @@
 from django.test import TestCase
 
-# Create your tests here.
+from accounts.models import User, Company
+from notifications.models import Notification
+from notifications.services import notify_company_staff
+
+
+class FanOutTests(TestCase):
+    def setUp(self):
+        self.vendor_company = Company.objects.create(name="VendorCo", company_type="vendor")
+        User.objects.bulk_create([
+            User(username=f"staff{i}", company=self.vendor_company, is_active=(i % 10 != 0))
+            for i in range(200)
+        ])
+
+    def test_notifies_active_staff_in_batches(self):
+        # 1 recipients query + 4 INSERT batches of 50
+        with self.assertNumQueries(5):
+            created = notify_company_staff(self.vendor_company.id, None, "طلب جديد", "رسالة", batch_size=50)
+
+        self.assertEqual(created, 180)
+        self.assertFalse(Notification.objects.filter(recipient__is_active=False).exists())
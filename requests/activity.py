@@ -0,0 +1,138 @@
+"""
+سجل النشاط الموحد للطلب (تعليقات + حركات التايم لاين + مرفقات)
+
+الترتيب بالمفتاح (created_at, kind, id) تنازلياً، والترحيل بالمؤشر على نفس المفتاح:
+كل نوع يُجلب باستعلام واحد محدود (limit + 1) بعد المؤشر، ثم تُدمج القوائم المرتبة.
+- cursor: الأحداث الأقدم من المؤشر (تحميل المزيد).
+- since: الأحداث الأحدث من المؤشر (تحديث الصفحة المفتوحة بدون إعادة تحميلها).
+"""
+import heapq
+from datetime import datetime
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from .models import RequestAttachment, RequestComment, RequestTimeline
+from .pagination import InvalidCursor, decode_cursor, encode_cursor
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# رتبة كل نوع لكسر التعادل عند تساوي الوقت
+KINDS = {
+    "comment": (0, RequestComment, "author"),
+    "timeline": (1, RequestTimeline, "user"),
+    "attachment": (2, RequestAttachment, "uploaded_by"),
+}
+
+
+class ActivityEvent:
+    def __init__(self, kind, obj):
+        self.kind = kind
+        self.obj = obj
+        self.id = obj.pk
+        self.created_at = obj.created_at
+        self.user = getattr(obj, KINDS[kind][2])
+
+    @property
+    def key(self):
+        return (self.created_at, KINDS[self.kind][0], self.id)
+
+    @property
+    def cursor(self):
+        return encode_cursor([self.created_at, self.kind, self.id], "n")
+
+    def as_dict(self, viewer=None):
+        data = {
+            "kind": self.kind,
+            "id": self.id,
+            "created_at": self.created_at.isoformat(),
+            "user": self.user.get_full_name() if self.user else "",
+            "own": viewer is not None and self.user is not None and self.user.pk == viewer.pk,
+            "cursor": self.cursor,
+        }
+        obj = self.obj
+        if self.kind == "comment":
+            data["body"] = obj.body
+        elif self.kind == "timeline":
+            data.update(
+                action=obj.action_name, description=obj.description or "",
+                old_status=obj.old_status or "", new_status=obj.new_status or "",
+            )
+        else:
+            data.update(
+                filename=obj.filename(), description=obj.description,
+                url=obj.get_absolute_url(), is_image=obj.is_image(),
+                thumbnail_url=obj.thumbnail_url if obj.is_image() else "",
+            )
+        return data
+
+
+def parse_kinds(value):
+    if not value:
+        return tuple(KINDS)
+    kinds = tuple(k for k in value.split(",") if k in KINDS)
+    return kinds or tuple(KINDS)
+
+
+def parse_position(token):
+    """مؤشر -> (created_at, رتبة النوع, id). يرفع InvalidCursor عند عدم الصلاحية."""
+    values, _ = decode_cursor(token)
+    if len(values) != 3 or values[1] not in KINDS:
+        raise InvalidCursor(token)
+    created_at = parse_datetime(str(values[0]))
+    if not isinstance(created_at, datetime):
+        raise InvalidCursor(token)
+    try:
+        return created_at, KINDS[values[1]][0], int(values[2])
+    except (TypeError, ValueError):
+        raise InvalidCursor(token)
+
+
+def _condition(rank, position, older):
+    """شرط "قبل" (أو "بعد") الموضع بالمفتاح (created_at, rank, id) لنوع رتبته rank."""
+    created_at, position_rank, position_id = position
+    strict, loose = ("lt", "lte") if older else ("gt", "gte")
+    if rank == position_rank:
+        return Q(**{f"created_at__{strict}": created_at}) | Q(created_at=created_at, **{f"id__{strict}": position_id})
+    # الأنواع ذات الرتبة الأقل (في اتجاه القراءة) تشمل نفس الوقت
+    if (rank < position_rank) == older:
+        return Q(**{f"created_at__{loose}": created_at})
+    return Q(**{f"created_at__{strict}": created_at})
+
+
+def _events(req, kind, limit, position, older):
+    rank, model, user_field = KINDS[kind]
+    qs = model.objects.filter(request=req).select_related(user_field)
+    if position is not None:
+        qs = qs.filter(_condition(rank, position, older))
+    order = ("-created_at", "-id") if older else ("created_at", "id")
+    return [ActivityEvent(kind, obj) for obj in qs.order_by(*order)[:limit]]
+
+
+def feed(req, kinds=None, cursor=None, since=None, limit=PAGE_SIZE):
+    """
+    إرجاع dict: events (الأحدث أولاً)، has_more، next_cursor (للأقدم).
+    مع since: الأحداث الأحدث من المؤشر فقط (حتى limit)، ويكون has_more=True إذا بقي المزيد.
+    """
+    kinds = kinds or tuple(KINDS)
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    older = since is None
+    position = parse_position(since if since is not None else cursor) if (since or cursor) else None
+
+    per_kind = [_events(req, kind, limit + 1, position, older) for kind in kinds]
+    if older:
+        merged = heapq.merge(*per_kind, key=lambda e: e.key, reverse=True)
+    else:
+        merged = heapq.merge(*per_kind, key=lambda e: e.key)
+    events = [event for _, event in zip(range(limit + 1), merged)]
+
+    has_more = len(events) > limit
+    events = events[:limit]
+    if not older:
+        events.reverse()
+    return {
+        "events": events,
+        "has_more": has_more,
+        "next_cursor": events[-1].cursor if events and older else None,
+    }
@@ -2,11 +2,15 @@ from django.contrib import admin
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 
+from .counters import record_created, record_moved, tenant_key
+from .field_values import DOCUMENT, storage_mode
+from .search import refresh_document
 from .models import (
     RequestType,
     RequestField,
     Request,
     RequestFieldValue,
+    OutboxMessage,
 )
 
 
@@ -106,10 +110,19 @@ class RequestAdmin(admin.ModelAdmin):
         "updated_at",
         "closed_at",
         "closed_by",
+        "submitted_at",
+        "processing_started_at",
+        "returned_at",
+        "status_changed_at",
+        "field_data",
     )
 
     inlines = [RequestFieldValueInline]
 
+    def get_inlines(self, request, obj):
+        # في وضع document القيم في field_data (معروضة في معلومات النظام)
+        return [] if storage_mode() == DOCUMENT else super().get_inlines(request, obj)
+
     fieldsets = (
         ("بيانات الطلب", {
             "fields": (
@@ -133,11 +146,20 @@ class RequestAdmin(admin.ModelAdmin):
                 "closed_at",
             )
         }),
+        ("دورة حياة الطلب", {
+            "fields": (
+                "submitted_at",
+                "processing_started_at",
+                "returned_at",
+                "status_changed_at",
+            )
+        }),
         ("معلومات النظام", {
             "fields": (
                 "created_by",
                 "created_at",
                 "updated_at",
+                "field_data",
             )
         }),
     )
@@ -167,8 +189,29 @@ class RequestAdmin(admin.ModelAdmin):
                     "لا يمكن رفض الطلب بدون ذكر سبب الرفض."
                 )
 
+        if "status" in form.changed_data:
+            obj.status_changed_at = timezone.now()
+
+        # المفتاح القديم للعدادات قبل الحفظ (قد يتغير العامل أو الحالة)
+        old_key = None
+        if change and {"status", "worker"} & set(form.changed_data):
+            old_key = Request.objects.values_list(
+                "client_company_id", "vendor_company_id", "status"
+            ).get(pk=obj.pk)
+
         super().save_model(request, obj, form, change)
 
+        # إبقاء عدادات الحالات متزامنة مع تعديلات لوحة الإدارة
+        if not change:
+            record_created(obj)
+        elif old_key is not None:
+            record_moved(old_key, (*tenant_key(obj), obj.status))
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # بعد حفظ القيم الديناميكية (inline) يُعاد بناء نص البحث
+        refresh_document(form.instance)
+
     # =========================
     # Hide assigned_to completely
     # =========================
@@ -176,3 +219,27 @@ class RequestAdmin(admin.ModelAdmin):
         fields = super().get_fields(request, obj)
         return [f for f in fields if f != "assigned_to"]
 
+
+# =========================
+# Outbox
+# =========================
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "topic",
+        "status",
+        "attempts",
+        "available_at",
+        "created_at",
+        "processed_at",
+    )
+    list_filter = ("status", "topic")
+    ordering = ("-id",)
+    readonly_fields = (
+        "claimed_by",
+        "claimed_at",
+        "last_error",
+        "created_at",
+        "processed_at",
+    )
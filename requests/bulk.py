@@ -0,0 +1,356 @@
+"""
+إنشاء الطلبات بالجملة
+
+مصدران للبيانات:
+- اختيار عدة عمال من الـ Wizard بنفس نوع الطلب ونفس القيم.
+- رفع ملف CSV أو XLSX: صف لكل طلب، والأعمدة هي iqama_number و title و notes
+  ومفاتيح (أو عناوين) الحقول الديناميكية.
+
+الملف يُقرأ صفاً صفاً (بدون تحميله كاملاً في الذاكرة)، وتُعالج الصفوف على دفعات:
+استعلام واحد لجلب العمال، التحقق من القيم عبر المخطط (وخيارات القوائم الكبيرة باستعلام
+واحد للدفعة)، ثم bulk_create للطلبات والقيم في معاملة لكل دفعة. الصفوف الخاطئة لا توقف الاستيراد وتُرجع في تقرير الأخطاء.
+"""
+import csv
+import io
+import re
+import zipfile
+from collections import Counter
+from datetime import date, timedelta
+from itertools import islice
+from xml.etree.ElementTree import iterparse
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .counters import apply_deltas
+from .field_options import missing_options
+from .field_values import DOCUMENT, build_document, clean_field_values, new_field_values, storage_mode
+from .forms import worker_queryset
+from .models import Request, RequestFieldValue
+from .schema import INVALID_CHOICE_MESSAGE
+from .search import refresh_documents
+
+BATCH_SIZE = 500
+MAX_ROWS = 10000
+
+WORKER_COLUMN = "iqama_number"
+TITLE_COLUMN = "title"
+NOTES_COLUMN = "notes"
+
+_XLSX_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_CELL_COLUMN = re.compile(r"[A-Z]+")
+# التواريخ في Excel أرقام متسلسلة تبدأ من 1899-12-30، وآخرها 9999-12-31
+_EXCEL_EPOCH = date(1899, 12, 30)
+_EXCEL_MAX_SERIAL = 2958465
+
+
+class BulkImportError(ValueError):
+    """الملف غير مقروء أو لا يحتوي على الأعمدة المطلوبة."""
+
+
+class BulkResult:
+    def __init__(self):
+        self.created_ids = []
+        self.errors = []  # [(رقم الصف، [الأخطاء])]
+        self.rows = 0
+        self.truncated = False  # الملف تجاوز الحد الأقصى للصفوف
+        # خطأ في الملف بعد اعتماد دفعات سابقة: الاستيراد توقف عند stopped_at_row
+        self.file_error = None
+        self.stopped_at_row = None
+
+    @property
+    def created(self):
+        return len(self.created_ids)
+
+    def add_error(self, row_number, messages):
+        self.errors.append((row_number, list(messages)))
+
+
+# =========================
+# File Parsing
+# =========================
+def iter_csv_rows(fileobj):
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    try:
+        reader = csv.reader(text)
+        header = next(reader, None)
+        if not header:
+            raise BulkImportError("الملف فارغ.")
+        header = [h.strip() for h in header]
+        for row in reader:
+            if any(cell.strip() for cell in row):
+                yield dict(zip(header, row))
+    except UnicodeDecodeError:
+        raise BulkImportError("يجب أن يكون ملف CSV بترميز UTF-8.")
+    finally:
+        text.detach()
+
+
+def _column_index(ref):
+    letters = _CELL_COLUMN.match(ref).group()
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - 64
+    return index - 1
+
+
+def _shared_strings(archive):
+    if "xl/sharedStrings.xml" not in archive.namelist():
+        return []
+    strings = []
+    with archive.open("xl/sharedStrings.xml") as f:
+        for _, elem in iterparse(f):
+            if elem.tag == f"{_XLSX_NS}si":
+                strings.append("".join(t.text or "" for t in elem.iter(f"{_XLSX_NS}t")))
+                elem.clear()
+    return strings
+
+
+def _first_sheet_path(archive):
+    # أول ورقة في ترتيب المصنف (وليس بالضرورة sheet1.xml)
+    try:
+        with archive.open("xl/workbook.xml") as f:
+            sheet = next(e for _, e in iterparse(f) if e.tag == f"{_XLSX_NS}sheet")
+            rel_id = sheet.get(f"{_REL_NS}id")
+        with archive.open("xl/_rels/workbook.xml.rels") as f:
+            for _, rel in iterparse(f):
+                if rel.tag == f"{_PKG_REL_NS}Relationship" and rel.get("Id") == rel_id:
+                    target = rel.get("Target").lstrip("/")
+                    return target if target.startswith("xl/") else f"xl/{target}"
+    except (KeyError, StopIteration):
+        pass
+    return "xl/worksheets/sheet1.xml"
+
+
+class XlsxNumber(str):
+    """قيمة خلية رقمية من XLSX (قد تكون تاريخاً متسلسلاً)، لتمييزها عن النصوص وعن قيم CSV."""
+
+
+def _cell_value(cell, shared):
+    kind = cell.get("t")
+    if kind == "inlineStr":
+        return "".join(t.text or "" for t in cell.iter(f"{_XLSX_NS}t"))
+    value = cell.findtext(f"{_XLSX_NS}v")
+    if value is None:
+        return ""
+    if kind == "s":
+        return shared[int(value)]
+    if kind == "b":
+        return "true" if value == "1" else "false"
+    if kind in (None, "n"):
+        return XlsxNumber(value[:-2] if value.endswith(".0") else value)
+    return value
+
+
+def iter_xlsx_rows(fileobj):
+    """قراءة أول ورقة من ملف XLSX صفاً صفاً عبر iterparse (بدون openpyxl)."""
+    try:
+        archive = zipfile.ZipFile(fileobj)
+    except zipfile.BadZipFile:
+        raise BulkImportError("ملف XLSX غير صالح.")
+
+    with archive:
+        shared = _shared_strings(archive)
+        header = None
+        try:
+            sheet = archive.open(_first_sheet_path(archive))
+        except KeyError:
+            raise BulkImportError("ملف XLSX لا يحتوي على أوراق.")
+        with sheet:
+            for _, elem in iterparse(sheet):
+                if elem.tag != f"{_XLSX_NS}row":
+                    continue
+                values = {}
+                for cell in elem.iter(f"{_XLSX_NS}c"):
+                    ref = cell.get("r")
+                    index = _column_index(ref) if ref else len(values)
+                    values[index] = _cell_value(cell, shared)
+                elem.clear()
+                if not any(str(v).strip() for v in values.values()):
+                    continue
+                row = [values.get(i, "") for i in range(max(values) + 1)]
+                if header is None:
+                    header = [str(h).strip() for h in row]
+                    continue
+                yield dict(zip(header, row))
+        if header is None:
+            raise BulkImportError("الملف فارغ.")
+
+
+def iter_upload_rows(upload):
+    """الصفوف (رقم الصف في الملف، dict) من ملف مرفوع، بدءاً من 2 بعد صف العناوين."""
+    name = upload.name.lower()
+    if name.endswith(".csv"):
+        rows = iter_csv_rows(upload)
+    elif name.endswith(".xlsx"):
+        rows = iter_xlsx_rows(upload)
+    else:
+        raise BulkImportError("صيغة الملف غير مدعومة (CSV أو XLSX فقط).")
+    return enumerate(rows, start=2)
+
+
+# =========================
+# Validation & Insert
+# =========================
+def _column_map(schema, header):
+    """ربط أعمدة الملف بحقول المخطط بالمفتاح أو بالعنوان."""
+    by_label = {spec.label.strip(): spec for spec in schema.fields}
+    mapping = {}
+    for column in header:
+        spec = schema.by_key.get(column) or by_label.get(column)
+        if spec is not None:
+            mapping[column] = spec
+    return mapping
+
+
+def _excel_date(raw):
+    """تاريخ من رقم Excel المتسلسل؛ القيم خارج المدى تبقى كما هي ويرفضها التحقق كتاريخ غير صحيح."""
+    try:
+        serial = int(float(raw))
+    except (ValueError, OverflowError):
+        return raw
+    if not 1 <= serial <= _EXCEL_MAX_SERIAL:
+        return raw
+    return _EXCEL_EPOCH + timedelta(days=serial)
+
+
+def _field_data(row, mapping):
+    data = {}
+    for column, spec in mapping.items():
+        raw = row.get(column)
+        if raw is None:
+            continue
+        if spec.field_type == "date" and isinstance(raw, XlsxNumber):
+            raw = _excel_date(raw)
+        data[spec.input_name] = raw
+    return data
+
+
+def _error_messages(schema, error):
+    messages = []
+    for name, errors in error.message_dict.items():
+        spec = schema.by_id.get(int(name.split("_", 1)[1]))
+        label = spec.label if spec else name
+        messages.append(f"{label}: {' '.join(errors)}")
+    return messages
+
+
+def create_batch(user, schema, entries):
+    """
+    إدخال دفعة طلبات في معاملة واحدة.
+    entries: [(worker_id, vendor_company_id, title, notes, cleaned_values)]
+    ترجع ids الطلبات الجديدة.
+    """
+    if not entries:
+        return []
+    company = user.company
+    document = storage_mode() == DOCUMENT
+    with transaction.atomic():
+        requests = Request.objects.bulk_create([
+            Request(
+                request_type_id=schema.type_id, worker_id=worker_id, title=title, notes=notes,
+                created_by=user, status="draft", current_company=company,
+                client_company=company, vendor_company_id=vendor_company_id,
+                field_data=build_document(schema, cleaned) if document else {},
+            )
+            for worker_id, vendor_company_id, title, notes, cleaned in entries
+        ])
+
+        if not document:
+            values = []
+            for req, (*_, cleaned) in zip(requests, entries):
+                values += new_field_values(req, schema, cleaned)
+            RequestFieldValue.objects.bulk_create(values, batch_size=BATCH_SIZE)
+
+        apply_deltas(Counter((company.id, req.vendor_company_id, "draft") for req in requests))
+        ids = [req.pk for req in requests]
+        refresh_documents(ids)
+    return ids
+
+
+def create_for_workers(user, schema, workers, title, notes, cleaned, batch_size=BATCH_SIZE):
+    """نفس الطلب لعدة عمال (workers: queryset أو قائمة Worker محمّلة مع vendor)."""
+    result = BulkResult()
+    entries = [(w.pk, w.vendor.company_id, title, notes, cleaned) for w in workers]
+    result.rows = len(entries)
+    for start in range(0, len(entries), batch_size):
+        result.created_ids += create_batch(user, schema, entries[start:start + batch_size])
+    return result
+
+
+def import_rows(user, schema, rows, batch_size=BATCH_SIZE, max_rows=MAX_ROWS):
+    """
+    rows: (رقم الصف، dict) كما ترجعها iter_upload_rows.
+    كل دفعة: استعلام للعمال + إدخال الصحيح منها؛ الأخطاء تُجمع في BulkResult.errors.
+    BulkImportError قبل أول دفعة تُرفع، وبعدها تُسجل في file_error مع رقم الصف الذي توقف عنده الاستيراد.
+    """
+    result = BulkResult()
+    rows = iter(rows)
+    mapping = None
+    workers_qs = worker_queryset(user)
+    next_row = 2
+
+    while True:
+        try:
+            batch = list(islice(rows, min(batch_size, max_rows - result.rows)))
+        except BulkImportError as e:
+            if not result.rows:
+                raise
+            # الدفعات السابقة اعتُمدت: نُرجعها مع مكان التوقف بدلاً من إسقاطها
+            result.file_error = str(e)
+            result.stopped_at_row = next_row
+            return result
+        if not batch:
+            # الصفوف بعد الحد الأقصى لا تُستورد
+            result.truncated = next(rows, None) is not None
+            return result
+        if mapping is None:
+            header = list(batch[0][1])
+            if WORKER_COLUMN not in header:
+                raise BulkImportError(f"العمود {WORKER_COLUMN} مطلوب في الملف.")
+            mapping = _column_map(schema, header)
+
+        result.rows += len(batch)
+        next_row = batch[-1][0] + 1
+
+        iqamas = {str(row.get(WORKER_COLUMN, "")).strip() for _, row in batch}
+        workers = {
+            iqama: (worker_id, vendor_company_id)
+            for worker_id, iqama, vendor_company_id in workers_qs
+            .filter(iqama_number__in=iqamas)
+            .values_list("id", "iqama_number", "vendor__company_id")
+        }
+
+        checked = []
+        for row_number, row in batch:
+            iqama = str(row.get(WORKER_COLUMN, "")).strip()
+            errors = []
+            worker = workers.get(iqama)
+            if worker is None:
+                errors.append(f"رقم الإقامة غير موجود أو غير متاح: {iqama or '-'}")
+            cleaned = {}
+            try:
+                cleaned = clean_field_values(schema, _field_data(row, mapping), check_options=False)
+            except ValidationError as e:
+                errors += _error_messages(schema, e)
+            checked.append((row_number, row, worker, cleaned, errors))
+
+        # خيارات القوائم الكبيرة لكل صفوف الدفعة باستعلام واحد
+        missing = missing_options(schema, [cleaned for _, _, _, cleaned, _ in checked])
+        entries = []
+        for row_number, row, worker, cleaned, errors in checked:
+            errors += [
+                f"{schema.by_id[field_id].label}: {INVALID_CHOICE_MESSAGE}"
+                for field_id, value in cleaned.items() if (field_id, value) in missing
+            ]
+            if errors:
+                result.add_error(row_number, errors)
+                continue
+            title = str(row.get(TITLE_COLUMN) or "").strip()[:200]
+            notes = str(row.get(NOTES_COLUMN) or "").strip()
+            entries.append((*worker, title, notes, cleaned))
+
+        result.created_ids += create_batch(user, schema, entries)
+
@@ -0,0 +1,72 @@
+"""
+تحميل مرفقات طلب (أو مجموعة طلبات) كملف ZIP متدفق
+
+الملف يُبنى أثناء الإرسال عبر streaming.stream_zip: كل مرفق يُقرأ قطعة قطعة من التخزين
+ويُكتب مباشرة في الاستجابة، بدون ملفات مؤقتة وبدون تحميل أي ملف كاملاً في الذاكرة.
+الصيغ المضغوطة أصلاً (PDF / JPEG / PNG ...) تُخزن كما هي (STORED) لأن ضغطها مرة أخرى
+يستهلك المعالج بدون توفير يذكر.
+"""
+import os
+
+from .models import RequestAttachment
+from .streaming import stream_zip
+
+CHUNK_SIZE = 64 * 1024
+# الحد الأقصى للطلبات في ملف واحد من قائمة الطلبات
+MAX_REQUESTS = 200
+
+COMPRESSED_EXTENSIONS = frozenset({
+    ".pdf", ".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic",
+    ".zip", ".rar", ".7z", ".gz", ".docx", ".xlsx", ".pptx",
+    ".mp3", ".mp4", ".mov", ".m4a",
+})
+
+
+def is_compressed(filename):
+    return os.path.splitext(filename)[1].lower() in COMPRESSED_EXTENSIONS
+
+
+def _read_chunks(storage, name):
+    # الملف يُفتح عند بدء كتابة هذا المدخل فقط، فلا تبقى كل الملفات مفتوحة
+    with storage.open(name, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def _unique(name, used):
+    stem, ext = os.path.splitext(name)
+    candidate, n = name, 2
+    while candidate in used:
+        candidate = f"{stem} ({n}){ext}"
+        n += 1
+    used.add(candidate)
+    return candidate
+
+
+def bundle_attachments(request_ids, per_request_folder=True):
+    """
+    قائمة (الاسم داخل الملف، قطع البيانات، ضغط؟) لمرفقات الطلبات المحددة.
+    request_ids يجب أن تكون مصفاة مسبقاً حسب صلاحية المستخدم.
+    """
+    attachments = (
+        RequestAttachment.objects.filter(request_id__in=request_ids)
+        .only("id", "request_id", "file", "original_name")
+        .order_by("request_id", "created_at", "id")
+    )
+    entries = []
+    used = set()
+    for att in attachments:
+        storage = att.file.storage
+        if not att.file or not storage.exists(att.file.name):
+            continue
+        filename = att.filename()
+        name = f"request_{att.request_id}/{filename}" if per_request_folder else filename
+        entries.append((_unique(name, used), _read_chunks(storage, att.file.name), not is_compressed(filename)))
+    return entries
+
+
+def stream_bundle(request_ids, per_request_folder=True):
+    return stream_zip(bundle_attachments(request_ids, per_request_folder))
@@ -0,0 +1,125 @@
+"""
+تنظيف المسودات المهملة والملفات غير المستخدمة
+
+- purge_stale_drafts: حذف المسودات التي لم تُعدّل منذ مدة، على دفعات (معاملة لكل دفعة)
+  حتى لا تُقفل جداول الطلبات لفترة طويلة. الحذف يمر عبر الإشارات المعتادة (العدادات،
+  فهرس البحث، عدّاد مراجع الملفات).
+- sweep_orphan_files: مسح مجلدات MEDIA_ROOT وحذف الملفات التي لا يشير إليها أي مرفق أو صورة
+  (ملفات request_docs القديمة بعد حذف مرفقاتها، ملفات مؤقتة من رفع متوقف، نسخ مصغرة لصور حُذفت).
+  الملفات الأحدث من مهلة الأمان تُترك، لأن الملف يُكتب على القرص قبل اعتماد صف المرفق.
+"""
+import os
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from vendors.models import Vendor
+from .images import DERIVATIVE_DIR
+from .models import AttachmentBlob, Request, RequestAttachment
+from .storage import AVATAR_DIR, BLOB_DIR, LEGACY_DIR, attachment_storage, blob_digest, remove_empty_dirs
+
+BATCH_SIZE = 500
+DRAFT_MAX_AGE = timedelta(days=30)
+FILE_GRACE = timedelta(hours=1)
+
+
+class CleanupStats:
+    def __init__(self):
+        self.drafts = 0
+        self.attachments = 0
+        self.files = 0
+        self.bytes = 0
+        self.blob_rows = 0
+
+
+# =========================
+# Stale Drafts
+# =========================
+def stale_drafts(max_age=DRAFT_MAX_AGE):
+    return Request.objects.filter(status="draft", updated_at__lt=timezone.now() - max_age)
+
+
+def purge_stale_drafts(max_age=DRAFT_MAX_AGE, batch_size=BATCH_SIZE, dry_run=False, stats=None):
+    stats = stats or CleanupStats()
+    drafts = stale_drafts(max_age)
+    if dry_run:
+        stats.drafts += drafts.count()
+        stats.attachments += RequestAttachment.objects.filter(request__in=drafts).count()
+        return stats
+
+    while True:
+        ids = list(drafts.order_by("pk").values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            return stats
+        with transaction.atomic():
+            # إعادة التحقق داخل المعاملة: قد يكون الطلب أُرسل أو عُدّل منذ القراءة
+            batch = stale_drafts(max_age).filter(pk__in=ids)
+            stats.attachments += RequestAttachment.objects.filter(request__in=batch).count()
+            deleted = batch.delete()[1].get(Request._meta.label, 0)
+        stats.drafts += deleted
+        if deleted < len(ids):
+            # الباقي تغيّر أثناء التنفيذ؛ لا نعيد قراءته في نفس التشغيل
+            drafts = drafts.exclude(pk__in=ids)
+
+
+# =========================
+# Orphaned Files
+# =========================
+def _referenced_files():
+    names = set(
+        RequestAttachment.objects.exclude(file="").values_list("file", flat=True).iterator(chunk_size=BATCH_SIZE)
+    )
+    names |= set(Vendor.objects.exclude(avatar="").values_list("avatar", flat=True))
+    return names
+
+
+def _walk(root):
+    for current, _, files in os.walk(root):
+        for filename in files:
+            yield os.path.join(current, filename)
+
+
+def sweep_orphan_files(grace=FILE_GRACE, dry_run=False, stats=None):
+    """حذف الملفات غير المستخدمة من مجلدات المرفقات والصور ونسخها المصغرة."""
+    stats = stats or CleanupStats()
+    referenced = _referenced_files()
+    # النسخ المصغرة مرتبطة بـ hash الملف الأصلي (للملفات المخزنة حسب المحتوى)؛
+    # نسخ ملفات request_docs القديمة تُعتبر غير مستخدمة وتُولد مرة أخرى عند الحاجة
+    digests = {blob_digest(name) for name in referenced if name.startswith((f"{BLOB_DIR}/", f"{AVATAR_DIR}/"))}
+    cutoff = time.time() - grace.total_seconds()
+    location = attachment_storage.location
+
+    for directory in (BLOB_DIR, AVATAR_DIR, LEGACY_DIR, DERIVATIVE_DIR):
+        root = os.path.join(location, directory)
+        for path in _walk(root):
+            name = os.path.relpath(path, location).replace(os.sep, "/")
+            if directory == DERIVATIVE_DIR:
+                in_use = os.path.splitext(os.path.basename(name))[0] in digests
+            else:
+                in_use = name in referenced
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if in_use or stat.st_mtime > cutoff:
+                continue
+            stats.files += 1
+            stats.bytes += stat.st_size
+            if not dry_run:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        if not dry_run and os.path.isdir(root):
+            remove_empty_dirs(root)
+
+    # صفوف ملفات بدون مراجع (مثلاً بعد rebuild_refcounts). الصفوف التي ما زال لها مراجع لا تُحذف هنا
+    # حتى لا يختل العدّاد مع رفع متزامن؛ تصحيحها عبر storage.rebuild_refcounts
+    orphans = AttachmentBlob.objects.filter(ref_count=0)
+    if dry_run:
+        stats.blob_rows += orphans.count()
+    else:
+        stats.blob_rows += orphans.delete()[0]
+    return stats
@@ -0,0 +1,131 @@
+"""
+عدادات حالات الطلبات لكل جهة
+
+بدلاً من تنفيذ عدة استعلامات COUNT على جدول الطلبات في كل صفحة، يتم الاحتفاظ بجدول
+RequestStatusCounter محدثاً من مسارات الإنشاء وتغيير الحالة والحذف،
+وتُقرأ كل الإحصائيات باستعلام واحد مفهرس.
+"""
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import Request, RequestStatusCounter
+
+
+def tenant_key(req):
+    """(شركة العميل، شركة التوريد) للطلب."""
+    return req.client_company_id, req.vendor_company_id
+
+
+def apply_deltas(deltas):
+    """
+    تطبيق مجموعة تغييرات بالشكل {(client_company_id, vendor_company_id, status): delta}.
+    يجب استدعاؤها داخل نفس معاملة التغيير الأساسي.
+    """
+    for (client_id, vendor_id, status), delta in deltas.items():
+        if not delta or client_id is None or vendor_id is None:
+            continue
+        key = {"client_company_id": client_id, "vendor_company_id": vendor_id, "status": status}
+        updated = RequestStatusCounter.objects.filter(**key).update(count=F("count") + delta)
+        if updated:
+            continue
+        try:
+            with transaction.atomic():
+                RequestStatusCounter.objects.create(count=delta, **key)
+        except IntegrityError:
+            # أنشأته عملية أخرى في نفس اللحظة
+            RequestStatusCounter.objects.filter(**key).update(count=F("count") + delta)
+
+
+def record_created(req):
+    client_id, vendor_id = tenant_key(req)
+    apply_deltas({(client_id, vendor_id, req.status): 1})
+
+
+def record_deleted(req):
+    client_id, vendor_id = tenant_key(req)
+    apply_deltas({(client_id, vendor_id, req.status): -1})
+
+
+def record_transition(req, old_status, new_status):
+    client_id, vendor_id = tenant_key(req)
+    record_moved((client_id, vendor_id, old_status), (client_id, vendor_id, new_status))
+
+
+def record_moved(old_key, new_key):
+    """نقل طلب من مفتاح (client, vendor, status) إلى آخر."""
+    deltas = Counter({old_key: -1})
+    deltas[new_key] += 1
+    apply_deltas(deltas)
+
+
+def reassign_vendor(requests, vendor_company_id):
+    """
+    تحديث شركة التوريد لمجموعة طلبات (مثل نقل العامل لمورد آخر) مع نقل عداداتها.
+    ترجع عدد الطلبات المحدثة.
+    """
+    stale = requests.exclude(vendor_company_id=vendor_company_id)
+    with transaction.atomic():
+        rows = (
+            stale.values_list("client_company_id", "vendor_company_id", "status")
+            .annotate(n=Count("id"))
+            .order_by()
+        )
+        deltas = Counter()
+        for client_id, old_vendor_id, status, n in rows:
+            deltas[(client_id, old_vendor_id, status)] -= n
+            deltas[(client_id, vendor_company_id, status)] += n
+        updated = stale.update(vendor_company_id=vendor_company_id)
+        apply_deltas(deltas)
+    return updated
+
+
+def company_stats(company):
+    """
+    إحصائيات الطلبات للجهة (عميل أو مورد) من جدول العدادات باستعلام واحد.
+    ترجع: by_status (dict)، total، partners_count (عدد الجهات المقابلة).
+    المورد لا يرى المسودات.
+    """
+    if company.company_type == "client":
+        rows = RequestStatusCounter.objects.filter(client_company=company)
+        partner = "vendor_company_id"
+    else:
+        rows = RequestStatusCounter.objects.filter(vendor_company=company).exclude(status="draft")
+        partner = "client_company_id"
+
+    by_status = Counter()
+    partners = set()
+    for partner_id, status, count in rows.filter(count__gt=0).values_list(partner, "status", "count"):
+        by_status[status] += count
+        partners.add(partner_id)
+
+    return {
+        "by_status": by_status,
+        "total": sum(by_status.values()),
+        "partners_count": len(partners),
+    }
+
+
+def rebuild():
+    """إعادة بناء جدول العدادات بالكامل من جدول الطلبات."""
+    rows = (
+        Request.objects
+        .filter(client_company__isnull=False, vendor_company__isnull=False)
+        .values("client_company", "vendor_company", "status")
+        .annotate(n=Count("id"))
+        .order_by()
+    )
+    counters = [
+        RequestStatusCounter(
+            client_company_id=row["client_company"],
+            vendor_company_id=row["vendor_company"],
+            status=row["status"],
+            count=row["n"],
+        )
+        for row in rows
+    ]
+    with transaction.atomic():
+        RequestStatusCounter.objects.all().delete()
+        RequestStatusCounter.objects.bulk_create(counters, batch_size=1000)
+    return len(counters)
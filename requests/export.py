@@ -0,0 +1,83 @@
+"""
+تصدير الطلبات (CSV / XLSX) مع تحويل الحقول الديناميكية إلى أعمدة
+
+صف واحد لكل طلب، وكل حقل (RequestField.key) لنوع الطلب المختار في عمود مستقل.
+القراءة عبر iterator(chunk_size) (مؤشر من جهة الخادم في PostgreSQL) مع prefetch
+للقيم لكل دفعة (أو من Request.field_data مباشرة في وضع document)، فتبقى الاستعلامات ثابتة لكل دفعة والذاكرة ثابتة مهما كان عدد الصفوف.
+"""
+import datetime
+import json
+from decimal import Decimal
+
+from .field_values import read_field_values, with_field_values
+
+CHUNK_SIZE = 2000
+
+BASE_COLUMNS = (
+    ("id", "رقم الطلب"),
+    ("request_type", "نوع الطلب"),
+    ("status", "الحالة"),
+    ("title", "العنوان"),
+    ("worker", "العامل"),
+    ("iqama_number", "رقم الإقامة"),
+    ("client_company", "شركة العميل"),
+    ("vendor_company", "شركة التوريد"),
+    ("created_at", "تاريخ الإنشاء"),
+    ("closed_at", "تاريخ الإغلاق"),
+)
+
+
+def export_header(schema):
+    header = [label for _, label in BASE_COLUMNS]
+    if schema is not None:
+        header += [spec.key for spec in schema.fields]
+    return header
+
+
+def format_value(value):
+    """الأرقام والتواريخ تبقى بنوعها (خلايا رقمية في XLSX ولا تُعامل كمعادلات في CSV)، والباقي نص."""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "نعم" if value else "لا"
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    if isinstance(value, (int, float, Decimal, datetime.date)):
+        return value
+    return str(value)
+
+
+def _base_values(req):
+    return [
+        req.pk,
+        req.request_type.name,
+        req.get_status_display(),
+        req.title,
+        req.worker.full_name,
+        req.worker.iqama_number,
+        req.client_company.name if req.client_company_id else "",
+        req.vendor_company.name if req.vendor_company_id else "",
+        format_value(req.created_at),
+        format_value(req.closed_at),
+    ]
+
+
+def export_queryset(qs, schema):
+    """تجهيز الاستعلام: select_related للأعمدة الأساسية و prefetch لقيم حقول النوع المختار فقط."""
+    qs = qs.select_related("request_type", "worker", "client_company", "vendor_company")
+    if schema is not None:
+        qs = with_field_values(qs.filter(request_type_id=schema.type_id), field_ids=schema.by_id)
+    return qs
+
+
+def iter_export_rows(qs, schema, chunk_size=CHUNK_SIZE):
+    specs = schema.fields if schema is not None else ()
+    for req in export_queryset(qs, schema).iterator(chunk_size=chunk_size):
+        row = _base_values(req)
+        if specs:
+            values = read_field_values(req, schema)
+            for spec in specs:
+                row.append(format_value(values[spec.id]) if spec.id in values else "")
+        yield row
@@ -0,0 +1,108 @@
+"""
+خيارات حقول choice الكبيرة (RequestFieldOption)
+
+الحقل الذي تتجاوز خياراته CHOICE_OPTIONS_THRESHOLD (مدن، بنوك، مهن...) لا تُرسل خياراته
+مع المخطط في get-fields؛ تُخزن في جدول مفهرس على (field, value):
+- sync_options: مزامنة الجدول من RequestField.choices عند الحفظ (إضافة / تعديل / حذف الفرق فقط).
+- search_options: البحث ببداية النص أو القيمة مع ترحيل بالمؤشر (واجهة api/fields/<id>/options/).
+- missing_options: التحقق من القيم المرسلة باستعلام واحد لكل دفعة (وليس بمسح قائمة JSON).
+
+RequestField.choices يبقى مصدر الخيارات الذي يُعدّل من لوحة الإدارة.
+"""
+from django.db import transaction
+from django.db.models import Q
+
+from .models import RequestFieldOption
+from .schema import normalize_choices, uses_option_table
+
+BATCH_SIZE = 500
+MAX_VALUE_LENGTH = 255
+
+
+# =========================
+# Sync
+# =========================
+def sync_option_rows(option_model, field_id, pairs, batch_size=BATCH_SIZE):
+    """
+    جعل صفوف خيارات الحقل مطابقة لـ pairs [(value, label)] (أو حذفها كلها إذا كانت فارغة).
+    ترجع (created, updated, deleted).
+    """
+    wanted = {}
+    for order, (value, label) in enumerate(pairs):
+        # أول ظهور للقيمة هو المعتمد (نفس ترتيب القائمة في المخطط)
+        wanted.setdefault(value, (label[:MAX_VALUE_LENGTH], order))
+    current = {
+        value: (pk, label, order)
+        for pk, value, label, order in option_model.objects.filter(field_id=field_id)
+        .values_list("pk", "value", "label", "sort_order").iterator(chunk_size=batch_size)
+    }
+
+    stale = [pk for value, (pk, _, _) in current.items() if value not in wanted]
+    new = [
+        option_model(field_id=field_id, value=value, label=label, sort_order=order)
+        for value, (label, order) in wanted.items() if value not in current
+    ]
+    changed = [
+        option_model(pk=current[value][0], label=label, sort_order=order)
+        for value, (label, order) in wanted.items()
+        if value in current and current[value][1:] != (label, order)
+    ]
+    with transaction.atomic():
+        for start in range(0, len(stale), batch_size):
+            option_model.objects.filter(pk__in=stale[start:start + batch_size]).delete()
+        option_model.objects.bulk_create(new, batch_size=batch_size)
+        option_model.objects.bulk_update(changed, ["label", "sort_order"], batch_size=batch_size)
+    return len(new), len(changed), len(stale)
+
+
+def field_option_pairs(field):
+    """الخيارات التي يجب أن تكون في الجدول لهذا الحقل (فارغة للقوائم الصغيرة وللحقول غير choice)."""
+    if field.field_type != "choice":
+        return ()
+    pairs = normalize_choices(field.choices)
+    return pairs if uses_option_table(pairs) else ()
+
+
+def sync_options(field, batch_size=BATCH_SIZE):
+    return sync_option_rows(RequestFieldOption, field.pk, field_option_pairs(field), batch_size=batch_size)
+
+
+# =========================
+# Search
+# =========================
+def search_options(field_id, term=""):
+    """queryset الخيارات التي يبدأ نصها أو قيمتها بـ term (مرتبة حسب ترتيب العرض)."""
+    options = RequestFieldOption.objects.filter(field_id=field_id, field__is_active=True)
+    term = term.strip()
+    if term:
+        options = options.filter(Q(label__istartswith=term) | Q(value__istartswith=term))
+    return options
+
+
+# =========================
+# Validation
+# =========================
+def missing_options(schema, cleaned_items, batch_size=BATCH_SIZE):
+    """
+    أزواج (field_id, value) غير الموجودة في جدول الخيارات، لمجموعة قيم محوّلة
+    (cleaned_items: قائمة dict بالشكل {field_id: value} كما ترجعها clean_field_values).
+    استعلام واحد لكل batch_size قيمة مهما كان عدد الطلبات في الدفعة.
+    """
+    wanted = {
+        (field_id, value)
+        for cleaned in cleaned_items
+        for field_id, value in cleaned.items()
+        if value is not None and field_id in schema.by_id and schema.by_id[field_id].uses_options
+    }
+    if not wanted:
+        return set()
+    found = set()
+    pending = sorted(wanted)
+    for start in range(0, len(pending), batch_size):
+        chunk = pending[start:start + batch_size]
+        found.update(
+            RequestFieldOption.objects
+            .filter(field_id__in={field_id for field_id, _ in chunk}, value__in={value for _, value in chunk})
+            .values_list("field_id", "value")
+        )
+    return wanted - found
@@ -0,0 +1,224 @@
+"""
+الاستعلام عن الطلبات حسب قيم الحقول الديناميكية
+
+كل شرط على حقل يتحول إلى EXISTS على RequestFieldValue بعمود القيمة المناسب لنوعه
+(value_number / value_date / value_text / value_bool / value_json)، فيستخدم فهارس
+(field, القيمة) بدلاً من مسح جدول القيم:
+- number / date: exact، lt، lte، gt، gte (المدى = شرطان على نفس الحقل).
+- text / choice: exact، in.
+- bool: exact.
+- json: contains (الاحتواء @> مع فهرس GIN في PostgreSQL؛ وفي قواعد البيانات التي
+  لا تدعمه يُفحص في بايثون على قيم هذا الحقل فقط).
+
+في وضع document (Request.field_data) تُطبق نفس العمليات على مفاتيح المستند: التساوي
+والاحتواء بـ @> (فهرس GIN على المستند)، والمدى بعد تحويل القيمة لنوعها (Cast).
+
+في قائمة الطلبات: ?type=<id>&f.expiry_date__lt=2026-11-01&f.city=الرياض&sort=-f.expiry_date
+"""
+from collections import defaultdict
+
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import BooleanField, DateField, DecimalField, Exists, OuterRef, Subquery, TextField
+from django.db.models.fields.json import KeyTextTransform
+from django.db.models.functions import Cast, Substr
+
+from .field_values import DOCUMENT, document_key, encode_value, storage_mode
+from .models import TEXT_INDEX_LENGTH, Request, RequestFieldValue
+from .schema import COERCERS
+
+PARAM_PREFIX = "f."
+SORT_PREFIX = "f."
+
+RANGE_OPERATORS = frozenset({"exact", "lt", "lte", "gt", "gte"})
+OPERATORS = {
+    "number": RANGE_OPERATORS,
+    "date": RANGE_OPERATORS,
+    "text": frozenset({"exact", "in"}),
+    "choice": frozenset({"exact", "in"}),
+    "bool": frozenset({"exact"}),
+    "json": frozenset({"contains"}),
+}
+
+
+# نوع القيمة عند قراءتها من المستند للمقارنة والترتيب
+DOCUMENT_OUTPUT_FIELDS = {
+    "number": DecimalField(max_digits=12, decimal_places=2),
+    "date": DateField(),
+    "text": TextField(),
+    "choice": TextField(),
+    "bool": BooleanField(),
+}
+
+
+class FieldQueryError(ValueError):
+    pass
+
+
+# =========================
+# Parsing
+# =========================
+def parse_params(params, prefix=PARAM_PREFIX):
+    """[(key, op, raw)] من معاملات GET بالشكل f.<key> أو f.<key>__<op>."""
+    lookups = []
+    for name, raw in params.items():
+        if not name.startswith(prefix) or raw == "":
+            continue
+        key, _, op = name[len(prefix):].partition("__")
+        lookups.append((key, op or "exact", raw))
+    return lookups
+
+
+def _coerce(spec, op, raw):
+    try:
+        if op == "in":
+            values = [v.strip() for v in str(raw).split(",") if v.strip()]
+            return [COERCERS[spec.field_type](v) for v in values]
+        if op == "contains":
+            return COERCERS["json"](raw)
+        return COERCERS[spec.field_type](raw)
+    except ValidationError as e:
+        raise FieldQueryError(f"{spec.label}: {' '.join(e.messages)}")
+
+
+def _text_lookups(column, op, value):
+    # شرط البادئة يطابق فهرس (field, substr(value_text)) ثم التحقق من القيمة كاملة
+    if op == "in":
+        return {f"{column}__in": value}
+    return {"text_prefix": value[:TEXT_INDEX_LENGTH], column: value}
+
+
+# =========================
+# JSON Containment
+# =========================
+def json_contains(stored, needle):
+    """نفس دلالة @> في PostgreSQL: dict جزئي، وكل عنصر في القائمة موجود، أو قيمة مساوية."""
+    if isinstance(needle, dict):
+        return isinstance(stored, dict) and all(
+            k in stored and json_contains(stored[k], v) for k, v in needle.items()
+        )
+    if isinstance(needle, list):
+        if not isinstance(stored, list):
+            return False
+        return all(any(json_contains(item, n) for item in stored) for n in needle)
+    if isinstance(stored, list) and not isinstance(needle, (dict, list)):
+        # المصفوفة تحتوي على قيمة مفردة
+        return needle in stored
+    return stored == needle
+
+
+def _json_matches(spec, needle, using):
+    """ids الطلبات التي تحتوي قيمة الحقل على needle (بدون دعم contains في قاعدة البيانات)."""
+    values = (
+        RequestFieldValue.objects.using(using)
+        .filter(field_id=spec.id, value_json__isnull=False)
+        .values_list("request_id", "value_json")
+        .iterator(chunk_size=2000)
+    )
+    return [request_id for request_id, stored in values if json_contains(stored, needle)]
+
+
+def _json_document_matches(schema, spec, needle, using):
+    key = document_key(spec.id)
+    documents = (
+        Request.objects.using(using)
+        .filter(request_type_id=schema.type_id, field_data__has_key=key)
+        .values_list("pk", "field_data")
+        .iterator(chunk_size=2000)
+    )
+    return [pk for pk, document in documents if json_contains(document.get(key), needle)]
+
+
+# =========================
+# Document Mode
+# =========================
+def document_value(spec):
+    """قيمة الحقل من Request.field_data بنوعها (للمقارنة والترتيب)."""
+    return Cast(KeyTextTransform(document_key(spec.id), "field_data"), DOCUMENT_OUTPUT_FIELDS[spec.field_type])
+
+
+def _filter_document(queryset, schema, spec, op, value, supports_contains):
+    key = document_key(spec.id)
+    if op in ("exact", "contains") and supports_contains:
+        # الاحتواء @> يستخدم فهرس GIN على المستند
+        needle = value if op == "contains" else encode_value(spec.field_type, value)
+        return queryset.filter(field_data__contains={key: needle})
+    if op == "contains":
+        return queryset.filter(pk__in=_json_document_matches(schema, spec, value, queryset.db))
+    if op == "exact":
+        return queryset.filter(**{f"field_data__{key}": encode_value(spec.field_type, value)})
+    if op == "in":
+        return queryset.filter(**{f"field_data__{key}__in": [encode_value(spec.field_type, v) for v in value]})
+    alias = f"field_{spec.id}"
+    return queryset.alias(**{alias: document_value(spec)}).filter(**{f"{alias}__{op}": value})
+
+
+# =========================
+# Filtering / Sorting
+# =========================
+def filter_fields(queryset, schema, lookups):
+    """
+    تطبيق شروط الحقول على queryset للطلبات (من نوع schema).
+    الشروط على نفس الحقل تُجمع في EXISTS واحد. ترفع FieldQueryError للمفاتيح أو القيم غير الصحيحة.
+    """
+    grouped = defaultdict(dict)
+    pk_filters = []
+    supports_contains = connections[queryset.db].features.supports_json_field_contains
+    document = storage_mode() == DOCUMENT
+
+    for key, op, raw in lookups:
+        spec = schema.by_key.get(key)
+        if spec is None:
+            raise FieldQueryError(f"حقل غير معروف: {key}")
+        if op not in OPERATORS[spec.field_type]:
+            raise FieldQueryError(f"{spec.label}: عملية غير مدعومة ({op})")
+        value = _coerce(spec, op, raw)
+        column = spec.column
+
+        if document:
+            queryset = _filter_document(queryset, schema, spec, op, value, supports_contains)
+        elif spec.field_type in ("text", "choice"):
+            grouped[spec.id].update(_text_lookups(column, op, value))
+        elif op == "contains" and not supports_contains:
+            pk_filters.append(_json_matches(spec, value, queryset.db))
+        else:
+            grouped[spec.id][f"{column}__{op}" if op != "exact" else column] = value
+
+    for field_id, conditions in grouped.items():
+        values = RequestFieldValue.objects.filter(request=OuterRef("pk"), field_id=field_id)
+        if "text_prefix" in conditions:
+            values = values.alias(text_prefix=Substr("value_text", 1, TEXT_INDEX_LENGTH))
+        queryset = queryset.filter(Exists(values.filter(**conditions)))
+    for ids in pk_filters:
+        queryset = queryset.filter(pk__in=ids)
+    return queryset
+
+
+def order_by_field(queryset, schema, key, descending=False):
+    """
+    (queryset, ordering) للترتيب حسب قيمة حقل.
+    الطلبات التي لا قيمة لها في الحقل تُستبعد (الترحيل بالمؤشر لا يدعم NULL).
+    """
+    spec = schema.by_key.get(key)
+    if spec is None or spec.field_type == "json":
+        raise FieldQueryError(f"لا يمكن الترتيب حسب الحقل: {key}")
+    if storage_mode() == DOCUMENT:
+        value = document_value(spec)
+    else:
+        value = Subquery(
+            RequestFieldValue.objects.filter(request=OuterRef("pk"), field_id=spec.id).values(spec.column)[:1]
+        )
+    queryset = queryset.annotate(field_sort=value).filter(field_sort__isnull=False)
+    return queryset, ("-field_sort" if descending else "field_sort", "-id" if descending else "id")
+
+
+def parse_sort(raw):
+    """(key, descending) من sort=f.<key> أو sort=-f.<key>، أو None."""
+    if not raw:
+        return None
+    descending = raw.startswith("-")
+    raw = raw.lstrip("-")
+    if not raw.startswith(SORT_PREFIX):
+        return None
+    return raw[len(SORT_PREFIX):], descending
+
@@ -0,0 +1,335 @@
+"""
+محرك قيم الحقول الديناميكية (كتابة وقراءة)
+
+طريقتا تخزين حسب REQUEST_FIELD_STORAGE:
+- rows (الافتراضي): صف RequestFieldValue لكل حقل، بعمود القيمة المناسب لنوعه.
+- document: كل قيم الطلب في Request.field_data كمستند JSON واحد {"f<field_id>": قيمة}
+  (الأرقام أرقام JSON والتواريخ بصيغة ISO)، فالقراءة بدون join مع جدول القيم،
+  مع فهرس GIN على المستند في PostgreSQL.
+
+- clean_field_values: يحوّل كل قيم field_<id> المرسلة في مرور واحد اعتماداً على المخطط،
+  مع التحقق من خيارات القوائم الكبيرة باستعلام واحد (field_options.missing_options).
+- save_field_values: يحفظ القيم دفعة واحدة (bulk_create / bulk_update، أو تحديث المستند)،
+  فيبقى عدد الاستعلامات ثابتاً مهما زاد عدد الحقول.
+- with_field_values / read_field_values: واجهة القراءة، بنفس النتيجة في الطريقتين.
+- rows_to_documents / documents_to_rows: التحويل بين الطريقتين (أمر migrate_field_storage).
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
+from django.utils.dateparse import parse_date
+
+from .field_options import missing_options
+from .models import Request, RequestField, RequestFieldValue
+from .schema import INVALID_CHOICE_MESSAGE, VALUE_COLUMNS
+
+VALUE_FIELDS = ("value_text", "value_number", "value_date", "value_bool", "value_json")
+
+ROWS = "rows"
+DOCUMENT = "document"
+BATCH_SIZE = 500
+
+
+def storage_mode():
+    return DOCUMENT if getattr(settings, "REQUEST_FIELD_STORAGE", ROWS) == DOCUMENT else ROWS
+
+
+# =========================
+# Document Encoding
+# =========================
+def document_key(field_id):
+    # مفتاح نصي غير رقمي: المفاتيح الرقمية تُفسَّر كفهرس مصفوفة في استعلامات JSON
+    return f"f{field_id}"
+
+
+def field_id_of(key):
+    key = str(key)
+    return int(key[1:]) if key[:1] == "f" and key[1:].isdigit() else None
+
+
+def encode_value(field_type, value):
+    """القيمة بعد التحويل -> قيمة JSON في المستند."""
+    if value is None:
+        return None
+    if field_type == "number":
+        # رقم JSON (وليس نصاً) حتى تعمل المقارنة والترتيب داخل المستند
+        return int(value) if value == value.to_integral_value() else float(value)
+    if field_type == "date":
+        return value.isoformat()
+    return value
+
+
+def decode_value(field_type, raw):
+    if raw is None:
+        return None
+    if field_type == "number":
+        return Decimal(str(raw)).quantize(Decimal("0.01"))
+    if field_type == "date":
+        return parse_date(raw)
+    return raw
+
+
+def build_document(schema, cleaned, document=None):
+    """دمج القيم المحوّلة في مستند (القيمة None تحذف الحقل)."""
+    document = dict(document or {})
+    for field_id, value in cleaned.items():
+        if value is None:
+            document.pop(document_key(field_id), None)
+        else:
+            document[document_key(field_id)] = encode_value(schema.by_id[field_id].field_type, value)
+    return document
+
+
+def validate_document(schema, document):
+    """ترفع ValidationError إذا احتوى المستند على حقل ليس في المخطط أو قيمة بغير صيغتها المخزنة."""
+    if not isinstance(document, dict):
+        raise ValidationError({"field_data": "بيانات الحقول يجب أن تكون كائن JSON."})
+    errors = []
+    for key, raw in document.items():
+        spec = schema.by_id.get(field_id_of(key))
+        if spec is None:
+            errors.append(f"حقل غير معروف: {key}")
+            continue
+        try:
+            if encode_value(spec.field_type, spec.coerce(raw)) != raw:
+                raise ValidationError("صيغة القيمة غير صحيحة.")
+        except ValidationError as e:
+            errors.append(f"{spec.label}: {' '.join(e.messages)}")
+    values = {field_id_of(key): raw for key, raw in document.items()}
+    for field_id, _ in missing_options(schema, [values]):
+        errors.append(f"{schema.by_id[field_id].label}: {INVALID_CHOICE_MESSAGE}")
+    if errors:
+        raise ValidationError({"field_data": errors})
+
+
+def clean_field_values(schema, data, partial=False, check_options=True):
+    """
+    إرجاع dict بالشكل {field_id: value} حيث value هي القيمة بعد التحويل،
+    أو None إذا أرسل الحقل فارغاً (لمسح القيمة).
+
+    partial=True (عند إعادة الإرسال): الحقول غير المرسلة تبقى كما هي ولا يُطبق عليها شرط الإلزام.
+    check_options=False: بدون التحقق من خيارات الجدول (الاستيراد يتحقق منها لكل دفعة صفوف).
+    ترفع ValidationError بقاموس أخطاء مفاتيحه أسماء المدخلات field_<id>.
+    """
+    cleaned = {}
+    errors = {}
+
+    for spec in schema.fields:
+        name = spec.input_name
+        if name not in data:
+            if not partial and spec.is_required:
+                errors[name] = ["هذا الحقل إلزامي."]
+            continue
+
+        raw = data.get(name)
+        if spec.is_empty(raw):
+            if spec.is_required:
+                errors[name] = ["هذا الحقل إلزامي."]
+            else:
+                cleaned[spec.id] = None
+            continue
+
+        try:
+            cleaned[spec.id] = spec.coerce(raw)
+        except ValidationError as e:
+            errors[name] = e.messages
+
+    if check_options:
+        for field_id, _ in missing_options(schema, [cleaned]):
+            errors[schema.by_id[field_id].input_name] = [INVALID_CHOICE_MESSAGE]
+
+    if errors:
+        raise ValidationError(errors)
+    return cleaned
+
+
+def _row_value(fv, field_type):
+    column = VALUE_COLUMNS.get(field_type)
+    if column is not None:
+        return getattr(fv, column)
+    # حقل بدون نوع معروف: أول عمود فيه قيمة
+    return next((getattr(fv, c) for c in VALUE_FIELDS if getattr(fv, c) is not None), None)
+
+
+def _apply(fv, spec, value):
+    for column in VALUE_FIELDS:
+        setattr(fv, column, None)
+    setattr(fv, VALUE_COLUMNS[spec.field_type], value)
+
+
+def new_field_values(request_obj, schema, cleaned):
+    """صفوف RequestFieldValue جديدة (غير محفوظة) لطلب جديد، تُحفظ بـ bulk_create."""
+    values = []
+    for field_id, value in cleaned.items():
+        if value is None:
+            continue
+        fv = RequestFieldValue(request=request_obj, field_id=field_id)
+        _apply(fv, schema.by_id[field_id], value)
+        values.append(fv)
+    return values
+
+
+def save_field_values(request_obj, schema, cleaned, created=False):
+    """
+    حفظ القيم المحوّلة دفعة واحدة.
+    created=True يعني أن الطلب جديد، فلا حاجة لقراءة القيم الموجودة (استعلام واحد فقط للإدخال).
+    """
+    if not cleaned:
+        return
+
+    if storage_mode() == DOCUMENT:
+        with transaction.atomic():
+            current = {}
+            if not created:
+                current = (
+                    Request.objects.select_for_update()
+                    .values_list("field_data", flat=True).get(pk=request_obj.pk)
+                )
+            request_obj.field_data = build_document(schema, cleaned, current)
+            Request.objects.filter(pk=request_obj.pk).update(field_data=request_obj.field_data)
+        return
+
+    with transaction.atomic():
+        existing = {}
+        if not created:
+            existing = {
+                fv.field_id: fv
+                for fv in RequestFieldValue.objects.filter(
+                    request=request_obj, field_id__in=list(cleaned)
+                )
+            }
+
+        to_create = []
+        to_update = []
+        for field_id, value in cleaned.items():
+            spec = schema.by_id[field_id]
+            fv = existing.get(field_id)
+            if fv is None:
+                if value is None:
+                    continue
+                fv = RequestFieldValue(request=request_obj, field_id=field_id)
+                _apply(fv, spec, value)
+                to_create.append(fv)
+            else:
+                _apply(fv, spec, value)
+                to_update.append(fv)
+
+        if to_create:
+            RequestFieldValue.objects.bulk_create(to_create)
+        if to_update:
+            RequestFieldValue.objects.bulk_update(to_update, VALUE_FIELDS)
+
+
+# =========================
+# Reading
+# =========================
+def with_field_values(qs, field_ids=None):
+    """تجهيز queryset الطلبات لـ read_field_values (prefetch للصفوف؛ المستند محمّل مع الطلب)."""
+    if storage_mode() == DOCUMENT:
+        return qs
+    values = RequestFieldValue.objects.order_by("id")
+    if field_ids is not None:
+        values = values.filter(field_id__in=list(field_ids))
+    return qs.prefetch_related(Prefetch("field_values", queryset=values))
+
+
+def prefetch_field_values(requests):
+    """مثل with_field_values لطلبات محمّلة مسبقاً."""
+    if storage_mode() == ROWS:
+        prefetch_related_objects(list(requests), Prefetch("field_values", queryset=RequestFieldValue.objects.order_by("id")))
+
+
+def read_field_values(request_obj, schema):
+    """{field_id: القيمة} لحقول المخطط التي لها قيمة في الطلب."""
+    values = {}
+    if schema is None:
+        return values
+    if storage_mode() == DOCUMENT:
+        for key, raw in (request_obj.field_data or {}).items():
+            spec = schema.by_id.get(field_id_of(key))
+            if spec is not None and raw is not None:
+                values[spec.id] = decode_value(spec.field_type, raw)
+        return values
+    for fv in request_obj.field_values.all():
+        spec = schema.by_id.get(fv.field_id)
+        if spec is None:
+            continue
+        value = _row_value(fv, spec.field_type)
+        if value is not None:
+            values[spec.id] = value
+    return values
+
+
+def read_field_items(request_obj, schema):
+    """[(FieldSpec، القيمة)] بترتيب حقول المخطط (للعرض)."""
+    values = read_field_values(request_obj, schema)
+    return [(spec, values[spec.id]) for spec in schema.fields if spec.id in values] if schema else []
+
+
+# =========================
+# Storage Migration
+# =========================
+def _rows_batches(qs, batch_size):
+    last_id = 0
+    while True:
+        ids = list(qs.filter(pk__gt=last_id).order_by("pk").values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            return
+        last_id = ids[-1]
+        yield ids
+
+
+def rows_to_documents(batch_size=BATCH_SIZE, clear_source=False):
+    """
+    بناء Request.field_data من صفوف RequestFieldValue (الصفوف هي المرجع؛ المستند يُستبدل).
+    ترجع (عدد الطلبات، عدد القيم).
+    """
+    requests_done = values_done = 0
+    with_rows = Request.objects.filter(field_values__isnull=False).distinct()
+    for ids in _rows_batches(with_rows, batch_size):
+        documents = {pk: {} for pk in ids}
+        rows = RequestFieldValue.objects.filter(request_id__in=ids).select_related("field")
+        for fv in rows:
+            value = _row_value(fv, fv.field.field_type)
+            if value is not None:
+                documents[fv.request_id][document_key(fv.field_id)] = encode_value(fv.field.field_type, value)
+                values_done += 1
+        with transaction.atomic():
+            Request.objects.bulk_update(
+                [Request(pk=pk, field_data=document) for pk, document in documents.items()], ["field_data"],
+            )
+            if clear_source:
+                RequestFieldValue.objects.filter(request_id__in=ids).delete()
+        requests_done += len(ids)
+    return requests_done, values_done
+
+
+def documents_to_rows(batch_size=BATCH_SIZE, clear_source=False):
+    """
+    إنشاء صفوف RequestFieldValue من Request.field_data (تُستبدل صفوف هذه الطلبات).
+    القيم لحقول محذوفة تُتجاهل. ترجع (عدد الطلبات، عدد القيم).
+    """
+    requests_done = values_done = 0
+    field_types = dict(RequestField.objects.values_list("id", "field_type"))
+    for ids in _rows_batches(Request.objects.exclude(field_data={}), batch_size):
+        rows = []
+        for pk, document in Request.objects.filter(pk__in=ids).values_list("pk", "field_data"):
+            for key, raw in (document or {}).items():
+                field_id = field_id_of(key)
+                field_type = field_types.get(field_id)
+                if field_type is None or raw is None:
+                    continue
+                fv = RequestFieldValue(request_id=pk, field_id=field_id)
+                setattr(fv, VALUE_COLUMNS[field_type], decode_value(field_type, raw))
+                rows.append(fv)
+        with transaction.atomic():
+            RequestFieldValue.objects.filter(request_id__in=ids).delete()
+            RequestFieldValue.objects.bulk_create(rows, batch_size=batch_size)
+            if clear_source:
+                Request.objects.filter(pk__in=ids).update(field_data={})
+        requests_done += len(ids)
+        values_done += len(rows)
+    return requests_done, values_done
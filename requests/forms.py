@@ -1,7 +1,25 @@
 from django import forms
-from .models import Request, RequestComment, RequestAttachment
+from .models import Request, RequestType, RequestComment, RequestAttachment
 from vendors.models import Worker
 
+def worker_queryset(user):
+    """العمال الذين يمكن للمستخدم إنشاء طلبات لهم."""
+    if user and hasattr(user, 'company') and user.company:
+        if user.company.company_type == 'client':
+            # الحالة الأولى: المستخدم هو "عميل"
+            # يجب أن يرى فقط العمال التابعين للموردين المتعاقد معهم
+            return Worker.objects.filter(vendor__clients=user.company)
+            # ملاحظة: إذا أردت تفعيل شرط الحالة لاحقاً تأكد من الاسم الدقيق في قاعدة البيانات
+            # .filter(status__iexact='active')
+
+        if user.company.company_type == 'vendor':
+            # الحالة الثانية: المستخدم هو "مورد"
+            # يرى عمال شركتة فقط
+            return Worker.objects.filter(vendor__company=user.company)
+    # حالة أمان: إذا لم يكن هناك مستخدم أو شركة، لا تعرض أي عامل
+    return Worker.objects.none()
+
+
 class RequestCreateForm(forms.ModelForm):
     """فورم إنشاء الطلب الأساسي"""
     class Meta:
@@ -11,7 +29,8 @@ class RequestCreateForm(forms.ModelForm):
             'title': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'عنوان مختصر للطلب'}),
             'notes': forms.Textarea(attrs={'class': 'form-control', 'rows': 3, 'placeholder': 'ملاحظات إضافية'}),
             'request_type': forms.Select(attrs={'class': 'form-select'}),
-            'worker': forms.Select(attrs={'class': 'form-select select2'}),
+            # العامل يُختار من البحث (api/workers/) ويُرسل رقمه فقط؛ لا تُعرض كل العمالة في الصفحة
+            'worker': forms.HiddenInput(),
         }
 
     def __init__(self, *args, **kwargs):
@@ -21,26 +40,8 @@ class RequestCreateForm(forms.ModelForm):
         # استدعاء دالة البناء الأساسية
         super(RequestCreateForm, self).__init__(*args, **kwargs)
 
-        # منطق فلترة العمالة
-        if user and hasattr(user, 'company') and user.company:
-            if user.company.company_type == 'client':
-                # الحالة الأولى: المستخدم هو "عميل"
-                # يجب أن يرى فقط العمال التابعين للموردين المتعاقد معهم
-                self.fields['worker'].queryset = Worker.objects.filter(
-                    vendor__clients=user.company
-                )
-                # ملاحظة: إذا أردت تفعيل شرط الحالة لاحقاً تأكد من الاسم الدقيق في قاعدة البيانات
-                # .filter(status__iexact='active')
-
-            elif user.company.company_type == 'vendor':
-                # الحالة الثانية: المستخدم هو "مورد"
-                # يرى عمال شركتة فقط
-                self.fields['worker'].queryset = Worker.objects.filter(
-                    vendor__company=user.company
-                )
-        else:
-            # حالة أمان: إذا لم يكن هناك مستخدم أو شركة، لا تعرض أي عامل
-            self.fields['worker'].queryset = Worker.objects.none()
+        # منطق فلترة العمالة (التحقق من العامل المرسل باستعلام واحد على رقمه)
+        self.fields['worker'].queryset = worker_queryset(user)
 
 class CommentForm(forms.ModelForm):
     """فورم إضافة تعليق"""
@@ -77,4 +78,48 @@ class CompleteRequestForm(forms.Form):
     closure_note = forms.CharField(
         required=False,
         widget=forms.Textarea(attrs={'class': 'form-control', 'rows': 3, 'placeholder': 'ملاحظة الإغلاق (اختياري)...'})
-    )
\ No newline at end of file
+    )
+
+class BulkRequestForm(forms.Form):
+    """فورم الإنشاء بالجملة: اختيار عدة عمال، أو رفع ملف CSV / XLSX"""
+    request_type = forms.ModelChoiceField(
+        queryset=RequestType.objects.filter(is_active=True),
+        label="نوع الطلب",
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    # العمال يُختارون عبر البحث (api/workers/)؛ لا تُعرض القائمة كاملة في الصفحة
+    workers = forms.ModelMultipleChoiceField(
+        queryset=Worker.objects.none(),
+        required=False,
+        label="العمال",
+        widget=forms.MultipleHiddenInput
+    )
+    file = forms.FileField(
+        required=False,
+        label="ملف الطلبات (CSV / XLSX)",
+        widget=forms.FileInput(attrs={'class': 'form-control', 'accept': '.csv,.xlsx'})
+    )
+    title = forms.CharField(
+        max_length=200, required=False,
+        widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'عنوان مختصر للطلبات'})
+    )
+    notes = forms.CharField(
+        required=False,
+        widget=forms.Textarea(attrs={'class': 'form-control', 'rows': 3, 'placeholder': 'ملاحظات إضافية'})
+    )
+
+    def __init__(self, *args, **kwargs):
+        user = kwargs.pop('user', None)
+        super().__init__(*args, **kwargs)
+        if user and user.company and user.company.company_type == 'client':
+            self.fields['workers'].queryset = worker_queryset(user).select_related('vendor')
+
+    def clean(self):
+        cleaned_data = super().clean()
+        workers = cleaned_data.get('workers')
+        upload = cleaned_data.get('file')
+        if bool(workers) == bool(upload):
+            raise forms.ValidationError("اختر العمال أو ارفع ملفاً (واحد منهما فقط).")
+        if upload and not upload.name.lower().endswith(('.csv', '.xlsx')):
+            self.add_error('file', "صيغة الملف غير مدعومة (CSV أو XLSX فقط).")
+        return cleaned_data
@@ -0,0 +1,163 @@
+"""
+نسخ مصغرة من الصور (Derivatives) للمرفقات وصور شركات التوريد
+
+بدلاً من تحميل الصورة الأصلية (عدة ميجابايت من كاميرا الجوال) لعرض معاينة صغيرة،
+تُولد نسختان لكل صورة:
+- thumb: للمعاينات في صفحة الطلب.
+- web: للعرض بحجم الشاشة.
+كل نسخة مصغرة: تصحيح الاتجاه حسب EXIF ثم حذف بيانات EXIF (الموقع / الجهاز)، وحفظ بصيغة
+WebP (أو JPEG إذا لم يدعمها Pillow).
+
+المسار مبني على hash الملف الأصلي:
+    derivatives/v<الإصدار>/<rendition>/<أول حرفين>/<sha256>.<ext>
+فالنسخة تُولد مرة واحدة لكل محتوى، ولا تتغير أبداً (تُخزن في المتصفح كـ immutable).
+التوليد في الخلفية عبر صندوق الصادر (images.derivatives) أو أمر generate_image_derivatives
+بعدة عمليات (ProcessPoolExecutor)، ويُولد عند الطلب إذا لم يكن جاهزاً بعد.
+"""
+import hashlib
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+from django.conf import settings
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+from .storage import AVATAR_DIR, BLOB_DIR, blob_digest
+
+DERIVATIVE_DIR = "derivatives"
+# يُرفع عند تغيير الأحجام أو الجودة حتى تُولد نسخ جديدة بدلاً من القديمة المخزنة في المتصفح
+VERSION = 1
+
+
+@dataclass(frozen=True)
+class Rendition:
+    max_size: int
+    quality: int
+
+
+RENDITIONS = {
+    "thumb": Rendition(max_size=320, quality=70),
+    "web": Rendition(max_size=1600, quality=82),
+}
+
+_EXTENSIONS = {"WEBP": "webp", "JPEG": "jpg"}
+
+
+class ImageProcessingError(Exception):
+    """الملف ليس صورة صالحة أو أكبر من الحد المسموح."""
+
+
+def output_format():
+    fmt = getattr(settings, "IMAGE_DERIVATIVE_FORMAT", "WEBP").upper()
+    if fmt == "WEBP" and not features.check("webp"):
+        return "JPEG"
+    return fmt if fmt in _EXTENSIONS else "JPEG"
+
+
+def source_digest(storage, name):
+    """hash الملف الأصلي: من المسار للملفات المخزنة حسب المحتوى، وإلا بقراءة الملف."""
+    if name.startswith((f"{BLOB_DIR}/", f"{AVATAR_DIR}/")):
+        return blob_digest(name)
+    digest = hashlib.sha256()
+    with storage.open(name, "rb") as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def derivative_name(digest, rendition, fmt=None):
+    ext = _EXTENSIONS[fmt or output_format()]
+    return f"{DERIVATIVE_DIR}/v{VERSION}/{rendition}/{digest[:2]}/{digest}.{ext}"
+
+
+def render(source_path, target_path, max_size, quality, fmt):
+    """
+    توليد نسخة واحدة (دالة مستقلة بدون Django حتى تعمل داخل ProcessPoolExecutor).
+    الكتابة في ملف مؤقت ثم نقل ذري، فلا تظهر نسخة ناقصة إذا توقفت العملية.
+    """
+    try:
+        with Image.open(source_path) as image:
+            image.draft("RGB", (max_size, max_size))  # تصغير سريع أثناء فك JPEG
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+            keep_alpha = fmt == "WEBP" and image.mode in ("RGBA", "LA", "P")
+            image = image.convert("RGBA" if keep_alpha else "RGB")
+
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(target_path))
+            try:
+                with os.fdopen(fd, "wb") as temp:
+                    # بدون تمرير exif: لا تُنسخ بيانات EXIF للنسخة الجديدة
+                    image.save(temp, fmt, quality=quality, optimize=fmt == "JPEG", method=4)
+                os.replace(temp_path, target_path)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        raise ImageProcessingError(str(e)) from e
+    return target_path
+
+
+def _job(storage, name, rendition, fmt, force=False):
+    """(source_path, target_path, max_size, quality, fmt) أو None إذا كانت النسخة موجودة."""
+    source_path = storage.path(name)
+    if not os.path.exists(source_path):
+        raise FileNotFoundError(name)
+    target_path = storage.path(derivative_name(source_digest(storage, name), rendition, fmt))
+    if not force and os.path.exists(target_path):
+        return None
+    spec = RENDITIONS[rendition]
+    return source_path, target_path, spec.max_size, spec.quality, fmt
+
+
+def missing_derivatives(storage, name):
+    """هل تنقص أي نسخة مصغرة لهذا الملف؟"""
+    fmt = output_format()
+    return any(_job(storage, name, rendition, fmt) is not None for rendition in RENDITIONS)
+
+
+def ensure_derivative(storage, name, rendition):
+    """اسم النسخة المصغرة (تُولد الآن إذا لم تكن جاهزة). ترفع ImageProcessingError."""
+    fmt = output_format()
+    job = _job(storage, name, rendition, fmt)
+    if job is not None:
+        render(*job)
+    return derivative_name(source_digest(storage, name), rendition, fmt)
+
+
+def _render_job(job):
+    try:
+        render(*job)
+        return True
+    except ImageProcessingError:
+        return False
+
+
+def generate(sources, renditions=tuple(RENDITIONS), workers=1, force=False):
+    """
+    توليد النسخ الناقصة لمجموعة صور. sources: [(storage، اسم الملف)].
+    workers > 1: التوليد المتوازي في عمليات منفصلة (Pillow يعتمد على المعالج).
+    ترجع (عدد المولد، عدد الفاشل).
+    """
+    fmt = output_format()
+    jobs = []
+    for storage, name in sources:
+        for rendition in renditions:
+            try:
+                job = _job(storage, name, rendition, fmt, force=force)
+            except FileNotFoundError:
+                continue
+            if job is not None:
+                jobs.append(job)
+    if not jobs:
+        return 0, 0
+
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_render_job, jobs, chunksize=8))
+    else:
+        results = [_render_job(job) for job in jobs]
+    done = sum(results)
+    return done, len(results) - done
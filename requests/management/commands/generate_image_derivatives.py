@@ -0,0 +1,35 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from requests import images
+from requests.models import RequestAttachment
+from vendors.models import Vendor
+
+
+class Command(BaseCommand):
+    help = "توليد النسخ المصغرة (thumb / web) لصور المرفقات وصور شركات التوريد بعدة عمليات متوازية."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="عدد العمليات")
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--force", action="store_true", help="إعادة توليد النسخ الموجودة")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        sources = [
+            (vendor.avatar.storage, vendor.avatar.name)
+            for vendor in Vendor.objects.exclude(avatar="").only("id", "avatar")
+        ]
+        done = failed = 0
+        # المرفقات على دفعات حتى لا تُحمّل كلها في الذاكرة
+        for att in RequestAttachment.objects.only("id", "file").order_by("pk").iterator(chunk_size=batch_size):
+            if att.is_image():
+                sources.append((att.file.storage, att.file.name))
+            if len(sources) >= batch_size:
+                result = images.generate(sources, workers=options["workers"], force=options["force"])
+                done, failed = done + result[0], failed + result[1]
+                sources = []
+        result = images.generate(sources, workers=options["workers"], force=options["force"])
+        done, failed = done + result[0], failed + result[1]
+        self.stdout.write(self.style.SUCCESS(f"تم توليد {done} نسخة (فشل: {failed})."))
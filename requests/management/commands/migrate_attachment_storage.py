@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from requests.storage import migrate_legacy_files
+
+
+class Command(BaseCommand):
+    help = "نقل ملفات المرفقات القديمة (media/request_docs) إلى التخزين حسب المحتوى بدون تكرار."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--dry-run", action="store_true", help="عرض ما سيتم نقله فقط")
+        parser.add_argument("--keep-originals", action="store_true", help="عدم حذف الملفات القديمة بعد النقل")
+
+    def handle(self, *args, **options):
+        stats = migrate_legacy_files(
+            batch_size=options["batch_size"],
+            dry_run=options["dry_run"],
+            keep_originals=options["keep_originals"],
+        )
+        prefix = "[تجربة] " if options["dry_run"] else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}تم نقل {stats['converted']} مرفق (مفقود: {stats['missing']}). "
+            f"الحجم قبل: {stats['bytes_before']} بايت، المضاف فعلياً: {stats['bytes_added']} بايت."
+        ))
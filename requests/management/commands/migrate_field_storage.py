@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from requests.field_values import BATCH_SIZE, DOCUMENT, ROWS, documents_to_rows, rows_to_documents
+
+
+class Command(BaseCommand):
+    help = "نسخ قيم الحقول الديناميكية بين صفوف RequestFieldValue ومستند Request.field_data."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--to", choices=[DOCUMENT, ROWS], required=True, help="طريقة التخزين الجديدة")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            "--clear-source", action="store_true",
+            help="حذف البيانات من الطريقة القديمة بعد النسخ (بعد التأكد من REQUEST_FIELD_STORAGE)",
+        )
+
+    def handle(self, *args, **options):
+        target = options["to"]
+        convert = rows_to_documents if target == DOCUMENT else documents_to_rows
+        requests_done, values_done = convert(
+            batch_size=options["batch_size"], clear_source=options["clear_source"],
+        )
+        self.stdout.write(self.style.SUCCESS(f"تم نسخ {values_done} قيمة لـ {requests_done} طلب إلى {target}."))
+        if getattr(settings, "REQUEST_FIELD_STORAGE", ROWS) != target:
+            self.stdout.write(self.style.WARNING(
+                f"REQUEST_FIELD_STORAGE ليس {target} بعد: عدّل الإعداد حتى تُقرأ القيم من الطريقة الجديدة."
+            ))
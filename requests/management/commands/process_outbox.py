@@ -0,0 +1,47 @@
+import os
+import socket
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+
+from requests import outbox
+
+
+class Command(BaseCommand):
+    help = "تنفيذ الرسائل المؤجلة في صندوق الصادر (إشعارات وغيرها) على دفعات مع إعادة المحاولة."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--sleep", type=float, default=2.0, help="ثوانٍ الانتظار عند عدم وجود رسائل")
+        parser.add_argument("--max-attempts", type=int, default=outbox.MAX_ATTEMPTS)
+        parser.add_argument("--lease", type=int, default=outbox.LEASE_SECONDS, help="مهلة الحجز بالثواني")
+        parser.add_argument("--purge-days", type=int, default=7, help="حذف الرسائل المنفذة الأقدم من هذه المدة")
+        parser.add_argument("--once", action="store_true", help="تنفيذ الرسائل الجاهزة ثم الخروج")
+
+    def handle(self, *args, **options):
+        worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.stdout.write(f"Outbox worker {worker_id} started")
+
+        try:
+            while True:
+                batch = outbox.claim_batch(
+                    batch_size=options["batch_size"],
+                    worker_id=worker_id,
+                    lease_seconds=options["lease"],
+                )
+                if batch:
+                    done, failed = outbox.process_claimed(batch, max_attempts=options["max_attempts"])
+                    self.stdout.write(f"processed={done} failed={failed}")
+                    continue
+
+                if options["once"]:
+                    break
+                purged = outbox.purge_processed(options["purge_days"])
+                if purged:
+                    self.stdout.write(f"purged={purged}")
+                time.sleep(options["sleep"])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(f"Outbox worker {worker_id} stopped")
@@ -0,0 +1,45 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.template.defaultfilters import filesizeformat
+
+from requests import cleanup
+
+
+class Command(BaseCommand):
+    help = "حذف المسودات المهملة على دفعات، ثم حذف ملفات المرفقات والصور غير المستخدمة من MEDIA_ROOT."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=getattr(settings, "DRAFT_EXPIRY_DAYS", cleanup.DRAFT_MAX_AGE.days),
+            help="حذف المسودات التي لم تُعدّل منذ هذا العدد من الأيام",
+        )
+        parser.add_argument("--batch-size", type=int, default=cleanup.BATCH_SIZE)
+        parser.add_argument(
+            "--grace-minutes", type=int, default=int(cleanup.FILE_GRACE.total_seconds() // 60),
+            help="عدم حذف الملفات الأحدث من هذه المدة (رفع قيد التنفيذ)",
+        )
+        parser.add_argument("--skip-drafts", action="store_true", help="تنظيف الملفات فقط")
+        parser.add_argument("--skip-files", action="store_true", help="حذف المسودات فقط")
+        parser.add_argument("--dry-run", action="store_true", help="عرض ما سيتم حذفه بدون حذف")
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        stats = cleanup.CleanupStats()
+        if not options["skip_drafts"]:
+            cleanup.purge_stale_drafts(
+                max_age=timedelta(days=options["days"]), batch_size=options["batch_size"],
+                dry_run=dry_run, stats=stats,
+            )
+        if not options["skip_files"]:
+            cleanup.sweep_orphan_files(
+                grace=timedelta(minutes=options["grace_minutes"]), dry_run=dry_run, stats=stats,
+            )
+
+        prefix = "[تجربة] " if dry_run else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}مسودات: {stats.drafts} (مرفقات: {stats.attachments})، "
+            f"ملفات غير مستخدمة: {stats.files}، المساحة المستعادة: {filesizeformat(stats.bytes)} "
+            f"({stats.bytes} بايت)، صفوف ملفات: {stats.blob_rows}"
+        ))
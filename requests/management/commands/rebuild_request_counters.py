@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from requests.counters import rebuild
+
+
+class Command(BaseCommand):
+    help = "إعادة بناء جدول عدادات حالات الطلبات بالكامل من جدول الطلبات."
+
+    def handle(self, *args, **options):
+        count = rebuild()
+        self.stdout.write(self.style.SUCCESS(f"تمت إعادة بناء {count} عداد."))
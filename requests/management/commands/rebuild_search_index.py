@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from requests.search import BATCH_SIZE, rebuild
+
+
+class Command(BaseCommand):
+    help = "إعادة بناء فهرس البحث النصي لكل الطلبات (تُستخدم بعد الترحيل لأول مرة)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        count = rebuild(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"تمت فهرسة {count} طلب."))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from requests.rollups import BATCH_SIZE, process_new_events, rebuild
+
+
+class Command(BaseCommand):
+    help = "تجميع مدد حالات الطلبات (SLA) من حركات التايم لاين الجديدة فقط منذ آخر تشغيل."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="عدد الحركات في كل دفعة")
+        parser.add_argument("--rebuild", action="store_true", help="حذف التجميعات وإعادة حسابها من البداية")
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            count = rebuild(batch_size=options["batch_size"])
+        else:
+            count = process_new_events(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"تمت معالجة {count} حركة."))
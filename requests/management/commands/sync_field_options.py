@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from requests.field_options import sync_options
+from requests.models import RequestField
+from requests.schema import invalidate_schema
+
+
+class Command(BaseCommand):
+    help = "مزامنة جدول خيارات القوائم الكبيرة من RequestField.choices (بعد تغيير CHOICE_OPTIONS_THRESHOLD)."
+
+    def handle(self, *args, **options):
+        created = updated = deleted = 0
+        # كل الحقول: الحقل الذي لم يعد choice (أو صغرت قائمته) تُحذف صفوف خياراته
+        for field in RequestField.objects.iterator():
+            counts = sync_options(field)
+            created, updated, deleted = created + counts[0], updated + counts[1], deleted + counts[2]
+            invalidate_schema(field.request_type_id)
+        self.stdout.write(self.style.SUCCESS(
+            f"تمت المزامنة: {created} خيار جديد، {updated} معدل، {deleted} محذوف."
+        ))
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.10 on 2026-10-18 19:09
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests', '0007_requesttimeline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topic', models.CharField(max_length=100, verbose_name='النوع')),
+                ('payload', models.JSONField(blank=True, default=dict, verbose_name='البيانات')),
+                ('status', models.CharField(choices=[('pending', 'بانتظار التنفيذ'), ('processing', 'قيد التنفيذ'), ('done', 'تم التنفيذ'), ('dead', 'فشل نهائي')], default='pending', max_length=20, verbose_name='الحالة')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='عدد المحاولات')),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='متاح للتنفيذ من')),
+                ('claimed_by', models.CharField(blank=True, max_length=64, verbose_name='محجوز بواسطة')),
+                ('claimed_at', models.DateTimeField(blank=True, null=True, verbose_name='وقت الحجز')),
+                ('last_error', models.TextField(blank=True, verbose_name='آخر خطأ')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='تاريخ التنفيذ')),
+            ],
+            options={
+                'verbose_name': 'رسالة صادرة',
+                'verbose_name_plural': 'الرسائل الصادرة',
+                'indexes': [models.Index(fields=['status', 'available_at'], name='requests_ou_status_5067b6_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.10 on 2026-10-18 19:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_counters(apps, schema_editor):
+    Request = apps.get_model('requests', 'Request')
+    RequestStatusCounter = apps.get_model('requests', 'RequestStatusCounter')
+    rows = (
+        Request.objects
+        .filter(created_by__company__isnull=False)
+        .values('created_by__company', 'worker__vendor__company', 'status')
+        .annotate(n=Count('id'))
+        .order_by()
+    )
+    RequestStatusCounter.objects.bulk_create([
+        RequestStatusCounter(
+            client_company_id=row['created_by__company'],
+            vendor_company_id=row['worker__vendor__company'],
+            status=row['status'],
+            count=row['n'],
+        )
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('requests', '0008_outboxmessage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestStatusCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('draft', 'مسودة'), ('submitted', 'مرسل'), ('in_progress', 'قيد المعالجة'), ('returned', 'معاد (لوجود نقص)'), ('completed', 'مكتمل'), ('rejected', 'مرفوض'), ('cancelled', 'ملغي')], max_length=20, verbose_name='الحالة')),
+                ('count', models.IntegerField(default=0, verbose_name='العدد')),
+                ('client_company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='client_request_counters', to='accounts.company', verbose_name='شركة العميل')),
+                ('vendor_company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vendor_request_counters', to='accounts.company', verbose_name='شركة التوريد')),
+            ],
+            options={
+                'verbose_name': 'عداد طلبات',
+                'verbose_name_plural': 'عدادات الطلبات',
+                'indexes': [models.Index(fields=['vendor_company', 'status'], name='requests_re_vendor__1b9fb3_idx')],
+                'constraints': [models.UniqueConstraint(fields=('client_company', 'vendor_company', 'status'), name='uq_request_counter_key')],
+            },
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
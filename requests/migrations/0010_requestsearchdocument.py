@@ -0,0 +1,62 @@
+# Generated by Django 5.2.10 on 2026-10-18 19:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def create_search_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == "postgresql":
+        from django.contrib.postgres.indexes import GinIndex
+        from django.contrib.postgres.search import SearchVector
+
+        model = apps.get_model("requests", "RequestSearchDocument")
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        schema_editor.add_index(model, GinIndex(
+            SearchVector("document", config="simple"), name="request_search_fts_idx",
+        ))
+        schema_editor.add_index(model, GinIndex(
+            fields=["document"], opclasses=["gin_trgm_ops"], name="request_search_trgm_idx",
+        ))
+    elif connection.vendor == "sqlite":
+        # FTS5 متوفر في أغلب نسخ SQLite، وإن لم يتوفر يعمل البحث بـ icontains
+        try:
+            schema_editor.execute(
+                "CREATE VIRTUAL TABLE requests_search_fts USING fts5("
+                "document, tokenize = 'unicode61 remove_diacritics 2')"
+            )
+        except Exception:
+            pass
+
+
+def drop_search_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS request_search_fts_idx")
+        schema_editor.execute("DROP INDEX IF EXISTS request_search_trgm_idx")
+    elif connection.vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS requests_search_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests', '0009_requeststatuscounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestSearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('document', models.TextField(blank=True, verbose_name='نص البحث')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='آخر تحديث')),
+                ('request', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='search_document', to='requests.request', verbose_name='الطلب')),
+            ],
+            options={
+                'verbose_name': 'فهرس بحث طلب',
+                'verbose_name_plural': 'فهارس بحث الطلبات',
+            },
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
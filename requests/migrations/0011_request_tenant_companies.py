@@ -0,0 +1,44 @@
+# Generated by Django 5.2.10 on 2026-10-18 19:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('requests', '0010_requestsearchdocument'),
+        ('vendors', '0004_alter_vendor_profile_picture'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='request',
+            name='client_company',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='client_requests', to='accounts.company', verbose_name='شركة العميل'),
+        ),
+        migrations.AddField(
+            model_name='request',
+            name='vendor_company',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='vendor_requests', to='accounts.company', verbose_name='شركة التوريد'),
+        ),
+        migrations.AddIndex(
+            model_name='request',
+            index=models.Index(fields=['client_company', 'status', '-created_at'], name='req_client_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='request',
+            index=models.Index(fields=['vendor_company', 'status', '-created_at'], name='req_vendor_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='request',
+            index=models.Index(fields=['client_company', '-created_at', '-id'], name='req_client_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='request',
+            index=models.Index(fields=['vendor_company', '-created_at', '-id'], name='req_vendor_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def populate_tenant_companies(apps, schema_editor):
+    # UPDATE واحد على مستوى قاعدة البيانات بدلاً من حفظ كل طلب على حدة
+    Request = apps.get_model("requests", "Request")
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split("."))
+    Worker = apps.get_model("vendors", "Worker")
+    Request.objects.update(
+        client_company=Subquery(User.objects.filter(pk=OuterRef("created_by_id")).values("company_id")[:1]),
+        vendor_company=Subquery(Worker.objects.filter(pk=OuterRef("worker_id")).values("vendor__company_id")[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests', '0011_request_tenant_companies'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_tenant_companies, migrations.RunPython.noop),
+    ]
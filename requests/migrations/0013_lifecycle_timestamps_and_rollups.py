@@ -0,0 +1,72 @@
+# Generated by Django 5.2.10 on 2026-10-18 19:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('requests', '0012_populate_tenant_companies'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='التجميع')),
+                ('last_event_id', models.BigIntegerField(default=0, verbose_name='آخر حركة معالجة')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='آخر تحديث')),
+            ],
+            options={
+                'verbose_name': 'نقطة تجميع',
+                'verbose_name_plural': 'نقاط التجميع',
+            },
+        ),
+        migrations.AddField(
+            model_name='request',
+            name='processing_started_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='تاريخ بدء المعالجة'),
+        ),
+        migrations.AddField(
+            model_name='request',
+            name='returned_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='تاريخ آخر إعادة'),
+        ),
+        migrations.AddField(
+            model_name='request',
+            name='status_changed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='تاريخ آخر تغيير للحالة'),
+        ),
+        migrations.AddField(
+            model_name='request',
+            name='submitted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='تاريخ الإرسال'),
+        ),
+        migrations.AddField(
+            model_name='requesttimeline',
+            name='duration_seconds',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='المدة في الحالة السابقة (ثانية)'),
+        ),
+        migrations.CreateModel(
+            name='RequestStatusDuration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='اليوم')),
+                ('status', models.CharField(choices=[('draft', 'مسودة'), ('submitted', 'مرسل'), ('in_progress', 'قيد المعالجة'), ('returned', 'معاد (لوجود نقص)'), ('completed', 'مكتمل'), ('rejected', 'مرفوض'), ('cancelled', 'ملغي')], max_length=20, verbose_name='الحالة')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='عدد الحركات')),
+                ('total_seconds', models.BigIntegerField(default=0, verbose_name='إجمالي المدة (ثانية)')),
+                ('max_seconds', models.BigIntegerField(default=0, verbose_name='أطول مدة (ثانية)')),
+                ('request_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_durations', to='requests.requesttype', verbose_name='نوع الطلب')),
+                ('vendor_company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='request_status_durations', to='accounts.company', verbose_name='شركة التوريد')),
+            ],
+            options={
+                'verbose_name': 'تجميع مدة حالة',
+                'verbose_name_plural': 'تجميعات مدد الحالات',
+                'indexes': [models.Index(fields=['vendor_company', 'day'], name='requests_re_vendor__0ea2f8_idx')],
+                'constraints': [models.UniqueConstraint(fields=('vendor_company', 'request_type', 'day', 'status'), name='uq_request_status_duration_key')],
+            },
+        ),
+    ]
@@ -0,0 +1,57 @@
+from django.db import migrations
+from django.db.models import F, Max, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 1000
+
+
+def _event_time(Timeline, aggregate, **filters):
+    return Subquery(
+        Timeline.objects.filter(request=OuterRef("pk"), **filters)
+        .order_by().values("request").annotate(at=aggregate("created_at")).values("at")[:1]
+    )
+
+
+def populate_lifecycle_timestamps(apps, schema_editor):
+    Request = apps.get_model("requests", "Request")
+    Timeline = apps.get_model("requests", "RequestTimeline")
+
+    # قبل هذا التعديل كان الإرسال يستبدل created_at بوقت الإرسال، لذلك هو القيمة الاحتياطية
+    Request.objects.exclude(status="draft").update(
+        submitted_at=Coalesce(_event_time(Timeline, Min, old_status="draft", new_status="submitted"), F("created_at")),
+    )
+    Request.objects.update(
+        processing_started_at=_event_time(Timeline, Max, new_status="in_progress"),
+        returned_at=_event_time(Timeline, Max, new_status="returned"),
+        status_changed_at=Coalesce(_event_time(Timeline, Max, new_status__isnull=False), F("created_at")),
+    )
+
+    # المدة في الحالة السابقة لكل حركة = الفرق عن الحركة السابقة لنفس الطلب
+    events = (
+        Timeline.objects.filter(new_status__isnull=False)
+        .order_by("request_id", "created_at", "id")
+        .values_list("id", "request_id", "created_at", "request__created_at")
+    )
+    previous = (None, None)
+    pending = []
+    for event_id, request_id, created_at, request_created_at in events.iterator(chunk_size=BATCH_SIZE):
+        started_at = previous[1] if previous[0] == request_id else request_created_at
+        seconds = max(0, int((created_at - started_at).total_seconds()))
+        pending.append(Timeline(id=event_id, duration_seconds=seconds))
+        previous = (request_id, created_at)
+        if len(pending) >= BATCH_SIZE:
+            Timeline.objects.bulk_update(pending, ["duration_seconds"])
+            pending = []
+    if pending:
+        Timeline.objects.bulk_update(pending, ["duration_seconds"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests', '0013_lifecycle_timestamps_and_rollups'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_lifecycle_timestamps, migrations.RunPython.noop),
+    ]
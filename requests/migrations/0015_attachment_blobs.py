@@ -0,0 +1,40 @@
+# Generated by Django 5.2.10 on 2026-10-18 19:36
+
+import requests.models
+import requests.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests', '0014_populate_lifecycle_timestamps'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttachmentBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=255, unique=True, verbose_name='المسار')),
+                ('sha256', models.CharField(db_index=True, max_length=64, verbose_name='SHA-256')),
+                ('size', models.BigIntegerField(default=0, verbose_name='الحجم (بايت)')),
+                ('ref_count', models.PositiveIntegerField(default=0, verbose_name='عدد المرفقات')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+            ],
+            options={
+                'verbose_name': 'ملف مخزن',
+                'verbose_name_plural': 'الملفات المخزنة',
+            },
+        ),
+        migrations.AddField(
+            model_name='requestattachment',
+            name='original_name',
+            field=models.CharField(blank=True, max_length=255, verbose_name='اسم الملف الأصلي'),
+        ),
+        migrations.AlterField(
+            model_name='requestattachment',
+            name='file',
+            field=models.FileField(max_length=255, storage=requests.storage.get_attachment_storage, upload_to=requests.models.get_attachment_upload_path, verbose_name='الملف'),
+        ),
+    ]
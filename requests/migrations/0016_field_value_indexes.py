@@ -0,0 +1,45 @@
+# Generated by Django 5.2.10 on 2026-10-18 19:54
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+def create_json_index(apps, schema_editor):
+    # الاحتواء (@>) على value_json: فهرس GIN في PostgreSQL فقط
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS rfv_value_json_gin_idx "
+            "ON requests_requestfieldvalue USING gin (value_json jsonb_path_ops)"
+        )
+
+
+def drop_json_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS rfv_value_json_gin_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests', '0015_attachment_blobs'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='requestfieldvalue',
+            index=models.Index(fields=['field', 'value_number'], name='rfv_field_number_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requestfieldvalue',
+            index=models.Index(fields=['field', 'value_date'], name='rfv_field_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requestfieldvalue',
+            index=models.Index(fields=['field', 'value_bool'], name='rfv_field_bool_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requestfieldvalue',
+            index=models.Index(models.F('field'), django.db.models.functions.text.Substr('value_text', 1, 100), name='rfv_field_text_idx'),
+        ),
+        migrations.RunPython(create_json_index, drop_json_index),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.10 on 2026-10-18 19:59
+
+from django.db import migrations, models
+
+
+def create_document_index(apps, schema_editor):
+    # التساوي والاحتواء (@>) على مستند الحقول: فهرس GIN في PostgreSQL فقط
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS request_field_data_gin_idx "
+            "ON requests_request USING gin (field_data jsonb_path_ops)"
+        )
+
+
+def drop_document_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS request_field_data_gin_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests', '0016_field_value_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='request',
+            name='field_data',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='بيانات الحقول'),
+        ),
+        migrations.RunPython(create_document_index, drop_document_index),
+    ]
@@ -0,0 +1,95 @@
+# Generated by Django 5.2.10 on 2026-10-18 20:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# قيم مجمدة وقت كتابة الترحيل (لا تتبع CHOICE_OPTIONS_THRESHOLD أو كود التطبيق لاحقاً)
+OPTIONS_THRESHOLD = 100
+MAX_LABEL_LENGTH = 255
+BATCH_SIZE = 500
+
+
+def normalize_choices(raw):
+    """نسخة من schema.normalize_choices وقت كتابة الترحيل: أزواج (value, label)."""
+    if not raw:
+        return ()
+    if isinstance(raw, dict):
+        return tuple((str(k), str(v)) for k, v in raw.items())
+    pairs = []
+    for item in raw:
+        if isinstance(item, dict):
+            value = item.get("value", item.get("label"))
+            label = item.get("label", value)
+            if value is None:
+                continue
+            pairs.append((str(value), str(label)))
+        elif isinstance(item, (list, tuple)) and len(item) == 2:
+            pairs.append((str(item[0]), str(item[1])))
+        else:
+            pairs.append((str(item), str(item)))
+    return tuple(pairs)
+
+
+def create_prefix_indexes(apps, schema_editor):
+    # البحث ببداية النص (istartswith -> UPPER(label) LIKE) أو القيمة يحتاج pattern_ops في PostgreSQL
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS rfo_label_prefix_idx "
+            "ON requests_requestfieldoption (field_id, UPPER(label) text_pattern_ops)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS rfo_value_prefix_idx "
+            "ON requests_requestfieldoption (field_id, UPPER(value) text_pattern_ops)"
+        )
+
+
+def drop_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS rfo_label_prefix_idx")
+        schema_editor.execute("DROP INDEX IF EXISTS rfo_value_prefix_idx")
+
+
+def populate_options(apps, schema_editor):
+    RequestField = apps.get_model("requests", "RequestField")
+    RequestFieldOption = apps.get_model("requests", "RequestFieldOption")
+    for field_id, choices in RequestField.objects.filter(field_type="choice").values_list("id", "choices"):
+        pairs = normalize_choices(choices)
+        if len(pairs) <= OPTIONS_THRESHOLD:
+            continue
+        # الجدول جديد: أول ظهور لكل قيمة هو المعتمد
+        wanted = {}
+        for order, (value, label) in enumerate(pairs):
+            wanted.setdefault(value, (label[:MAX_LABEL_LENGTH], order))
+        RequestFieldOption.objects.bulk_create([
+            RequestFieldOption(field_id=field_id, value=value, label=label, sort_order=order)
+            for value, (label, order) in wanted.items()
+        ], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests', '0017_request_field_data'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestFieldOption',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.CharField(max_length=255, verbose_name='القيمة')),
+                ('label', models.CharField(max_length=255, verbose_name='النص المعروض')),
+                ('sort_order', models.PositiveIntegerField(default=0, verbose_name='ترتيب العرض')),
+                ('field', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='options', to='requests.requestfield', verbose_name='الحقل')),
+            ],
+            options={
+                'verbose_name': 'خيار حقل',
+                'verbose_name_plural': 'خيارات الحقول',
+                'ordering': ('field', 'sort_order', 'id'),
+                'indexes': [models.Index(fields=['field', 'sort_order', 'id'], name='rfo_field_order_idx')],
+                'constraints': [models.UniqueConstraint(fields=('field', 'value'), name='uq_requestfieldoption_field_value')],
+            },
+        ),
+        migrations.RunPython(create_prefix_indexes, drop_prefix_indexes),
+        migrations.RunPython(populate_options, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.10 on 2026-10-18 20:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('requests', '0018_field_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='requesttype',
+            name='schema_version',
+            field=models.PositiveIntegerField(default=1, editable=False, verbose_name='إصدار المخطط'),
+        ),
+    ]
@@ -1,10 +1,15 @@
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models.functions import Substr
+from django.urls import reverse
+from django.utils import timezone
 import os
 
 from accounts.models import Company
 from vendors.models import Worker
+from .schema import normalize_choices
+from .storage import get_attachment_storage
 
 User = settings.AUTH_USER_MODEL
 
@@ -39,6 +44,14 @@ class RequestType(models.Model):
         verbose_name="تاريخ الإنشاء"
     )
 
+    # يزيد مع كل تعديل على النوع أو حقوله (schema.invalidate_schema)، فتعرف كل العمليات
+    # أن المخطط المجمّع لديها قديم بدون كاش مشترك
+    schema_version = models.PositiveIntegerField(
+        default=1,
+        editable=False,
+        verbose_name="إصدار المخطط"
+    )
+
     class Meta:
         verbose_name = "نوع طلب"
         verbose_name_plural = "أنواع الطلبات"
@@ -131,6 +144,55 @@ class RequestField(models.Model):
             raise ValidationError({
                 "choices": "يجب تحديد الخيارات عند استخدام نوع الحقل (قائمة خيارات)."
             })
+        # القوائم الكبيرة تُنسخ لجدول RequestFieldOption (value بحد 255 حرفاً)
+        if self.field_type == "choice" and any(len(value) > 255 for value, _ in normalize_choices(self.choices)):
+            raise ValidationError({"choices": "قيمة الخيار يجب ألا تتجاوز 255 حرفاً."})
+
+
+class RequestFieldOption(models.Model):
+    """
+    خيارات حقول choice الكبيرة (مدن، بنوك، مهن...) في جدول مفهرس، تُزامن من RequestField.choices
+    عند الحفظ (field_options.sync_options). البحث والتحقق من القيم المرسلة يتمان عليه
+    بدلاً من إرسال القائمة كاملة مع المخطط.
+    """
+    field = models.ForeignKey(
+        RequestField,
+        on_delete=models.CASCADE,
+        related_name="options",
+        verbose_name="الحقل"
+    )
+
+    value = models.CharField(
+        max_length=255,
+        verbose_name="القيمة"
+    )
+
+    label = models.CharField(
+        max_length=255,
+        verbose_name="النص المعروض"
+    )
+
+    sort_order = models.PositiveIntegerField(
+        default=0,
+        verbose_name="ترتيب العرض"
+    )
+
+    class Meta:
+        verbose_name = "خيار حقل"
+        verbose_name_plural = "خيارات الحقول"
+        ordering = ("field", "sort_order", "id")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["field", "value"],
+                name="uq_requestfieldoption_field_value"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["field", "sort_order", "id"], name="rfo_field_order_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.field_id} :: {self.label}"
 
 
 # =========================
@@ -205,6 +267,28 @@ class Request(models.Model):
         verbose_name="الجهة الحالية المسؤولة"
     )
 
+    # ===== أعمدة الجهات (نسخة من created_by.company و worker.vendor.company) =====
+    # تسمح بتصفية طلبات كل جهة من جدول الطلبات مباشرة بدون joins
+    client_company = models.ForeignKey(
+        Company,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name="client_requests",
+        verbose_name="شركة العميل"
+    )
+
+    vendor_company = models.ForeignKey(
+        Company,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name="vendor_requests",
+        verbose_name="شركة التوريد"
+    )
+
     # ===== قرار الإغلاق النهائي (من شركة التوريد فقط) =====
     rejection_reason = models.TextField(
         blank=True,
@@ -243,6 +327,44 @@ class Request(models.Model):
         verbose_name="تاريخ الإغلاق"
     )
 
+    # ===== أوقات دورة حياة الطلب (تُسجل من محرك الانتقالات) =====
+    submitted_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="تاريخ الإرسال"
+    )
+
+    processing_started_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="تاريخ بدء المعالجة"
+    )
+
+    returned_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="تاريخ آخر إعادة"
+    )
+
+    status_changed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="تاريخ آخر تغيير للحالة"
+    )
+
+    # قيم الحقول الديناميكية كمستند واحد {field_id: قيمة} عند REQUEST_FIELD_STORAGE = "document"
+    # (بدلاً من صفوف RequestFieldValue)، انظر field_values
+    field_data = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name="بيانات الحقول"
+    )
+
     class Meta:
         verbose_name = "طلب"
         verbose_name_plural = "الطلبات"
@@ -251,11 +373,46 @@ class Request(models.Model):
             models.Index(fields=["status"]),
             models.Index(fields=["request_type"]),
             models.Index(fields=["worker"]),
+            # قائمة الطلبات ولوحات التحكم لكل جهة (تصفية بالحالة + ترتيب بالتاريخ)
+            models.Index(fields=["client_company", "status", "-created_at"], name="req_client_status_idx"),
+            models.Index(fields=["vendor_company", "status", "-created_at"], name="req_vendor_status_idx"),
+            # الترحيل بالمؤشر على (-created_at, -id) لكل جهة
+            models.Index(fields=["client_company", "-created_at", "-id"], name="req_client_keyset_idx"),
+            models.Index(fields=["vendor_company", "-created_at", "-id"], name="req_vendor_keyset_idx"),
         ]
 
     def __str__(self):
         return f"طلب #{self.id} - {self.request_type.name}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # لمعرفة تغيّر العامل عند الحفظ
+        instance._loaded_worker_id = instance.__dict__.get("worker_id")
+        return instance
+
+    def sync_tenant_companies(self):
+        """نسخ شركة العميل وشركة التوريد من المنشئ والعامل."""
+        if self.created_by_id:
+            self.client_company_id = self.created_by.company_id
+        if self.worker_id:
+            self.vendor_company_id = (
+                Worker.objects.filter(pk=self.worker_id).values_list("vendor__company_id", flat=True).first()
+            )
+
+    def save(self, *args, **kwargs):
+        if (
+            self._state.adding
+            or self.worker_id != getattr(self, "_loaded_worker_id", self.worker_id)
+            or self.client_company_id is None
+        ):
+            self.sync_tenant_companies()
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "client_company", "vendor_company"}
+        super().save(*args, **kwargs)
+        self._loaded_worker_id = self.worker_id
+
     def clean(self):
         # عند الإرسال أو المعالجة يجب تحديد الجهة الحالية
         if self.status in ("submitted", "in_progress") and not self.current_company:
@@ -280,10 +437,22 @@ class Request(models.Model):
                     "closed_by": "يجب تحديد من قام بالإغلاق."
                 })
 
+        if self.field_data and self.request_type_id:
+            from .field_values import validate_document
+            from .schema import get_schema
+
+            schema = get_schema(self.request_type_id)
+            if schema is not None:
+                validate_document(schema, self.field_data)
+
 
 # =========================
 # Request Field Value
 # =========================
+# طول بادئة value_text في فهرس (field, value_text)
+TEXT_INDEX_LENGTH = 100
+
+
 class RequestFieldValue(models.Model):
     request = models.ForeignKey(
         Request,
@@ -340,6 +509,16 @@ class RequestFieldValue(models.Model):
                 name="uq_request_field_value"
             )
         ]
+        # الاستعلام عن الطلبات حسب قيمة حقل (field_query): مدى / تساوي لكل نوع قيمة.
+        # النص مفهرس ببادئته فقط (القيم الطويلة تتجاوز حد حجم صف الفهرس في PostgreSQL)
+        indexes = [
+            models.Index(fields=["field", "value_number"], name="rfv_field_number_idx"),
+            models.Index(fields=["field", "value_date"], name="rfv_field_date_idx"),
+            models.Index(fields=["field", "value_bool"], name="rfv_field_bool_idx"),
+            models.Index(
+                "field", Substr("value_text", 1, TEXT_INDEX_LENGTH), name="rfv_field_text_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.request_id} :: {self.field.key}"
@@ -394,17 +573,24 @@ import os
 
 def get_attachment_upload_path(instance, filename):
     """
-    توليد مسار حفظ الملف ليكون:
+    المسار المقترح للملف:
     media/request_docs/request_<id>/<filename>
     مثال:
     request_docs/request_15/iqama.png
+
+    التخزين الفعلي (ContentAddressedStorage) يستخدم امتداده فقط ويحفظ الملف في blobs/
+    حسب المحتوى؛ المسار القديم بقي للملفات التي لم تُنقل بعد (migrate_attachment_storage).
     """
     # instance.request.id هو رقم الطلب المرتبط
     return f'request_docs/request_{instance.request.id}/{filename}'
 
 class RequestAttachment(models.Model):
     request = models.ForeignKey(Request, on_delete=models.CASCADE, related_name='attachments', verbose_name="الطلب")
-    file = models.FileField(upload_to=get_attachment_upload_path, verbose_name="الملف")
+    # الملفات تُحفظ حسب المحتوى (blobs/...) ويُحتفظ بالاسم الأصلي للعرض والتحميل
+    file = models.FileField(
+        upload_to=get_attachment_upload_path, storage=get_attachment_storage, max_length=255, verbose_name="الملف"
+    )
+    original_name = models.CharField(max_length=255, blank=True, verbose_name="اسم الملف الأصلي")
     uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="تم الرفع بواسطة")
     description = models.CharField(max_length=255, blank=True, verbose_name="وصف الملف")
     created_at = models.DateTimeField(auto_now_add=True)
@@ -415,14 +601,54 @@ class RequestAttachment(models.Model):
     def __str__(self):
         return f"مرفق لـ {self.request.id}"
 
+    def save(self, *args, **kwargs):
+        # اسم الملف المرفوع قبل أن يُستبدل بمسار المحتوى
+        if not self.original_name and self.file and not self.file._committed:
+            self.original_name = os.path.basename(self.file.name)[:255]
+        super().save(*args, **kwargs)
+
     def filename(self):
-        return os.path.basename(self.file.name)
+        return self.original_name or os.path.basename(self.file.name)
+
+    def get_absolute_url(self):
+        # الملفات لا تُنشر مباشرة من MEDIA_URL، بل عبر view يتحقق من الصلاحية
+        return reverse("requests:attachment", args=[self.request_id, self.pk])
+
+    def preview_url(self, rendition):
+        return reverse("requests:attachment_preview", args=[self.request_id, self.pk, rendition])
+
+    @property
+    def thumbnail_url(self):
+        return self.preview_url("thumb")
+
+    @property
+    def web_url(self):
+        return self.preview_url("web")
 
     def is_image(self):
         name = self.file.name.lower()
         return name.endswith(('.png', '.jpg', '.jpeg', '.gif'))
 
 
+class AttachmentBlob(models.Model):
+    """
+    ملف مخزن حسب محتواه (sha256) مع عدد المرفقات التي تشير إليه.
+    يُحدَّث ref_count من إشارات إنشاء / حذف المرفقات، ويُحذف الملف عند وصوله إلى صفر.
+    """
+    path = models.CharField(max_length=255, unique=True, verbose_name="المسار")
+    sha256 = models.CharField(max_length=64, db_index=True, verbose_name="SHA-256")
+    size = models.BigIntegerField(default=0, verbose_name="الحجم (بايت)")
+    ref_count = models.PositiveIntegerField(default=0, verbose_name="عدد المرفقات")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="تاريخ الإنشاء")
+
+    class Meta:
+        verbose_name = "ملف مخزن"
+        verbose_name_plural = "الملفات المخزنة"
+
+    def __str__(self):
+        return f"{self.path} ({self.ref_count})"
+
+
 class RequestTimeline(models.Model):
     request = models.ForeignKey(Request, on_delete=models.CASCADE, related_name='timeline_events', verbose_name="الطلب")
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, verbose_name="المستخدم")
@@ -432,6 +658,8 @@ class RequestTimeline(models.Model):
     
     old_status = models.CharField(max_length=50, blank=True, null=True)
     new_status = models.CharField(max_length=50, blank=True, null=True)
+    # الوقت الذي قضاه الطلب في old_status قبل هذه الحركة (لتقارير SLA)
+    duration_seconds = models.PositiveIntegerField(null=True, blank=True, verbose_name="المدة في الحالة السابقة (ثانية)")
     
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="وقت الحركة")
 
@@ -439,4 +667,164 @@ class RequestTimeline(models.Model):
         ordering = ['-created_at'] # الأحدث أولاً
 
     def __str__(self):
-        return f"{self.action_name} - {self.request.id}"
\ No newline at end of file
+        return f"{self.action_name} - {self.request.id}"
+
+# =========================
+# Search Document
+# =========================
+class RequestSearchDocument(models.Model):
+    """
+    نص البحث المجمّع لكل طلب (العنوان، الملاحظات، اسم العامل، رقم الإقامة،
+    نوع الطلب، والقيم النصية للحقول الديناميكية).
+    يُفهرس بـ Full-Text + Trigram في PostgreSQL، وبجدول FTS5 في SQLite.
+    """
+    request = models.OneToOneField(
+        Request,
+        on_delete=models.CASCADE,
+        related_name="search_document",
+        verbose_name="الطلب"
+    )
+    document = models.TextField(blank=True, verbose_name="نص البحث")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="آخر تحديث")
+
+    class Meta:
+        verbose_name = "فهرس بحث طلب"
+        verbose_name_plural = "فهارس بحث الطلبات"
+
+    def __str__(self):
+        return f"بحث طلب #{self.request_id}"
+
+
+# =========================
+# Status Counters
+# =========================
+class RequestStatusCounter(models.Model):
+    """
+    عدادات الطلبات لكل (شركة العميل، شركة التوريد، الحالة)
+    يتم تحديثها تدريجياً عند الإنشاء / تغيير الحالة / الحذف،
+    ويمكن إعادة بنائها بالكامل عبر: manage.py rebuild_request_counters
+    """
+    client_company = models.ForeignKey(
+        Company,
+        on_delete=models.CASCADE,
+        related_name="client_request_counters",
+        verbose_name="شركة العميل"
+    )
+    vendor_company = models.ForeignKey(
+        Company,
+        on_delete=models.CASCADE,
+        related_name="vendor_request_counters",
+        verbose_name="شركة التوريد"
+    )
+    status = models.CharField(max_length=20, choices=Request.STATUS_CHOICES, verbose_name="الحالة")
+    count = models.IntegerField(default=0, verbose_name="العدد")
+
+    class Meta:
+        verbose_name = "عداد طلبات"
+        verbose_name_plural = "عدادات الطلبات"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["client_company", "vendor_company", "status"],
+                name="uq_request_counter_key"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["vendor_company", "status"]),
+        ]
+
+    def __str__(self):
+        return f"{self.client_company_id}/{self.vendor_company_id} :: {self.status} = {self.count}"
+
+
+# =========================
+# SLA Rollups
+# =========================
+class RequestStatusDuration(models.Model):
+    """
+    تجميع يومي للوقت الذي قضته الطلبات في كل حالة لكل (شركة التوريد، نوع الطلب، اليوم)
+    يُحدَّث تدريجياً من حركات التايم لاين الجديدة فقط عبر: manage.py rollup_request_durations
+    """
+    vendor_company = models.ForeignKey(
+        Company,
+        on_delete=models.CASCADE,
+        related_name="request_status_durations",
+        verbose_name="شركة التوريد"
+    )
+    request_type = models.ForeignKey(
+        RequestType,
+        on_delete=models.CASCADE,
+        related_name="status_durations",
+        verbose_name="نوع الطلب"
+    )
+    day = models.DateField(verbose_name="اليوم")
+    status = models.CharField(max_length=20, choices=Request.STATUS_CHOICES, verbose_name="الحالة")
+    count = models.PositiveIntegerField(default=0, verbose_name="عدد الحركات")
+    total_seconds = models.BigIntegerField(default=0, verbose_name="إجمالي المدة (ثانية)")
+    max_seconds = models.BigIntegerField(default=0, verbose_name="أطول مدة (ثانية)")
+
+    class Meta:
+        verbose_name = "تجميع مدة حالة"
+        verbose_name_plural = "تجميعات مدد الحالات"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["vendor_company", "request_type", "day", "status"],
+                name="uq_request_status_duration_key"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["vendor_company", "day"]),
+        ]
+
+    def __str__(self):
+        return f"{self.vendor_company_id}/{self.request_type_id} {self.day} :: {self.status}"
+
+
+class RollupCheckpoint(models.Model):
+    """آخر حركة تايم لاين تمت معالجتها لكل تجميع (حتى لا تُقرأ الحركات القديمة مرة أخرى)."""
+    name = models.CharField(max_length=100, unique=True, verbose_name="التجميع")
+    last_event_id = models.BigIntegerField(default=0, verbose_name="آخر حركة معالجة")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="آخر تحديث")
+
+    class Meta:
+        verbose_name = "نقطة تجميع"
+        verbose_name_plural = "نقاط التجميع"
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_event_id}"
+
+
+# =========================
+# Outbox (Side Effects)
+# =========================
+class OutboxMessage(models.Model):
+    """
+    رسالة مؤجلة تُكتب في نفس معاملة تغيير الحالة، وتقوم العملية الخلفية
+    (manage.py process_outbox) بتنفيذها لاحقاً مع إعادة المحاولة عند الفشل.
+    """
+    STATUS_CHOICES = (
+        ("pending", "بانتظار التنفيذ"),
+        ("processing", "قيد التنفيذ"),
+        ("done", "تم التنفيذ"),
+        ("dead", "فشل نهائي"),
+    )
+
+    topic = models.CharField(max_length=100, verbose_name="النوع")
+    payload = models.JSONField(default=dict, blank=True, verbose_name="البيانات")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending", verbose_name="الحالة")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="عدد المحاولات")
+    available_at = models.DateTimeField(default=timezone.now, verbose_name="متاح للتنفيذ من")
+    claimed_by = models.CharField(max_length=64, blank=True, verbose_name="محجوز بواسطة")
+    claimed_at = models.DateTimeField(null=True, blank=True, verbose_name="وقت الحجز")
+    last_error = models.TextField(blank=True, verbose_name="آخر خطأ")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="تاريخ الإنشاء")
+    processed_at = models.DateTimeField(null=True, blank=True, verbose_name="تاريخ التنفيذ")
+
+    class Meta:
+        verbose_name = "رسالة صادرة"
+        verbose_name_plural = "الرسائل الصادرة"
+        indexes = [
+            models.Index(fields=["status", "available_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.topic} #{self.id} ({self.status})"
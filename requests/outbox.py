@@ -0,0 +1,178 @@
+"""
+صندوق الصادر (Transactional Outbox)
+
+- enqueue(): تُستدعى داخل معاملة تغيير الحالة، فتُكتب الرسالة أو تُلغى معها.
+- العملية الخلفية (manage.py process_outbox) تحجز الرسائل على دفعات عبر UPDATE مشروط،
+  لذا يمكن تشغيل أكثر من عملية في نفس الوقت دون تنفيذ الرسالة مرتين.
+- عند الفشل يعاد جدولة الرسالة بتأخير أُسّي (exponential backoff) حتى الحد الأقصى للمحاولات.
+"""
+import logging
+import random
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from notifications.services import fan_out, notify_company_staff
+from .models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 8
+BACKOFF_BASE_SECONDS = 10
+BACKOFF_MAX_SECONDS = 60 * 60
+LEASE_SECONDS = 5 * 60
+
+_handlers = {}
+
+
+class LeaseLost(Exception):
+    """انتهت مهلة الحجز وحجزت عملية أخرى الرسالة أثناء تنفيذها."""
+
+
+def handler(topic):
+    """تسجيل دالة تنفيذ لنوع رسالة معين."""
+    def decorator(func):
+        _handlers[topic] = func
+        return func
+    return decorator
+
+
+def enqueue(topic, **payload):
+    """إضافة رسالة للصادر. يجب استدعاؤها داخل نفس معاملة التغيير الأساسي."""
+    message = OutboxMessage.objects.create(topic=topic, payload=payload)
+    if getattr(settings, "OUTBOX_EAGER", False):
+        # وضع التطوير: التنفيذ مباشرة بعد الـ commit بدون عملية خلفية
+        transaction.on_commit(lambda: process_claimed(claim_batch(ids=[message.pk])))
+    return message
+
+
+def backoff_delay(attempts):
+    delay = min(BACKOFF_BASE_SECONDS * (2 ** (attempts - 1)), BACKOFF_MAX_SECONDS)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def _ready_filter(now, lease_seconds):
+    # الرسائل الجاهزة + الرسائل المحجوزة من عملية توقفت (انتهت مهلة حجزها)
+    return (
+        Q(status="pending", available_at__lte=now)
+        | Q(status="processing", claimed_at__lt=now - timedelta(seconds=lease_seconds))
+    )
+
+
+def claim_batch(batch_size=100, worker_id=None, lease_seconds=LEASE_SECONDS, ids=None):
+    """حجز دفعة من الرسائل لهذه العملية وإرجاعها."""
+    now = timezone.now()
+    worker_id = worker_id or uuid.uuid4().hex
+    ready = _ready_filter(now, lease_seconds)
+
+    candidates = OutboxMessage.objects.filter(ready)
+    if ids is not None:
+        candidates = candidates.filter(pk__in=ids)
+    candidate_ids = list(
+        candidates.order_by("available_at", "id").values_list("id", flat=True)[:batch_size]
+    )
+    if not candidate_ids:
+        return []
+
+    # الـ UPDATE المشروط هو نقطة الحجز: الرسالة التي حجزتها عملية أخرى لن تطابق الشرط
+    OutboxMessage.objects.filter(ready, pk__in=candidate_ids).update(
+        status="processing", claimed_by=worker_id, claimed_at=now,
+    )
+    return list(
+        OutboxMessage.objects
+        .filter(pk__in=candidate_ids, status="processing", claimed_by=worker_id, claimed_at=now)
+        .order_by("available_at", "id")
+    )
+
+
+def process_message(message, max_attempts=MAX_ATTEMPTS):
+    """تنفيذ رسالة محجوزة. ترجع True عند النجاح."""
+    func = _handlers.get(message.topic)
+    try:
+        if func is None:
+            raise LookupError(f"لا يوجد منفذ مسجل لنوع الرسالة: {message.topic}")
+        # التنفيذ وتعليم الرسالة كمنفذة في نفس المعاملة
+        with transaction.atomic():
+            func(**message.payload)
+            marked = OutboxMessage.objects.filter(pk=message.pk, claimed_by=message.claimed_by).update(
+                status="done", processed_at=timezone.now(), attempts=message.attempts + 1, last_error="",
+            )
+            if not marked:
+                # التراجع عن تغييرات المنفذ؛ الرسالة الآن مسؤولية العملية التي حجزتها
+                raise LeaseLost
+        return True
+    except LeaseLost:
+        logger.warning("Outbox message %s (%s) was reclaimed by another worker", message.pk, message.topic)
+        return False
+    except Exception as e:
+        attempts = message.attempts + 1
+        logger.exception("Outbox message %s (%s) failed, attempt %s", message.pk, message.topic, attempts)
+        failed = {"attempts": attempts, "last_error": repr(e)[:2000], "claimed_by": ""}
+        if attempts >= max_attempts:
+            failed["status"] = "dead"
+        else:
+            failed["status"] = "pending"
+            failed["available_at"] = timezone.now() + backoff_delay(attempts)
+        OutboxMessage.objects.filter(pk=message.pk, claimed_by=message.claimed_by).update(**failed)
+        return False
+
+
+def process_claimed(messages, max_attempts=MAX_ATTEMPTS):
+    done = failed = 0
+    for message in messages:
+        if process_message(message, max_attempts=max_attempts):
+            done += 1
+        else:
+            failed += 1
+    return done, failed
+
+
+def drain(batch_size=100, max_attempts=MAX_ATTEMPTS):
+    """تنفيذ كل الرسائل الجاهزة حالياً (مفيدة في الاختبارات وأوامر الصيانة)."""
+    total_done = total_failed = 0
+    while True:
+        batch = claim_batch(batch_size=batch_size)
+        if not batch:
+            return total_done, total_failed
+        done, failed = process_claimed(batch, max_attempts=max_attempts)
+        total_done += done
+        total_failed += failed
+
+
+def purge_processed(older_than_days=7):
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    deleted, _ = OutboxMessage.objects.filter(status="done", processed_at__lt=cutoff).delete()
+    return deleted
+
+
+# =========================
+# Handlers
+# =========================
+@handler("notifications.fan_out")
+def handle_notifications_fan_out(request_id, title, message, user_ids=None, company_id=None):
+    if company_id is not None:
+        notify_company_staff(company_id, request_id, title, message)
+    if user_ids:
+        fan_out(user_ids, request_id, title, message)
+
+
+@handler("images.derivatives")
+def handle_image_derivatives(attachment_ids=(), vendor_ids=()):
+    from vendors.models import Vendor
+    from . import images
+    from .models import RequestAttachment
+
+    sources = [
+        (att.file.storage, att.file.name)
+        for att in RequestAttachment.objects.filter(pk__in=attachment_ids)
+        if att.is_image()
+    ]
+    sources += [
+        (vendor.avatar.storage, vendor.avatar.name)
+        for vendor in Vendor.objects.filter(pk__in=vendor_ids).exclude(avatar="")
+    ]
+    images.generate(sources)
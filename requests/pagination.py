@@ -0,0 +1,153 @@
+"""
+ترحيل بالمؤشر (Keyset / Cursor Pagination)
+
+بدلاً من OFFSET و COUNT(*) الكامل، تُجلب الصفحة التالية بشرط على قيم آخر صف
+في الصفحة الحالية (مثل: created_at < X أو created_at = X و id < Y)،
+فتكون تكلفة الصفحة رقم N مساوية لتكلفة الصفحة الأولى.
+"""
+import base64
+import datetime
+import json
+import uuid
+from decimal import Decimal
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections
+from django.db.models import Q
+
+DEFAULT_ORDERING = ("-created_at", "-id")
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _json_default(value):
+    # isoformat الكامل (DjangoJSONEncoder يقص الميكروثواني فيكسر شرط التساوي)
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, (Decimal, uuid.UUID)):
+        return str(value)
+    raise TypeError(f"Cannot encode {type(value).__name__} in cursor")
+
+
+def encode_cursor(values, direction):
+    raw = json.dumps({"k": values, "d": direction}, default=_json_default, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        values, direction = data["k"], data["d"]
+    except (ValueError, KeyError, TypeError):
+        raise InvalidCursor(token)
+    if direction not in ("n", "p") or not isinstance(values, list):
+        raise InvalidCursor(token)
+    return values, direction
+
+
+class KeysetPage:
+    def __init__(self, object_list, has_next, has_previous, next_cursor, prev_cursor, approx_total=None):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.approx_total = approx_total
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+class KeysetPaginator:
+    """
+    الترتيب يجب أن ينتهي بحقل فريد (مثل id) حتى يكون المؤشر حاسماً.
+    الحقول قد تكون أعمدة في المودل أو قيم annotate.
+    """
+
+    def __init__(self, queryset, per_page, ordering=DEFAULT_ORDERING):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+        self.keys = [(name.lstrip("-"), name.startswith("-")) for name in self.ordering]
+
+    def _to_python(self, name, value):
+        try:
+            field = self.queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return value
+        return field.to_python(value)
+
+    def _values_of(self, obj):
+        return [getattr(obj, name) for name, _ in self.keys]
+
+    def _seek(self, values, forward):
+        """شرط "بعد" (أو "قبل") الصف صاحب القيم values حسب اتجاه الترتيب."""
+        condition = Q()
+        equal = Q()
+        for (name, desc), value in zip(self.keys, values):
+            after = "lt" if desc == forward else "gt"
+            condition |= equal & Q(**{f"{name}__{after}": value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def get_page(self, cursor=None):
+        values, direction = None, "n"
+        if cursor:
+            values, direction = decode_cursor(cursor)
+            if len(values) != len(self.keys):
+                raise InvalidCursor(cursor)
+            values = [self._to_python(name, v) for (name, _), v in zip(self.keys, values)]
+
+        forward = direction == "n"
+        qs = self.queryset
+        if values is not None:
+            qs = qs.filter(self._seek(values, forward))
+        if forward:
+            qs = qs.order_by(*self.ordering)
+        else:
+            qs = qs.order_by(*[name[1:] if name.startswith("-") else f"-{name}" for name in self.ordering])
+
+        rows = list(qs[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not forward:
+            rows.reverse()
+
+        if forward:
+            has_next, has_previous = has_more, values is not None
+        else:
+            has_next, has_previous = True, has_more
+
+        return KeysetPage(
+            rows,
+            has_next=has_next and bool(rows),
+            has_previous=has_previous and bool(rows),
+            next_cursor=encode_cursor(self._values_of(rows[-1]), "n") if rows else None,
+            prev_cursor=encode_cursor(self._values_of(rows[0]), "p") if rows else None,
+        )
+
+
+def approximate_count(queryset):
+    """
+    عدد تقريبي للنتائج من خطة التنفيذ في PostgreSQL (بدون COUNT(*) كامل).
+    يرجع None لقواعد البيانات الأخرى.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    sql, params = queryset.order_by().values("pk").query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
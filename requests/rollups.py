@@ -0,0 +1,121 @@
+"""
+تجميعات SLA: الوقت الذي تقضيه الطلبات في كل حالة
+
+كل حركة تايم لاين تحمل duration_seconds (المدة في الحالة السابقة)، ويتم تجميعها
+تدريجياً في RequestStatusDuration لكل (شركة التوريد، نوع الطلب، اليوم، الحالة).
+المعالجة تبدأ من آخر حركة تمت معالجتها (RollupCheckpoint) فلا تُقرأ الحركات القديمة
+مرة أخرى، وتقارير SLA تُقرأ من جدول التجميع بدلاً من مسح جدول التايم لاين.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max, Sum
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import Request, RequestStatusDuration, RequestTimeline, RollupCheckpoint
+
+CHECKPOINT = "request_status_durations"
+BATCH_SIZE = 5000
+# الحركات الأحدث من هذه المهلة تُؤجل للدورة التالية: معاملة بدأت قبل غيرها قد تُثبت
+# حركة برقم أصغر بعد أن تُقرأ حركات بأرقام أكبر
+SAFETY_LAG = timedelta(minutes=2)
+
+
+def _aggregate(events):
+    """{(vendor_id, type_id, day, status): [count, total, max]} من صفوف الحركات."""
+    totals = defaultdict(lambda: [0, 0, 0])
+    for _, created_at, status, seconds, vendor_id, type_id in events:
+        if seconds is None or not status or vendor_id is None:
+            continue
+        entry = totals[(vendor_id, type_id, timezone.localdate(created_at), status)]
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] = max(entry[2], seconds)
+    return totals
+
+
+def _apply(totals):
+    for (vendor_id, type_id, day, status), (count, total, longest) in totals.items():
+        key = {"vendor_company_id": vendor_id, "request_type_id": type_id, "day": day, "status": status}
+        changes = {
+            "count": F("count") + count,
+            "total_seconds": F("total_seconds") + total,
+            "max_seconds": Greatest("max_seconds", longest),
+        }
+        if RequestStatusDuration.objects.filter(**key).update(**changes):
+            continue
+        try:
+            with transaction.atomic():
+                RequestStatusDuration.objects.create(count=count, total_seconds=total, max_seconds=longest, **key)
+        except IntegrityError:
+            RequestStatusDuration.objects.filter(**key).update(**changes)
+
+
+def process_new_events(batch_size=BATCH_SIZE, lag=SAFETY_LAG):
+    """تجميع حركات التايم لاين الجديدة منذ آخر تشغيل. ترجع عدد الحركات المعالجة."""
+    cutoff = timezone.now() - lag
+    processed = 0
+    while True:
+        with transaction.atomic():
+            checkpoint, _ = RollupCheckpoint.objects.select_for_update().get_or_create(name=CHECKPOINT)
+            events = list(
+                RequestTimeline.objects
+                .filter(id__gt=checkpoint.last_event_id)
+                .order_by("id")
+                .values_list(
+                    "id", "created_at", "old_status", "duration_seconds",
+                    "request__vendor_company_id", "request__request_type_id",
+                )[:batch_size]
+            )
+            # التوقف عند أول حركة أحدث من المهلة (بدون تخطيها)
+            ready = next((i for i, event in enumerate(events) if event[1] >= cutoff), len(events))
+            events = events[:ready]
+            if not events:
+                return processed
+
+            _apply(_aggregate(events))
+            checkpoint.last_event_id = events[-1][0]
+            checkpoint.save(update_fields=["last_event_id", "updated_at"])
+        processed += len(events)
+        if ready < batch_size:
+            return processed
+
+
+def rebuild(batch_size=BATCH_SIZE, lag=SAFETY_LAG):
+    """حذف التجميعات وإعادة حسابها من أول حركة."""
+    with transaction.atomic():
+        RequestStatusDuration.objects.all().delete()
+        RollupCheckpoint.objects.filter(name=CHECKPOINT).delete()
+    return process_new_events(batch_size=batch_size, lag=lag)
+
+
+# =========================
+# Reports
+# =========================
+def vendor_status_durations(vendor_company, days=30):
+    """
+    متوسط وأقصى مدة لكل (نوع الطلب، الحالة) لشركة توريد خلال آخر `days` يوماً.
+    قائمة dict مرتبة بنوع الطلب ثم الحالة (المدد بالساعات).
+    """
+    since = timezone.localdate() - timedelta(days=days)
+    rows = (
+        RequestStatusDuration.objects
+        .filter(vendor_company=vendor_company, day__gt=since)
+        .values("request_type__name", "status")
+        .annotate(count=Sum("count"), total=Sum("total_seconds"), longest=Max("max_seconds"))
+        .order_by("request_type__name", "status")
+    )
+    labels = dict(Request.STATUS_CHOICES)
+    return [
+        {
+            "request_type": row["request_type__name"],
+            "status": row["status"],
+            "status_label": labels.get(row["status"], row["status"]),
+            "count": row["count"],
+            "avg_hours": round(row["total"] / row["count"] / 3600, 1) if row["count"] else 0,
+            "max_hours": round(row["longest"] / 3600, 1),
+        }
+        for row in rows
+    ]
@@ -0,0 +1,364 @@
+"""
+سجل مخططات أنواع الطلبات (Schema Registry)
+
+يقوم بتجميع كل RequestType مع حقوله الديناميكية النشطة في كائن ثابت (immutable)
+يحتوي على: ترتيب الحقول، دوال التحويل (coercers)، التحقق، ومجموعات الخيارات.
+
+- المخطط يُخزَّن داخل العملية (per-process) فلا يُعاد تجميعه بعد أول تحميل.
+- رمز الصلاحية (token) هو RequestType.schema_version في قاعدة البيانات: يزيد في نفس معاملة
+  حفظ/حذف RequestField أو RequestType، فتظهر تعديلات لوحة الإدارة فوراً في كل العمليات
+  (عدة workers) بعد الـ commit. التحقق منه استعلام واحد بالمفتاح الأساسي.
+- حقول choice التي تتجاوز خياراتها CHOICE_OPTIONS_THRESHOLD لا تُحمل خياراتها في المخطط:
+  تُقرأ من جدول RequestFieldOption (بحث وتحقق عبر field_options).
+"""
+import hashlib
+import json
+import threading
+from dataclasses import dataclass, field as dc_field
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from types import MappingProxyType
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import F, Prefetch
+from django.urls import reverse
+from django.utils.dateparse import parse_date
+
+
+DEFAULT_OPTIONS_THRESHOLD = 100
+INVALID_CHOICE_MESSAGE = "القيمة المختارة غير موجودة ضمن الخيارات."
+
+# عمود التخزين المقابل لكل نوع حقل في RequestFieldValue
+VALUE_COLUMNS = {
+    "text": "value_text",
+    "number": "value_number",
+    "date": "value_date",
+    "bool": "value_bool",
+    "choice": "value_text",
+    "json": "value_json",
+}
+
+TRUE_VALUES = frozenset({"true", "1", "yes", "on", "نعم"})
+FALSE_VALUES = frozenset({"false", "0", "no", "off", "لا"})
+
+
+# =========================
+# Coercers
+# =========================
+def coerce_text(raw):
+    return str(raw).strip()
+
+
+def coerce_number(raw):
+    if isinstance(raw, (int, float, Decimal)) and not isinstance(raw, bool):
+        value = Decimal(str(raw))
+    else:
+        try:
+            value = Decimal(str(raw).strip().replace(",", ""))
+        except InvalidOperation:
+            raise ValidationError("قيمة رقمية غير صحيحة.")
+    if not value.is_finite():
+        raise ValidationError("قيمة رقمية غير صحيحة.")
+    # يطابق حدود value_number (max_digits=12, decimal_places=2)
+    value = value.quantize(Decimal("0.01"))
+    if abs(value) >= Decimal("1e10"):
+        raise ValidationError("القيمة الرقمية أكبر من المسموح.")
+    return value
+
+
+def coerce_date(raw):
+    if isinstance(raw, date):
+        return raw
+    try:
+        value = parse_date(str(raw).strip())
+    except ValueError:
+        value = None
+    if value is None:
+        raise ValidationError("صيغة التاريخ غير صحيحة (YYYY-MM-DD).")
+    return value
+
+
+def coerce_bool(raw):
+    if isinstance(raw, bool):
+        return raw
+    normalized = str(raw).strip().lower()
+    if normalized in TRUE_VALUES:
+        return True
+    if normalized in FALSE_VALUES:
+        return False
+    raise ValidationError("قيمة نعم / لا غير صحيحة.")
+
+
+def coerce_json(raw):
+    if not isinstance(raw, str):
+        return raw
+    try:
+        return json.loads(raw)
+    except ValueError:
+        raise ValidationError("بيانات JSON غير صالحة.")
+
+
+COERCERS = {
+    "text": coerce_text,
+    "number": coerce_number,
+    "date": coerce_date,
+    "bool": coerce_bool,
+    "choice": coerce_text,
+    "json": coerce_json,
+}
+
+
+def normalize_choices(raw):
+    """
+    تحويل حقل choices (JSON حر) إلى tuple من أزواج (value, label).
+    الصيغ المدعومة:
+    - ["A", "B"]
+    - [{"value": "a", "label": "A"}, ...]
+    - {"a": "A", "b": "B"}
+    """
+    if not raw:
+        return ()
+    if isinstance(raw, dict):
+        return tuple((str(k), str(v)) for k, v in raw.items())
+    pairs = []
+    for item in raw:
+        if isinstance(item, dict):
+            value = item.get("value", item.get("label"))
+            label = item.get("label", value)
+            if value is None:
+                continue
+            pairs.append((str(value), str(label)))
+        elif isinstance(item, (list, tuple)) and len(item) == 2:
+            pairs.append((str(item[0]), str(item[1])))
+        else:
+            pairs.append((str(item), str(item)))
+    return tuple(pairs)
+
+
+def options_threshold():
+    return getattr(settings, "CHOICE_OPTIONS_THRESHOLD", DEFAULT_OPTIONS_THRESHOLD)
+
+
+def uses_option_table(choices):
+    """هل تُخزن هذه الخيارات (أزواج normalize_choices) في جدول RequestFieldOption؟"""
+    return len(choices) > options_threshold()
+
+
+# =========================
+# Compiled Schema Objects
+# =========================
+@dataclass(frozen=True)
+class FieldSpec:
+    id: int
+    key: str
+    label: str
+    field_type: str
+    is_required: bool
+    help_text: str
+    sort_order: int
+    choices: tuple = ()
+    raw_choices: object = None
+    choice_values: frozenset = frozenset()
+    # الخيارات في جدول RequestFieldOption (قائمة كبيرة): عددها و hash محتواها لرقم الإصدار
+    option_count: int = 0
+    options_digest: str = ""
+
+    @property
+    def uses_options(self):
+        return self.option_count > 0
+
+    @property
+    def column(self):
+        return VALUE_COLUMNS[self.field_type]
+
+    @property
+    def input_name(self):
+        return f"field_{self.id}"
+
+    def is_empty(self, raw):
+        return raw is None or (isinstance(raw, str) and raw.strip() == "")
+
+    def coerce(self, raw):
+        """تحويل القيمة الخام ثم التحقق منها، وترفع ValidationError عند الخطأ."""
+        value = COERCERS[self.field_type](raw)
+        self.validate(value)
+        return value
+
+    def validate(self, value):
+        # خيارات الجدول تُتحقق منها دفعة واحدة (field_options.missing_options)
+        if self.field_type == "choice" and self.choice_values and value not in self.choice_values:
+            raise ValidationError(INVALID_CHOICE_MESSAGE)
+
+    def as_dict(self):
+        """الشكل المستخدم في واجهة get-fields (الشكل القديم + key لأعمدة ملفات الاستيراد)."""
+        return {
+            "id": self.id,
+            "key": self.key,
+            "label": self.label,
+            "field_type": self.field_type,
+            "is_required": self.is_required,
+            "help_text": self.help_text,
+            "choices": self.raw_choices,
+            # للقوائم الكبيرة: choices = null والخيارات من واجهة البحث
+            "option_count": self.option_count,
+            "options_url": reverse("requests:field_options", args=[self.id]) if self.uses_options else None,
+        }
+
+
+@dataclass(frozen=True)
+class RequestSchema:
+    type_id: int
+    code: str
+    name: str
+    is_active: bool
+    fields: tuple
+    token: str
+    version: str = ""
+    by_id: MappingProxyType = dc_field(default_factory=lambda: MappingProxyType({}))
+    by_key: MappingProxyType = dc_field(default_factory=lambda: MappingProxyType({}))
+
+    def __iter__(self):
+        return iter(self.fields)
+
+    def __len__(self):
+        return len(self.fields)
+
+    def as_list(self):
+        return [f.as_dict() for f in self.fields]
+
+
+def compile_schema(request_type, fields, token):
+    specs = []
+    for f in fields:
+        choices = normalize_choices(f.choices) if f.field_type == "choice" else ()
+        raw_choices = f.choices
+        option_count, options_digest = 0, ""
+        if uses_option_table(choices):
+            option_count = len(choices)
+            options_digest = hashlib.sha1(
+                json.dumps(choices, ensure_ascii=False).encode("utf-8")
+            ).hexdigest()[:16]
+            choices, raw_choices = (), None
+        specs.append(FieldSpec(
+            id=f.id,
+            key=f.key,
+            label=f.label,
+            field_type=f.field_type,
+            is_required=f.is_required,
+            help_text=f.help_text,
+            sort_order=f.sort_order,
+            choices=choices,
+            raw_choices=raw_choices,
+            choice_values=frozenset(v for v, _ in choices),
+            option_count=option_count,
+            options_digest=options_digest,
+        ))
+    specs.sort(key=lambda s: (s.sort_order, s.id))
+    specs = tuple(specs)
+
+    # رقم الإصدار مبني على محتوى المخطط نفسه ليكون ثابتاً بين العمليات
+    payload = json.dumps(
+        [request_type.code, request_type.is_active, [[s.as_dict(), s.options_digest] for s in specs]],
+        sort_keys=True, ensure_ascii=False, default=str,
+    )
+    version = hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+    return RequestSchema(
+        type_id=request_type.id,
+        code=request_type.code,
+        name=request_type.name,
+        is_active=request_type.is_active,
+        fields=specs,
+        token=token,
+        version=version,
+        by_id=MappingProxyType({s.id: s for s in specs}),
+        by_key=MappingProxyType({s.key: s for s in specs}),
+    )
+
+
+# =========================
+# Registry
+# =========================
+class SchemaRegistry:
+    def __init__(self):
+        self._schemas = {}
+        self._lock = threading.Lock()
+
+    def _current_tokens(self, type_ids):
+        """{type_id: schema_version} باستعلام واحد؛ الأنواع غير الموجودة لا تظهر."""
+        from .models import RequestType
+
+        return dict(RequestType.objects.filter(pk__in=list(type_ids)).values_list("pk", "schema_version"))
+
+    def _load(self, tokens):
+        from .models import RequestType, RequestField
+
+        request_types = (
+            RequestType.objects
+            .filter(pk__in=list(tokens))
+            .prefetch_related(Prefetch(
+                "fields",
+                queryset=RequestField.objects.filter(is_active=True).order_by("sort_order", "id"),
+                to_attr="active_fields",
+            ))
+        )
+        schemas = {
+            request_type.id: compile_schema(request_type, request_type.active_fields, tokens[request_type.id])
+            for request_type in request_types
+        }
+        with self._lock:
+            self._schemas.update(schemas)
+        return schemas
+
+    def get(self, type_id):
+        """إرجاع المخطط المجمّع لنوع الطلب، أو None إذا لم يكن موجوداً."""
+        type_id = int(type_id)
+        token = self._current_tokens([type_id]).get(type_id)
+        if token is None:
+            return None
+        cached = self._schemas.get(type_id)
+        if cached is not None and cached.token == token:
+            return cached
+        return self._load({type_id: token}).get(type_id)
+
+    def get_many(self, type_ids):
+        """{type_id: المخطط} لعدة أنواع؛ استعلام للإصدارات، والأنواع غير المخزنة تُحمّل معاً في استعلامين."""
+        type_ids = {int(type_id) for type_id in type_ids}
+        tokens = self._current_tokens(type_ids)
+        schemas = {}
+        for type_id, token in tokens.items():
+            cached = self._schemas.get(type_id)
+            if cached is not None and cached.token == token:
+                schemas[type_id] = cached
+        missing = {type_id: token for type_id, token in tokens.items() if type_id not in schemas}
+        if missing:
+            schemas.update(self._load(missing))
+        return schemas
+
+    def invalidate(self, type_id):
+        from .models import RequestType
+
+        type_id = int(type_id)
+        RequestType.objects.filter(pk=type_id).update(schema_version=F("schema_version") + 1)
+        with self._lock:
+            self._schemas.pop(type_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._schemas.clear()
+
+
+registry = SchemaRegistry()
+
+
+def get_schema(type_id):
+    return registry.get(type_id)
+
+
+def get_schemas(type_ids):
+    return registry.get_many(type_ids)
+
+
+def invalidate_schema(type_id):
+    registry.invalidate(type_id)
@@ -0,0 +1,208 @@
+"""
+البحث النصي في الطلبات (Full-Text Search)
+
+لكل طلب صف في RequestSearchDocument يجمع النصوص القابلة للبحث، ويُحدَّث عند
+إنشاء الطلب أو تعديله أو تعديل بيانات العامل.
+
+- PostgreSQL: فهرس GIN على to_tsvector('simple', document) للمطابقة بالكلمات
+  (مع البحث بالبادئة)، وفهرس GIN بـ pg_trgm لتحمّل الأخطاء الإملائية (المعامل %>، وحدّه
+  من إعداد pg_trgm.word_similarity_threshold في قاعدة البيانات)، والترتيب بالصلة.
+- SQLite: جدول FTS5 (requests_search_fts) بنفس المحتوى، والترتيب بـ bm25.
+- غير ذلك: icontains على نص البحث كحل احتياطي.
+"""
+import re
+from itertools import islice
+
+from django.db import connections
+from django.db.models import Case, F, FloatField, Q, Value, When
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast, Coalesce
+
+from .field_values import read_field_values, with_field_values
+from .models import Request, RequestSearchDocument
+from .schema import get_schema, get_schemas
+
+FTS_TABLE = "requests_search_fts"
+BATCH_SIZE = 500
+# أولوية مطابقة رقم الطلب على أي مطابقة نصية
+ID_MATCH_BOOST = 1000.0
+# قيم نعم / لا و JSON لا تُضاف لنص البحث
+UNSEARCHABLE_FIELD_TYPES = frozenset({"bool", "json"})
+
+_TASHKEEL = re.compile(r"[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]")
+_ARABIC_FOLD = str.maketrans({"أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا", "ى": "ي", "ة": "ه", "ؤ": "و", "ئ": "ي"})
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def normalize_text(text):
+    """توحيد أشكال الحروف العربية وحذف التشكيل حتى تتطابق "أحمد" و"احمد"."""
+    return _TASHKEEL.sub("", str(text)).translate(_ARABIC_FOLD).lower()
+
+
+def tokenize(query):
+    return _TOKEN.findall(normalize_text(query))
+
+
+# =========================
+# Index Maintenance
+# =========================
+def build_document(req, schema=None):
+    """
+    يتوقع أن الطلب محمّل مع worker و request_type وقيم الحقول (with_field_values).
+    """
+    parts = [req.pk, req.title, req.notes, req.request_type.name]
+    if req.worker_id:
+        parts += [req.worker.full_name, req.worker.iqama_number]
+    schema = schema or get_schema(req.request_type_id)
+    for field_id, value in read_field_values(req, schema).items():
+        if schema.by_id[field_id].field_type not in UNSEARCHABLE_FIELD_TYPES:
+            parts.append(value)
+    return normalize_text(" ".join(str(part) for part in parts if part not in (None, "")))
+
+
+_fts_tables = {}
+
+
+def _has_fts_table(connection):
+    if connection.vendor != "sqlite":
+        return False
+    key = (connection.alias, connection.settings_dict["NAME"])
+    if key not in _fts_tables:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=%s", [FTS_TABLE])
+            _fts_tables[key] = cursor.fetchone() is not None
+    return _fts_tables[key]
+
+
+def _sync_fts(connection, documents):
+    ids = [doc.request_id for doc in documents]
+    placeholders = ", ".join(["%s"] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", ids)
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE} (rowid, document) VALUES (%s, %s)",
+            [(doc.request_id, doc.document) for doc in documents],
+        )
+
+
+def refresh_documents(request_ids, batch_size=BATCH_SIZE):
+    """إعادة بناء نصوص البحث للطلبات المحددة على دفعات. ترجع عدد الطلبات."""
+    qs = with_field_values(
+        Request.objects
+        .filter(pk__in=request_ids)
+        .select_related("worker", "request_type")
+        .order_by("pk")
+    )
+    connection = connections[qs.db]
+    use_fts = _has_fts_table(connection)
+    total = 0
+    iterator = qs.iterator(chunk_size=batch_size)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return total
+        # المخططات مرة واحدة لكل دفعة (وليس لكل طلب)
+        schemas = get_schemas({req.request_type_id for req in batch})
+        documents = [
+            RequestSearchDocument(request=req, document=build_document(req, schemas[req.request_type_id]))
+            for req in batch
+        ]
+        RequestSearchDocument.objects.bulk_create(
+            documents, update_conflicts=True,
+            unique_fields=["request"], update_fields=["document", "updated_at"],
+        )
+        if use_fts:
+            _sync_fts(connection, documents)
+        total += len(documents)
+
+
+def refresh_document(req):
+    refresh_documents([req.pk])
+
+
+def remove_documents(request_ids):
+    """حذف صفوف FTS5 (صفوف RequestSearchDocument تُحذف بالـ CASCADE)."""
+    connection = connections[Request.objects.db]
+    if request_ids and _has_fts_table(connection):
+        placeholders = ", ".join(["%s"] * len(request_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", list(request_ids))
+
+
+def rebuild(batch_size=BATCH_SIZE):
+    ids = Request.objects.order_by().values_list("pk", flat=True)
+    return refresh_documents(ids, batch_size=batch_size)
+
+
+# =========================
+# Query
+# =========================
+def _id_match(tokens):
+    # البحث برقم الطلب مباشرة (مثل "125" أو "#125")
+    if len(tokens) == 1 and tokens[0].isdigit() and len(tokens[0]) < 10:
+        return int(tokens[0])
+    return None
+
+
+def _postgres_search(qs, q, tokens):
+    from django.contrib.postgres.lookups import TrigramWordSimilar
+    from django.contrib.postgres.search import (
+        SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity,
+    )
+
+    text = normalize_text(q)
+    vector = SearchVector("search_document__document", config="simple")
+    # كل كلمة تُطابق كبادئة: "احم" تجد "احمد"
+    query = SearchQuery(" & ".join(f"{token}:*" for token in tokens), config="simple", search_type="raw")
+    qs = qs.annotate(search_vector=vector)
+    # الشرطان (@@ و %>) يُخدمان من فهرسي GIN؛ التشابه يُحسب للترتيب فقط على الصفوف المطابقة
+    # (django.contrib.postgres غير مضاف لـ INSTALLED_APPS، فالـ lookup يُستخدم كتعبير مباشرة)
+    similarity = TrigramWordSimilarity(text, "search_document__document")
+    return qs, (
+        Q(search_vector=query) | Q(TrigramWordSimilar(F("search_document__document"), Value(text))),
+        Cast(SearchRank(vector, query), FloatField()) + Cast(similarity, FloatField()),
+    )
+
+
+def _sqlite_search(qs, tokens):
+    match = " ".join('"{}"*'.format(token.replace('"', "")) for token in tokens)
+    table = Request._meta.db_table
+    matched_ids = RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match])
+    rank = RawSQL(
+        f'SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid = "{table}"."id"',
+        [match], output_field=FloatField(),
+    )
+    return qs, (Q(pk__in=matched_ids), Coalesce(rank, Value(0.0)))
+
+
+def _fallback_search(qs, tokens):
+    condition = Q()
+    for token in tokens:
+        condition &= Q(search_document__document__icontains=token)
+    return qs, (condition, Value(0.0, output_field=FloatField()))
+
+
+def search_requests(qs, q):
+    """
+    تصفية الطلبات حسب نص البحث q مع إضافة search_rank للترتيب بالصلة:
+        qs = search_requests(qs, q).order_by("-search_rank", "-id")
+    """
+    tokens = tokenize(q)
+    if not tokens:
+        return qs.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    connection = connections[qs.db]
+    if connection.vendor == "postgresql":
+        qs, (condition, rank) = _postgres_search(qs, q, tokens)
+    elif _has_fts_table(connection):
+        qs, (condition, rank) = _sqlite_search(qs, tokens)
+    else:
+        qs, (condition, rank) = _fallback_search(qs, tokens)
+
+    request_id = _id_match(tokens)
+    if request_id is not None:
+        condition |= Q(pk=request_id)
+        rank = rank + Case(
+            When(pk=request_id, then=Value(ID_MATCH_BOOST)), default=Value(0.0), output_field=FloatField(),
+        )
+    return qs.filter(condition).annotate(search_rank=rank)
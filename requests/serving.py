@@ -0,0 +1,149 @@
+"""
+إرسال ملفات المرفقات بعد التحقق من الصلاحية
+
+ATTACHMENT_SERVE_MODE:
+- "django" (الافتراضي): Django يرسل الملف مع دعم Range (تحميل جزئي / استكمال)،
+  و ETag و If-None-Match / If-Modified-Since (استجابة 304).
+- "nginx": ترويسة X-Accel-Redirect إلى ATTACHMENT_ACCEL_PREFIX + المسار، ويرسل nginx الملف
+  من location داخلي (internal) فلا يمكن الوصول له مباشرة.
+- "sendfile": ترويسة X-Sendfile بالمسار الكامل (Apache mod_xsendfile / lighttpd).
+
+الملفات المخزنة حسب المحتوى (blobs/ و avatars/ والنسخ المصغرة في derivatives/) لا يتغير
+محتواها أبداً (المسار مبني على الـ hash)، فتُخزن في المتصفح لمدة طويلة (immutable).
+
+الملفات تُعرض داخل المتصفح (inline) فقط لأنواع INLINE_TYPES، وغيرها (HTML، SVG، ...)
+يُرسل كتحميل دائماً حتى لا يُنفذ محتوى رفعه مستخدم على نطاق التطبيق.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date
+
+from .images import DERIVATIVE_DIR
+from .storage import AVATAR_DIR, BLOB_DIR, blob_digest
+
+CHUNK_SIZE = 64 * 1024
+IMMUTABLE_CACHE = "private, max-age=31536000, immutable"
+REVALIDATE_CACHE = "private, no-cache"
+INLINE_TYPES = frozenset({"image/jpeg", "image/png", "image/gif", "image/webp", "application/pdf"})
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def is_immutable(name):
+    return name.startswith((f"{BLOB_DIR}/", f"{AVATAR_DIR}/", f"{DERIVATIVE_DIR}/"))
+
+
+def _cache_control(name):
+    return IMMUTABLE_CACHE if is_immutable(name) else REVALIDATE_CACHE
+
+
+def _etag(name, stat):
+    if name.startswith((f"{BLOB_DIR}/", f"{AVATAR_DIR}/")):
+        return f'"{blob_digest(name)}"'
+    return f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+
+
+def _parse_range(header, size):
+    """
+    (start, end) لنطاق واحد، أو None لإرسال الملف كاملاً، أو False إذا كان النطاق غير قابل للتحقيق.
+    النطاقات المتعددة تُتجاهل ويُرسل الملف كاملاً (مسموح حسب RFC 9110).
+    """
+    match = _RANGE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # آخر N بايت
+        length = int(last)
+        if length == 0:
+            return False
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _iter_range(path, start, end):
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _common_headers(response, name, filename, content_type, as_attachment, etag, stat):
+    response["Content-Type"] = content_type
+    response["Content-Disposition"] = content_disposition_header(as_attachment, filename)
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(stat.st_mtime)
+    response["Cache-Control"] = _cache_control(name)
+    response["Accept-Ranges"] = "bytes"
+    response["X-Content-Type-Options"] = "nosniff"
+    if not as_attachment:
+        # عرض PDF داخل المتصفح بدون سكربتات أو وصول لجلسة التطبيق
+        response["Content-Security-Policy"] = "sandbox"
+    return response
+
+
+def serve_file(request, storage, name, filename, as_attachment=False):
+    """
+    استجابة HTTP لملف محفوظ في storage (FileSystemStorage) بعد التحقق من الصلاحية في الـ view.
+    ترفع FileNotFoundError إذا لم يكن الملف موجوداً.
+    """
+    path = storage.path(name)
+    stat = os.stat(path)
+    etag = _etag(name, stat)
+    content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    as_attachment = as_attachment or content_type not in INLINE_TYPES
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if not_modified is not None:
+        if not_modified.status_code == 304:
+            not_modified["Cache-Control"] = _cache_control(name)
+        return not_modified
+
+    mode = getattr(settings, "ATTACHMENT_SERVE_MODE", "django")
+    if mode in ("nginx", "sendfile"):
+        response = HttpResponse()
+        if mode == "nginx":
+            prefix = getattr(settings, "ATTACHMENT_ACCEL_PREFIX", "/protected-media/")
+            response["X-Accel-Redirect"] = prefix.rstrip("/") + "/" + quote(name)
+        else:
+            response["X-Sendfile"] = path
+        # خادم الويب يضيف Content-Length ويتعامل مع Range
+        return _common_headers(response, name, filename, content_type, as_attachment, etag, stat)
+
+    byte_range = None
+    range_header = request.META.get("HTTP_RANGE")
+    # If-Range: النطاق صالح فقط إذا لم يتغير الملف منذ التحميل الجزئي السابق
+    if range_header and request.META.get("HTTP_IF_RANGE", etag) == etag:
+        byte_range = _parse_range(range_header, stat.st_size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{stat.st_size}"
+        return response
+
+    if byte_range is None:
+        response = FileResponse(open(path, "rb"))
+        response["Content-Length"] = str(stat.st_size)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(_iter_range(path, start, end), status=206)
+        response["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+        response["Content-Length"] = str(end - start + 1)
+    return _common_headers(response, name, filename, content_type, as_attachment, etag, stat)
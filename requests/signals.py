@@ -0,0 +1,89 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .counters import reassign_vendor, record_deleted
+from .field_options import sync_options
+from .images import missing_derivatives
+from .models import Request, RequestAttachment, RequestType, RequestField
+from .outbox import enqueue
+from .schema import invalidate_schema
+from .search import refresh_documents, remove_documents
+from .storage import acquire, release
+from vendors.models import Vendor, Worker
+
+
+# زيادة schema_version في نفس معاملة التعديل: العمليات الأخرى ترى الإصدار الجديد مع البيانات الجديدة بعد الـ commit
+@receiver(post_save, sender=RequestType)
+def invalidate_request_type_schema(sender, instance, **kwargs):
+    invalidate_schema(instance.pk)
+    # حتى لا يعيد حفظ نفس الكائن لاحقاً كتابة الإصدار القديم
+    instance.refresh_from_db(fields=["schema_version"])
+
+
+@receiver(post_delete, sender=RequestType)
+def forget_request_type_schema(sender, instance, **kwargs):
+    invalidate_schema(instance.pk)
+
+
+@receiver(post_save, sender=RequestField)
+@receiver(post_delete, sender=RequestField)
+def invalidate_request_field_schema(sender, instance, **kwargs):
+    invalidate_schema(instance.request_type_id)
+
+
+@receiver(post_save, sender=RequestField)
+def sync_request_field_options(sender, instance, **kwargs):
+    # القوائم الكبيرة تُنسخ لجدول الخيارات في نفس معاملة الحفظ (قبل إلغاء المخطط بعد الـ commit)
+    if not kwargs.get("raw"):
+        sync_options(instance)
+
+
+@receiver(post_delete, sender=Request)
+def decrement_request_counter(sender, instance, **kwargs):
+    record_deleted(instance)
+
+
+@receiver(post_delete, sender=Request)
+def remove_request_search_document(sender, instance, **kwargs):
+    remove_documents([instance.pk])
+
+
+@receiver(post_save, sender=Worker)
+def sync_worker_requests(sender, instance, created, **kwargs):
+    changed = set() if created else instance.changed_tracked_fields()
+    update_fields = kwargs.get("update_fields")
+    if update_fields is not None:
+        changed &= {Worker._meta.get_field(name).attname for name in update_fields}
+    instance.reset_tracked_fields()
+    if "vendor_id" in changed:
+        # نقل العامل لمورد آخر ينقل طلباته (وعداداتها) لشركة التوريد الجديدة
+        vendor_company_id = Vendor.objects.filter(pk=instance.vendor_id).values_list("company_id", flat=True).first()
+        reassign_vendor(Request.objects.filter(worker=instance), vendor_company_id)
+    if changed & {"full_name", "iqama_number"}:
+        # اسم العامل ورقم الإقامة جزء من نص البحث لطلباته
+        refresh_documents(instance.requests.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=RequestAttachment)
+def acquire_attachment_blob(sender, instance, created, **kwargs):
+    if created and instance.file:
+        acquire(instance.file.name, content=instance.file)
+
+
+@receiver(post_save, sender=RequestAttachment)
+def queue_attachment_derivatives(sender, instance, created, **kwargs):
+    # النسخ المصغرة تُولد في العملية الخلفية (process_outbox)
+    if created and instance.file and instance.is_image():
+        enqueue("images.derivatives", attachment_ids=[instance.pk])
+
+
+@receiver(post_save, sender=Vendor)
+def queue_avatar_derivatives(sender, instance, **kwargs):
+    if instance.avatar and not kwargs.get("raw") and missing_derivatives(instance.avatar.storage, instance.avatar.name):
+        enqueue("images.derivatives", vendor_ids=[instance.pk])
+
+
+@receiver(post_delete, sender=RequestAttachment)
+def release_attachment_blob(sender, instance, **kwargs):
+    if instance.file:
+        release(instance.file.name)
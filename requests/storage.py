@@ -0,0 +1,240 @@
+"""
+تخزين المرفقات حسب المحتوى (Content-Addressed)
+
+يُحسب sha256 للملف أثناء كتابته على القرص (بدون قراءة ثانية)، ويُحفظ مرة واحدة فقط في:
+    blobs/<أول حرفين>/<الحرفان التاليان>/<sha256><الامتداد>
+فالملف نفسه المرفوع لعدة طلبات لا يتكرر، وعدد الملفات في كل مجلد يبقى محدوداً.
+
+كل ملف له صف في AttachmentBlob بعدد المرفقات التي تشير إليه (ref_count)؛
+يزيد عند إنشاء مرفق وينقص عند حذفه، ويُحذف الملف من القرص عندما يصل العدد إلى صفر
+(مع قفل صف الملف حتى لا يتعارض الحذف مع مرفق جديد بنفس المحتوى).
+"""
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+BLOB_DIR = "blobs"
+AVATAR_DIR = "avatars"
+MAX_EXTENSION_LENGTH = 10
+
+
+def blob_path(digest, extension="", blob_dir=BLOB_DIR):
+    return f"{blob_dir}/{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+
+
+def is_blob_path(name):
+    return name.startswith(f"{BLOB_DIR}/")
+
+
+def blob_digest(name):
+    return os.path.splitext(os.path.basename(name))[0]
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    FileSystemStorage يتجاهل الاسم المقترح من upload_to (يُستخدم امتداده فقط)
+    ويُرجع مسار الملف حسب محتواه داخل blob_dir.
+    """
+
+    def __init__(self, blob_dir=BLOB_DIR, **kwargs):
+        self.blob_dir = blob_dir
+        super().__init__(**kwargs)
+
+    def get_available_name(self, name, max_length=None):
+        # المسار النهائي يُحدد من المحتوى في _save، فلا حاجة لإضافة لاحقة للأسماء المكررة
+        return name
+
+    def _extension(self, name):
+        extension = os.path.splitext(self.get_valid_name(os.path.basename(name)))[1].lower()
+        return extension if len(extension) <= MAX_EXTENSION_LENGTH else ""
+
+    def _save(self, name, content):
+        temp_dir = self.path(f"{self.blob_dir}/tmp")
+        os.makedirs(temp_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=temp_dir)
+        try:
+            with os.fdopen(fd, "wb") as temp:
+                if hasattr(content, "seek"):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temp.write(chunk)
+
+            final_name = blob_path(digest.hexdigest(), self._extension(name), self.blob_dir)
+            final_path = self.path(final_name)
+            if os.path.exists(final_path):
+                # نفس المحتوى محفوظ مسبقاً؛ تحديث وقت التعديل حتى لا يحذفه تنظيف الملفات
+                # غير المستخدمة قبل اعتماد صف المرفق الجديد
+                os.remove(temp_path)
+                os.utime(final_path)
+                return final_name
+
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            if self.file_permissions_mode is not None:
+                os.chmod(temp_path, self.file_permissions_mode)
+            # نقل ذري داخل نفس نظام الملفات: لا يظهر ملف ناقص في المسار النهائي
+            os.replace(temp_path, final_path)
+            return final_name
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+
+attachment_storage = ContentAddressedStorage()
+# صور شركات التوريد (وضع التخزين المحلي بدلاً من Cloudinary)، بدون عدّاد مراجع
+avatar_storage = ContentAddressedStorage(blob_dir=AVATAR_DIR)
+
+
+def get_attachment_storage():
+    return attachment_storage
+
+
+def get_avatar_storage():
+    return avatar_storage
+
+
+# =========================
+# Reference Counting
+# =========================
+def _blob_size(name):
+    return attachment_storage.size(name) if attachment_storage.exists(name) else 0
+
+
+def acquire(name, size=None, content=None):
+    """
+    زيادة عدد المراجع لملف (وإنشاء صفه عند أول استخدام).
+    content: محتوى الملف لإعادة كتابته إذا حُذف من القرص بعد أن وجده _save وقبل أخذ المرجع.
+    """
+    from .models import AttachmentBlob
+
+    if not is_blob_path(name):
+        return
+    # UPDATE ينتظر قفل الصف إذا كان release يحذف الملف الآن
+    if not AttachmentBlob.objects.filter(path=name).update(ref_count=F("ref_count") + 1):
+        if size is None:
+            size = _blob_size(name)
+        try:
+            with transaction.atomic():
+                AttachmentBlob.objects.create(path=name, sha256=blob_digest(name), size=size, ref_count=1)
+        except IntegrityError:
+            AttachmentBlob.objects.filter(path=name).update(ref_count=F("ref_count") + 1)
+    if content is not None and not attachment_storage.exists(name):
+        # الاسم يُشتق من المحتوى فيُعاد الملف إلى نفس المسار
+        attachment_storage.save(name, content)
+
+
+def _delete_unreferenced(name):
+    from .models import AttachmentBlob
+
+    # الصف مقفل حتى نهاية الحذف: acquire المتزامن ينتظر ثم يجد الصف محذوفاً فيعيد كتابة الملف،
+    # أو يسبقنا فيرتفع العدد ولا يُحذف شيء
+    with transaction.atomic():
+        blob = AttachmentBlob.objects.select_for_update().filter(path=name).first()
+        if blob is None or blob.ref_count > 0:
+            return
+        attachment_storage.delete(name)
+        blob.delete()
+
+
+def release(name):
+    """إنقاص عدد المراجع، وحذف الملف بعد الـ commit إذا لم يعد أي مرفق يشير إليه."""
+    from .models import AttachmentBlob
+
+    if not is_blob_path(name):
+        return
+    with transaction.atomic():
+        blob = AttachmentBlob.objects.select_for_update().filter(path=name).first()
+        if blob is None or blob.ref_count == 0:
+            return
+        blob.ref_count -= 1
+        blob.save(update_fields=["ref_count"])
+        if blob.ref_count == 0:
+            # يبقى الصف بعدد صفر حتى يُحذف مع الملف تحت نفس القفل
+            transaction.on_commit(lambda: _delete_unreferenced(name))
+
+
+def rebuild_refcounts():
+    """إعادة حساب ref_count لكل الملفات من جدول المرفقات. ترجع عدد الملفات المستخدمة."""
+    from .models import AttachmentBlob, RequestAttachment
+
+    counts = dict(
+        RequestAttachment.objects.filter(file__startswith=f"{BLOB_DIR}/")
+        .order_by().values_list("file").annotate(n=Count("id"))
+    )
+    with transaction.atomic():
+        AttachmentBlob.objects.exclude(path__in=list(counts)).update(ref_count=0)
+        for path, count in counts.items():
+            if not AttachmentBlob.objects.filter(path=path).update(ref_count=count):
+                AttachmentBlob.objects.create(
+                    path=path, sha256=blob_digest(path), size=_blob_size(path), ref_count=count,
+                )
+    return len(counts)
+
+
+# =========================
+# Legacy Files
+# =========================
+LEGACY_DIR = "request_docs"
+
+
+def remove_empty_dirs(root):
+    for current, _, _ in os.walk(root, topdown=False):
+        if current != root and not os.listdir(current):
+            try:
+                os.rmdir(current)
+            except OSError:
+                # أُضيف ملف أثناء المسح
+                pass
+
+
+def migrate_legacy_files(batch_size=500, dry_run=False, keep_originals=False):
+    """
+    نقل مرفقات request_docs/ إلى التخزين حسب المحتوى.
+    ترجع dict: converted، missing، bytes_before (حجم الملفات القديمة)، bytes_added (الجديد فعلياً على القرص).
+    """
+    from django.core.files import File
+
+    from .models import AttachmentBlob, RequestAttachment
+
+    stats = {"converted": 0, "missing": 0, "bytes_before": 0, "bytes_added": 0}
+    last_id = 0
+    while True:
+        batch = list(
+            RequestAttachment.objects.filter(pk__gt=last_id)
+            .exclude(file__startswith=f"{BLOB_DIR}/")
+            .order_by("pk").values_list("pk", "file", "original_name")[:batch_size]
+        )
+        if not batch:
+            break
+        last_id = batch[-1][0]
+        for pk, old_name, original_name in batch:
+            if not old_name or not attachment_storage.exists(old_name):
+                stats["missing"] += 1
+                continue
+            size = attachment_storage.size(old_name)
+            stats["bytes_before"] += size
+            stats["converted"] += 1
+            if dry_run:
+                continue
+
+            with attachment_storage.open(old_name, "rb") as f:
+                new_name = attachment_storage.save(old_name, File(f))
+            with transaction.atomic():
+                if not AttachmentBlob.objects.filter(path=new_name).exists():
+                    stats["bytes_added"] += size
+                RequestAttachment.objects.filter(pk=pk, file=old_name).update(
+                    file=new_name, original_name=original_name or os.path.basename(old_name)[:255],
+                )
+                acquire(new_name, size)
+            if not keep_originals and not RequestAttachment.objects.filter(file=old_name).exists():
+                attachment_storage.delete(old_name)
+
+    if not dry_run and not keep_originals and os.path.isdir(attachment_storage.path(LEGACY_DIR)):
+        remove_empty_dirs(attachment_storage.path(LEGACY_DIR))
+    return stats
@@ -0,0 +1,194 @@
+"""
+أدوات الاستجابات المتدفقة (Streaming)
+
+تُبنى الملفات (CSV / XLSX / ZIP) قطعة قطعة أثناء الإرسال بدل تجهيزها كاملة في الذاكرة،
+فيبقى استهلاك الذاكرة ثابتاً مهما كان حجم الملف.
+"""
+import csv
+import datetime
+import re
+import zipfile
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+CHUNK_SIZE = 64 * 1024
+
+
+class StreamBuffer:
+    """ملف للكتابة فقط بدون seek: يجمع ما يُكتب ليُرسل ثم يُفرغ."""
+
+    def __init__(self):
+        self._chunks = []
+        self.pending = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self.pending += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        self.pending = 0
+        return data
+
+
+def stream_zip(entries, compression=zipfile.ZIP_DEFLATED):
+    """
+    إنتاج ملف ZIP متدفق.
+    entries: (الاسم، قطع البيانات bytes، ضغط؟) — ضغط=False يخزّن الملف كما هو (STORED)
+    وهو الأنسب للصيغ المضغوطة أصلاً (JPEG / PNG / PDF ...).
+    """
+    buffer = StreamBuffer()
+    # بدون seek يكتب zipfile حجم كل ملف في data descriptor بعد محتواه
+    with zipfile.ZipFile(buffer, mode="w", compression=compression, allowZip64=True) as archive:
+        for name, chunks, compress in entries:
+            info = zipfile.ZipInfo(name)
+            info.compress_type = compression if compress else zipfile.ZIP_STORED
+            info.external_attr = 0o644 << 16
+            with archive.open(info, mode="w", force_zip64=True) as target:
+                for chunk in chunks:
+                    target.write(chunk)
+                    if buffer.pending >= CHUNK_SIZE:
+                        yield buffer.pop()
+            yield buffer.pop()
+    yield buffer.pop()
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+# النص الذي يبدأ بأحد هذه الأحرف ينفذه Excel كمعادلة عند فتح ملف CSV (CSV injection)
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def csv_safe(value):
+    """إضافة ' قبل النصوص التي تبدأ كمعادلة؛ الأرقام والتواريخ تبقى كما هي."""
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def stream_csv(header, rows):
+    """CSV بترميز UTF-8 مع BOM (حتى يفتح Excel النص العربي بشكل صحيح)."""
+    writer = csv.writer(_Echo())
+    yield "\ufeff".encode("utf-8") + writer.writerow([csv_safe(v) for v in header]).encode("utf-8")
+    for row in rows:
+        yield writer.writerow([csv_safe(v) for v in row]).encode("utf-8")
+
+
+# =========================
+# XLSX
+# =========================
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<bookViews><workbookView/></bookViews>'
+    '<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+# نمط 1: تنسيق التاريخ المدمج (numFmtId 14) لخلايا التواريخ الرقمية
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="1"><font/></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border/></borders>'
+    '<cellStyleXfs count="1"><xf/></cellStyleXfs>'
+    '<cellXfs count="2"><xf/><xf numFmtId="14" applyNumberFormat="1"/></cellXfs>'
+    '</styleSheet>'
+)
+_DATE_STYLE = 1
+# اليوم صفر في تواريخ Excel (نظام 1900)
+_EXCEL_EPOCH = datetime.date(1899, 12, 30)
+_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<sheetViews><sheetView workbookViewId="0" rightToLeft="1"/></sheetViews>'
+    '<sheetData>'
+)
+_SHEET_END = '</sheetData></worksheet>'
+
+
+# أحرف التحكم غير المسموحة في XML 1.0؛ حرف واحد منها يجعل الملف كله غير قابل للفتح
+_XML_INVALID = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+
+def xml_text(value):
+    return escape(_XML_INVALID.sub("", str(value)))
+
+
+def _xlsx_cell(value):
+    if value is None or value == "":
+        return "<c/>"
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return f"<c><v>{value:f}</v></c>" if isinstance(value, Decimal) else f"<c><v>{value}</v></c>"
+    if isinstance(value, datetime.date) and not isinstance(value, datetime.datetime):
+        return f'<c s="{_DATE_STYLE}"><v>{(value - _EXCEL_EPOCH).days}</v></c>'
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{xml_text(value)}</t></is></c>'
+
+
+def _sheet_chunks(header, rows, rows_per_chunk=500):
+    yield _SHEET_START.encode("utf-8")
+    parts = ["<row>" + "".join(_xlsx_cell(v) for v in header) + "</row>"]
+    for row in rows:
+        parts.append("<row>" + "".join(_xlsx_cell(v) for v in row) + "</row>")
+        if len(parts) >= rows_per_chunk:
+            yield "".join(parts).encode("utf-8")
+            parts = []
+    parts.append(_SHEET_END)
+    yield "".join(parts).encode("utf-8")
+
+
+def stream_xlsx(header, rows, sheet_name="Sheet1"):
+    """
+    ملف XLSX بورقة واحدة: الأرقام والتواريخ خلايا رقمية، والنصوص inline (بدون sharedStrings)
+    فلا حاجة لمرور ثانٍ.
+    """
+    return stream_zip([
+        ("[Content_Types].xml", [_CONTENT_TYPES.encode("utf-8")], True),
+        ("_rels/.rels", [_ROOT_RELS.encode("utf-8")], True),
+        ("xl/workbook.xml", [_WORKBOOK.format(name=xml_text(sheet_name)).encode("utf-8")], True),
+        ("xl/_rels/workbook.xml.rels", [_WORKBOOK_RELS.encode("utf-8")], True),
+        ("xl/styles.xml", [_STYLES.encode("utf-8")], True),
+        ("xl/worksheets/sheet1.xml", _sheet_chunks(header, rows), True),
+    ])
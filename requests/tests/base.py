@@ -0,0 +1,57 @@
+"""
+بيانات مشتركة لاختبارات الطلبات.
+
+TenantTestCase ينشئ في setUp:
+    client_company / user      شركة العميل ومستخدمها
+    vendor_company / vendor_user / vendor   شركة التوريد ومستخدمها والمورد المتعاقد مع العميل
+    worker                     عامل لدى المورد (الاسم والإقامة من worker_name / worker_iqama)
+"""
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+
+from accounts.models import User, Company
+from vendors.models import Vendor, Worker
+
+
+def worker_data(vendor, full_name="Worker", iqama_number="3000"):
+    return dict(
+        vendor=vendor, full_name=full_name, iqama_number=iqama_number, nationality="N",
+        job_title="J", insurance_class="c", iqama_expiry_date="2026-01-01", joined_at="2024-01-01",
+    )
+
+
+def make_worker(vendor, full_name="Worker", iqama_number="3000"):
+    return Worker.objects.create(**worker_data(vendor, full_name, iqama_number))
+
+
+def make_vendor(name, contact_phone="1", client=None):
+    vendor = Vendor.objects.create(
+        company=Company.objects.create(name=name, company_type="vendor"), contact_name="C", contact_phone=contact_phone,
+    )
+    if client is not None:
+        vendor.clients.add(client)
+    return vendor
+
+
+def use_temp_media(test, **settings):
+    """MEDIA_ROOT مؤقت يُحذف بعد الاختبار (مع إعدادات إضافية اختيارية)."""
+    media_root = tempfile.mkdtemp()
+    override = override_settings(MEDIA_ROOT=media_root, **settings)
+    override.enable()
+    test.addCleanup(override.disable)
+    test.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+
+
+class TenantTestCase(TestCase):
+    worker_name = "Worker"
+    worker_iqama = "3000"
+
+    def setUp(self):
+        self.client_company = Company.objects.create(name="ClientCo", company_type="client")
+        self.user = User.objects.create_user(username="client", password="p", company=self.client_company)
+        self.vendor = make_vendor("VendorCo", client=self.client_company)
+        self.vendor_company = self.vendor.company
+        self.vendor_user = User.objects.create_user(username="vendor", password="p", company=self.vendor_company)
+        self.worker = make_worker(self.vendor, self.worker_name, self.worker_iqama)
@@ -0,0 +1,70 @@
+from datetime import timedelta
+
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from requests import activity
+from requests.models import Request, RequestType, RequestComment, RequestAttachment, RequestTimeline
+from requests.tests.base import TenantTestCase
+
+
+class ActivityFeedTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        self.req = Request.objects.create(
+            request_type=RequestType.objects.create(name="Type", code="type"),
+            worker=self.worker, created_by=self.user,
+        )
+        RequestComment.objects.bulk_create([
+            RequestComment(request=self.req, author=self.user, body=f"c{i}") for i in range(7)
+        ])
+        RequestTimeline.objects.bulk_create([
+            RequestTimeline(request=self.req, user=self.user, action_name=f"t{i}") for i in range(6)
+        ])
+        RequestAttachment.objects.bulk_create([
+            RequestAttachment(request=self.req, uploaded_by=self.user, file=f"a{i}.pdf") for i in range(5)
+        ])
+        # أوقات متكررة بين الأنواع لاختبار كسر التعادل
+        now = timezone.now()
+        for model in (RequestComment, RequestTimeline, RequestAttachment):
+            for i, pk in enumerate(model.objects.order_by("id").values_list("id", flat=True)):
+                model.objects.filter(pk=pk).update(created_at=now - timedelta(minutes=i // 2))
+
+    def all_keys(self):
+        page = activity.feed(self.req, limit=100)
+        return [(e.kind, e.id) for e in page["events"]]
+
+    def test_cursor_walk_covers_every_event_once(self):
+        expected = self.all_keys()
+        self.assertEqual(len(expected), 18)
+
+        seen, cursor = [], None
+        while True:
+            page = activity.feed(self.req, cursor=cursor, limit=4)
+            seen += [(e.kind, e.id) for e in page["events"]]
+            if not page["has_more"]:
+                break
+            cursor = page["next_cursor"]
+        self.assertEqual(seen, expected)
+
+    def test_since_returns_only_newer_events(self):
+        latest = activity.feed(self.req, limit=1)["events"][0]
+        self.assertEqual(activity.feed(self.req, since=latest.cursor)["events"], [])
+
+        comment = RequestComment.objects.create(request=self.req, author=self.vendor_user, body="new")
+        events = activity.feed(self.req, since=latest.cursor)["events"]
+        self.assertEqual([(e.kind, e.id) for e in events], [("comment", comment.id)])
+
+    def test_endpoint_filters_kinds_and_checks_access(self):
+        client = Client()
+        client.force_login(self.user)
+        url = reverse("requests:activity", args=[self.req.pk])
+        data = client.get(url, {"kinds": "comment", "limit": 3}).json()
+        self.assertEqual({e["kind"] for e in data["events"]}, {"comment"})
+        self.assertTrue(data["has_more"])
+        self.assertEqual(client.get(url, {"cursor": "broken"}).status_code, 400)
+
+        # المورد لا يرى سجل المسودة
+        client.force_login(self.vendor_user)
+        self.assertEqual(client.get(url).status_code, 403)
@@ -0,0 +1,84 @@
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.urls import reverse
+
+from accounts.models import User, Company
+from requests.models import Request, RequestAttachment, RequestType
+from requests.serving import IMMUTABLE_CACHE
+from requests.tests.base import TenantTestCase, use_temp_media
+
+
+class AttachmentDownloadTests(TenantTestCase):
+    def setUp(self):
+        use_temp_media(self)
+        super().setUp()
+        other = Company.objects.create(name="OtherCo", company_type="client")
+        User.objects.create_user(username="other", password="p", company=other)
+        self.req = Request.objects.create(
+            request_type=RequestType.objects.create(name="Type", code="type"), worker=self.worker,
+            created_by=self.user, status="draft", current_company=self.client_company,
+        )
+        self.content = bytes(range(256)) * 4
+        self.att = RequestAttachment.objects.create(
+            request=self.req, uploaded_by=self.user, file=SimpleUploadedFile("إقامة.pdf", self.content),
+        )
+        self.url = reverse("requests:attachment", args=[self.req.pk, self.att.pk])
+
+    def test_scoping(self):
+        self.client.login(username="other", password="p")
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        # المورد لا يرى مرفقات المسودات
+        self.client.login(username="vendor", password="p")
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_full_download_and_conditional_get(self):
+        self.client.login(username="client", password="p")
+        response = self.client.get(self.url, {"download": "1"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), self.content)
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertEqual(response["Cache-Control"], IMMUTABLE_CACHE)
+        self.assertIn("attachment;", response["Content-Disposition"])
+        self.assertIn("filename*=utf-8''", response["Content-Disposition"])
+
+        cached = self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(cached.status_code, 304)
+
+    def test_only_images_and_pdf_are_served_inline(self):
+        self.client.login(username="client", password="p")
+        response = self.client.get(self.url)
+        self.assertIn("inline;", response["Content-Disposition"])
+        self.assertEqual(response["Content-Security-Policy"], "sandbox")
+        self.assertEqual(response["X-Content-Type-Options"], "nosniff")
+
+        page = RequestAttachment.objects.create(
+            request=self.req, uploaded_by=self.user,
+            file=SimpleUploadedFile("page.html", b"<script>alert(document.cookie)</script>"),
+        )
+        response = self.client.get(reverse("requests:attachment", args=[self.req.pk, page.pk]))
+        self.assertIn("attachment;", response["Content-Disposition"])
+        self.assertEqual(response["X-Content-Type-Options"], "nosniff")
+        self.assertNotIn("Content-Security-Policy", response)
+
+    def test_range_requests(self):
+        self.client.login(username="client", password="p")
+        response = self.client.get(self.url, HTTP_RANGE="bytes=10-19")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], f"bytes 10-19/{len(self.content)}")
+        self.assertEqual(b"".join(response.streaming_content), self.content[10:20])
+
+        tail = self.client.get(self.url, HTTP_RANGE="bytes=-5")
+        self.assertEqual(b"".join(tail.streaming_content), self.content[-5:])
+
+        # If-Range لا يطابق: الملف كاملاً
+        stale = self.client.get(self.url, HTTP_RANGE="bytes=0-1", HTTP_IF_RANGE='"old"')
+        self.assertEqual(stale.status_code, 200)
+
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE=f"bytes={len(self.content)}-").status_code, 416)
+
+    @override_settings(ATTACHMENT_SERVE_MODE="nginx", ATTACHMENT_ACCEL_PREFIX="/protected-media/")
+    def test_offload_mode(self):
+        self.client.login(username="client", password="p")
+        response = self.client.get(self.url)
+        self.assertEqual(response["X-Accel-Redirect"], f"/protected-media/{self.att.file.name}")
+        self.assertEqual(response.content, b"")
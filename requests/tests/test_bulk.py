@@ -0,0 +1,154 @@
+import io
+import zipfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from requests import counters
+from requests.bulk import import_rows, iter_upload_rows
+from requests.models import Request, RequestType, RequestField, RequestFieldValue
+from requests.schema import get_schema
+from requests.tests.base import TenantTestCase, worker_data
+from vendors.models import Worker
+
+
+def make_xlsx(rows):
+    """ملف XLSX بسيط: الصف الأول نصوص مشتركة والباقي inline / أرقام."""
+    shared = rows[0]
+    sheet_rows = []
+    for r, row in enumerate(rows, start=1):
+        cells = []
+        for c, value in enumerate(row):
+            ref = f"{chr(65 + c)}{r}"
+            if r == 1:
+                cells.append(f'<c r="{ref}" t="s"><v>{shared.index(value)}</v></c>')
+            elif isinstance(value, (int, float)):
+                cells.append(f'<c r="{ref}"><v>{value}</v></c>')
+            else:
+                cells.append(f'<c r="{ref}" t="inlineStr"><is><t>{value}</t></is></c>')
+        sheet_rows.append(f'<row r="{r}">{"".join(cells)}</row>')
+    ns = 'xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as z:
+        z.writestr("xl/sharedStrings.xml", f'<sst {ns}>' + "".join(f"<si><t>{s}</t></si>" for s in shared) + "</sst>")
+        z.writestr("xl/worksheets/sheet1.xml", f'<worksheet {ns}><sheetData>{"".join(sheet_rows)}</sheetData></worksheet>')
+    return buffer.getvalue()
+
+
+class BulkCreateTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        self.workers = Worker.objects.bulk_create([
+            Worker(**worker_data(self.vendor, f"Worker {i}", f"7{i:04d}")) for i in range(120)
+        ])
+        self.request_type = RequestType.objects.create(name="Renewal", code="renewal")
+        self.months = RequestField.objects.create(
+            request_type=self.request_type, label="المدة", key="months", field_type="number", is_required=True,
+        )
+        self.start = RequestField.objects.create(
+            request_type=self.request_type, label="البداية", key="start", field_type="date",
+        )
+        self.schema = get_schema(self.request_type.id)
+
+    def csv_upload(self, lines):
+        return SimpleUploadedFile("rows.csv", "\n".join(lines).encode("utf-8"))
+
+    def test_csv_import_reports_bad_rows_and_creates_the_rest(self):
+        upload = self.csv_upload([
+            "iqama_number,title,months,start",
+            "70000,R1,12,2025-01-01",
+            "99999,R2,12,",
+            "70001,R3,abc,",
+            "70002,,6,",
+        ])
+        result = import_rows(self.user, self.schema, iter_upload_rows(upload))
+
+        self.assertEqual(result.created, 2)
+        self.assertEqual([row for row, _ in result.errors], [3, 4])
+        req = Request.objects.get(title="R1")
+        self.assertEqual((req.client_company_id, req.vendor_company_id), (self.client_company.id, self.vendor_company.id))
+        self.assertEqual(str(RequestFieldValue.objects.get(request=req, field=self.start).value_date), "2025-01-01")
+        self.assertEqual(counters.company_stats(self.client_company)["by_status"]["draft"], 2)
+
+    def test_xlsx_import_converts_excel_dates(self):
+        content = make_xlsx([
+            ["iqama_number", "title", "المدة", "start"],
+            ["70005", "From Excel", 3, 45658],
+        ])
+        upload = SimpleUploadedFile("rows.xlsx", content)
+        result = import_rows(self.user, self.schema, iter_upload_rows(upload))
+
+        self.assertEqual(result.created, 1, result.errors)
+        req = Request.objects.get(title="From Excel")
+        self.assertEqual(str(RequestFieldValue.objects.get(request=req, field=self.start).value_date), "2025-01-01")
+
+    def test_out_of_range_dates_are_row_errors(self):
+        content = make_xlsx([
+            ["iqama_number", "title", "المدة", "start"],
+            ["70005", "Serial", 3, 99999999],
+            ["70006", "OK", 3, 45658],
+        ])
+        result = import_rows(self.user, self.schema, iter_upload_rows(SimpleUploadedFile("rows.xlsx", content)))
+        self.assertEqual(result.created, 1)
+        self.assertEqual([row for row, _ in result.errors], [2])
+
+        # أرقام CSV ليست تواريخ Excel: 20240101 تاريخ بصيغة ISO المختصرة
+        upload = self.csv_upload(["iqama_number,title,months,start", "70007,CSV,1,20240101"])
+        result = import_rows(self.user, self.schema, iter_upload_rows(upload))
+        self.assertEqual(result.created, 1, result.errors)
+        req = Request.objects.get(title="CSV")
+        self.assertEqual(str(RequestFieldValue.objects.get(request=req, field=self.start).value_date), "2024-01-01")
+
+    def test_file_error_after_committed_batches_returns_partial_result(self):
+        # الملف يُفك ترميزه على أجزاء: البايت الخاطئ بعد عدة دفعات
+        lines = ["iqama_number,title,months"] + [f"7{i:04d},{'x' * 190},1" for i in range(100)]
+        content = "\n".join(lines).encode("utf-8") + b"\n70099,\xff\xfe,1\n"
+        result = import_rows(
+            self.user, self.schema, iter_upload_rows(SimpleUploadedFile("rows.csv", content)), batch_size=10,
+        )
+        self.assertIn("UTF-8", result.file_error)
+        self.assertGreaterEqual(result.created, 10)
+        self.assertEqual(result.stopped_at_row, result.created + 2)
+        self.assertEqual(Request.objects.count(), result.created)
+
+    def test_queries_are_per_batch_not_per_row(self):
+        def run(count):
+            lines = ["iqama_number,months"] + [f"7{i:04d},1" for i in range(count)]
+            with CaptureQueriesContext(connection) as ctx:
+                import_rows(self.user, self.schema, iter_upload_rows(self.csv_upload(lines)), batch_size=100)
+            return len(ctx.captured_queries)
+
+        run(20)  # إنشاء صف العداد أول مرة
+        # SQLite يقسم INSERT الكبير حسب حد المعاملات، لذا نسمح بفرق بسيط
+        self.assertLessEqual(run(100), run(20) + 2)
+
+    def test_multi_worker_submission(self):
+        client = Client()
+        client.force_login(self.user)
+        response = client.post(reverse("requests:bulk_create"), {
+            "request_type": self.request_type.id,
+            "workers": [w.id for w in self.workers[:5]],
+            "title": "Batch",
+            f"field_{self.months.id}": "12",
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["result"].created, 5)
+        self.assertEqual(RequestFieldValue.objects.filter(field=self.months).count(), 5)
+
+    def test_bulk_page_does_not_render_all_workers(self):
+        client = Client()
+        client.force_login(self.user)
+        response = client.get(reverse("requests:bulk_create"))
+        self.assertNotContains(response, "Worker 0")
+        self.assertContains(response, reverse("requests:worker_search"))
+
+        # إعادة الفورم تعرض العمال المختارين فقط
+        response = client.post(reverse("requests:bulk_create"), {
+            "request_type": self.request_type.id, "workers": [self.workers[3].id], "file": "",
+            f"field_{self.months.id}": "",
+        })
+        self.assertContains(response, f'value="{self.workers[3].id}" checked')
+        self.assertNotContains(response, "Worker 4")
@@ -0,0 +1,69 @@
+import io
+import zipfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+
+from requests import bundles
+from requests.models import Request, RequestAttachment, RequestType
+from requests.tests.base import TenantTestCase, use_temp_media
+
+
+class AttachmentBundleTests(TenantTestCase):
+    def setUp(self):
+        use_temp_media(self)
+        super().setUp()
+        request_type = RequestType.objects.create(name="Type", code="type")
+        self.submitted, self.draft = [
+            Request.objects.create(
+                request_type=request_type, worker=self.worker, created_by=self.user,
+                status=status, current_company=self.client_company,
+            )
+            for status in ("submitted", "draft")
+        ]
+        for req in (self.submitted, self.draft):
+            for name, content in (("scan.pdf", b"%PDF-" + bytes(2000)), ("notes.txt", b"note " * 500)):
+                RequestAttachment.objects.create(
+                    request=req, uploaded_by=self.user, file=SimpleUploadedFile(name, content),
+                )
+
+    def read_zip(self, response):
+        self.assertEqual(response["Content-Type"], "application/zip")
+        return zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+
+    def test_single_request_zip(self):
+        self.client.login(username="client", password="p")
+        archive = self.read_zip(self.client.get(reverse("requests:attachments_zip", args=[self.submitted.pk])))
+        infos = {info.filename: info for info in archive.infolist()}
+        self.assertEqual(set(infos), {"scan.pdf", "notes.txt"})
+        self.assertEqual(infos["scan.pdf"].compress_type, zipfile.ZIP_STORED)
+        self.assertEqual(infos["notes.txt"].compress_type, zipfile.ZIP_DEFLATED)
+        self.assertEqual(archive.read("notes.txt"), b"note " * 500)
+        self.assertIsNone(archive.testzip())
+
+        self.client.login(username="vendor", password="p")
+        self.assertEqual(
+            self.client.get(reverse("requests:attachments_zip", args=[self.draft.pk])).status_code, 403,
+        )
+
+    def test_batch_zip_is_scoped(self):
+        self.client.login(username="vendor", password="p")
+        response = self.client.post(
+            reverse("requests:attachments_bundle"), {"ids": [self.submitted.pk, self.draft.pk, 99999]},
+        )
+        archive = self.read_zip(response)
+        # المسودة غير متاحة للمورد فلا تُضمّن
+        self.assertEqual(
+            sorted(archive.namelist()),
+            [f"request_{self.submitted.pk}/notes.txt", f"request_{self.submitted.pk}/scan.pdf"],
+        )
+
+        response = self.client.post(reverse("requests:attachments_bundle"), {"ids": [self.draft.pk]})
+        self.assertRedirects(response, reverse("requests:list"), fetch_redirect_response=False)
+
+    def test_oversized_selection_is_rejected(self):
+        self.client.login(username="client", password="p")
+        ids = [self.submitted.pk] + list(range(10**6, 10**6 + bundles.MAX_REQUESTS))
+        response = self.client.post(reverse("requests:attachments_bundle"), {"ids": ids})
+        self.assertRedirects(response, reverse("requests:list"), fetch_redirect_response=False)
+        self.assertNotIn("Content-Disposition", response)
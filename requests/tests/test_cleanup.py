@@ -0,0 +1,88 @@
+import os
+import tempfile
+import time
+from datetime import timedelta
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.utils import timezone
+
+from requests import cleanup
+from requests.counters import company_stats
+from requests.models import AttachmentBlob, Request, RequestAttachment, RequestType
+from requests.storage import attachment_storage
+from requests.tests.base import TenantTestCase, use_temp_media
+
+
+class CleanupTests(TenantTestCase):
+    def setUp(self):
+        use_temp_media(self)
+        super().setUp()
+        self.request_type = RequestType.objects.create(name="Type", code="type")
+
+    def make_request(self, status="draft", age_days=0):
+        req = Request.objects.create(
+            request_type=self.request_type, worker=self.worker, created_by=self.user,
+            status=status, current_company=self.client_company,
+        )
+        from requests.counters import record_created
+        record_created(req)
+        Request.objects.filter(pk=req.pk).update(updated_at=timezone.now() - timedelta(days=age_days))
+        return req
+
+    def write_old_file(self, name, content=b"x" * 100):
+        path = attachment_storage.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(content)
+        old = time.time() - 2 * 3600
+        os.utime(path, (old, old))
+        return path
+
+    def test_purge_stale_drafts_in_batches(self):
+        stale = [self.make_request(age_days=40) for _ in range(3)]
+        fresh = self.make_request(age_days=1)
+        submitted = self.make_request(status="submitted", age_days=40)
+        with self.captureOnCommitCallbacks(execute=True):
+            RequestAttachment.objects.create(
+                request=stale[0], uploaded_by=self.user, file=SimpleUploadedFile("a.txt", b"only here"),
+            )
+        blob = AttachmentBlob.objects.get()
+
+        dry = cleanup.purge_stale_drafts(max_age=timedelta(days=30), dry_run=True)
+        self.assertEqual((dry.drafts, dry.attachments), (3, 1))
+        self.assertEqual(Request.objects.count(), 5)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            stats = cleanup.purge_stale_drafts(max_age=timedelta(days=30), batch_size=2)
+        self.assertEqual(stats.drafts, 3)
+        self.assertEqual(set(Request.objects.values_list("pk", flat=True)), {fresh.pk, submitted.pk})
+        self.assertFalse(attachment_storage.exists(blob.path))
+        self.assertEqual(company_stats(self.client_company)["by_status"].get("draft"), 1)
+
+    def test_sweep_orphan_files(self):
+        req = self.make_request()
+        kept = RequestAttachment.objects.create(
+            request=req, uploaded_by=self.user, file=SimpleUploadedFile("kept.txt", b"kept"),
+        )
+        kept_path = attachment_storage.path(kept.file.name)
+        os.utime(kept_path, (0, 0))
+        orphan_legacy = self.write_old_file("request_docs/request_1/old.pdf")
+        orphan_tmp = self.write_old_file("blobs/tmp/tmpabc", b"y" * 50)
+        recent = attachment_storage.path("request_docs/request_2/uploading.pdf")
+        os.makedirs(os.path.dirname(recent))
+        open(recent, "wb").close()
+
+        dry = cleanup.sweep_orphan_files(dry_run=True)
+        self.assertEqual((dry.files, dry.bytes), (2, 150))
+        self.assertTrue(os.path.exists(orphan_legacy))
+
+        out = tempfile.TemporaryFile(mode="w+")
+        call_command("purge_stale_drafts", "--skip-drafts", stdout=out)
+        self.assertFalse(os.path.exists(orphan_legacy))
+        self.assertFalse(os.path.exists(orphan_tmp))
+        self.assertFalse(os.path.exists(os.path.dirname(orphan_legacy)))
+        self.assertTrue(os.path.exists(recent))
+        self.assertTrue(os.path.exists(kept_path))
+        out.seek(0)
+        self.assertIn("150", out.read())
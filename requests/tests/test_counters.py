@@ -0,0 +1,50 @@
+
+from requests import counters
+from requests.models import Request, RequestType, RequestStatusCounter
+from requests.tests.base import TenantTestCase
+from requests.transitions import apply_transition
+
+
+class StatusCounterTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        self.request_type = RequestType.objects.create(name="Type", code="type")
+
+    def _create(self, status="draft"):
+        req = Request.objects.create(
+            request_type=self.request_type, worker=self.worker, created_by=self.user,
+            status=status, current_company=self.client_company,
+        )
+        counters.record_created(req)
+        return req
+
+    def test_counters_follow_create_transition_and_delete(self):
+        req = self._create()
+        other = self._create()
+        apply_transition(req, "confirm_submission", self.user)
+        other.delete()
+
+        client_stats = counters.company_stats(self.client_company)
+        self.assertEqual(client_stats["total"], 1)
+        self.assertEqual(client_stats["by_status"]["submitted"], 1)
+        self.assertEqual(client_stats["partners_count"], 1)
+
+        vendor_stats = counters.company_stats(self.vendor_company)
+        self.assertEqual(vendor_stats["total"], 1)
+
+    def test_stats_read_is_a_single_query(self):
+        self._create()
+        with self.assertNumQueries(1):
+            counters.company_stats(self.client_company)
+
+    def test_rebuild_matches_incremental_state(self):
+        req = self._create()
+        self._create()
+        apply_transition(req, "confirm_submission", self.user)
+        incremental = set(RequestStatusCounter.objects.filter(count__gt=0).values_list(
+            "client_company", "vendor_company", "status", "count"))
+
+        counters.rebuild()
+        rebuilt = set(RequestStatusCounter.objects.values_list(
+            "client_company", "vendor_company", "status", "count"))
+        self.assertEqual(incremental, rebuilt)
@@ -0,0 +1,85 @@
+import csv
+import io
+import zipfile
+from xml.etree import ElementTree
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from requests.models import Request, RequestType, RequestField, RequestFieldValue
+from requests.tests.base import TenantTestCase
+
+
+class ExportTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        self.request_type = RequestType.objects.create(name="Renewal", code="renewal")
+        self.months = months = RequestField.objects.create(request_type=self.request_type, label="المدة", key="months", field_type="number")
+        urgent = RequestField.objects.create(request_type=self.request_type, label="عاجل", key="urgent", field_type="bool")
+        requests = Request.objects.bulk_create([
+            Request(
+                request_type=self.request_type, worker=self.worker, created_by=self.user, title=f"R{i}",
+                client_company=self.client_company, vendor_company=self.vendor_company,
+            )
+            for i in range(30)
+        ])
+        RequestFieldValue.objects.bulk_create(
+            [RequestFieldValue(request=r, field=months, value_number=i) for i, r in enumerate(requests)]
+            + [RequestFieldValue(request=r, field=urgent, value_bool=True) for r in requests[:1]]
+        )
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def export(self, **params):
+        response = self.client.get(reverse("requests:export"), params)
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content)
+
+    def test_csv_pivots_fields_into_columns(self):
+        rows = list(csv.reader(io.StringIO(self.export(type=self.request_type.id, format="csv").decode("utf-8-sig"))))
+        self.assertEqual(rows[0][-2:], ["months", "urgent"])
+        self.assertEqual(len(rows), 31)
+        first = next(r for r in rows if r[3] == "R0")
+        self.assertEqual(first[-2:], ["0.00", "نعم"])
+
+    def test_xlsx_is_a_valid_workbook(self):
+        archive = zipfile.ZipFile(io.BytesIO(self.export(type=self.request_type.id, format="xlsx")))
+        self.assertIsNone(archive.testzip())
+        sheet = archive.read("xl/worksheets/sheet1.xml").decode("utf-8")
+        self.assertEqual(sheet.count("<row>"), 31)
+
+    def test_queries_do_not_grow_per_row(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.export(type=self.request_type.id, format="csv")
+        # الجلسة + المستخدم + المخطط + الطلبات + القيم (دفعة واحدة)
+        self.assertLess(len(ctx.captured_queries), 10)
+
+    def test_user_text_is_safe_in_csv_and_xlsx(self):
+        Request.objects.filter(title="R1").update(title="=HYPERLINK(\"http://x\")")
+        Request.objects.filter(title="R2").update(title="سطر\x0bأول\x00")
+        rows = list(csv.reader(io.StringIO(self.export(type=self.request_type.id, format="csv").decode("utf-8-sig"))))
+        self.assertTrue(any(r[3] == "'=HYPERLINK(\"http://x\")" for r in rows))
+        # الأرقام السالبة ليست نصوصاً فلا تتغير
+        self.assertFalse(any(cell.startswith("'-") for r in rows for cell in r))
+
+        archive = zipfile.ZipFile(io.BytesIO(self.export(type=self.request_type.id, format="xlsx")))
+        sheet = archive.read("xl/worksheets/sheet1.xml")
+        ElementTree.fromstring(sheet)
+        self.assertIn("سطرأول".encode("utf-8"), sheet)
+
+    def test_numbers_and_dates_keep_their_type(self):
+        start = RequestField.objects.create(request_type=self.request_type, label="البداية", key="start", field_type="date")
+        req = Request.objects.get(title="R1")
+        RequestFieldValue.objects.filter(request=req, field=self.months).update(value_number=-5)
+        RequestFieldValue.objects.create(request=req, field=start, value_date="2024-01-01")
+
+        rows = list(csv.reader(io.StringIO(self.export(type=self.request_type.id, format="csv").decode("utf-8-sig"))))
+        self.assertEqual(next(r for r in rows if r[3] == "R1")[-3:], ["-5.00", "", "2024-01-01"])
+
+        archive = zipfile.ZipFile(io.BytesIO(self.export(type=self.request_type.id, format="xlsx")))
+        sheet = archive.read("xl/worksheets/sheet1.xml").decode("utf-8")
+        self.assertIn("<c><v>-5.00</v></c>", sheet)
+        self.assertIn('<c s="1"><v>45292</v></c>', sheet)
+        self.assertIn("xl/styles.xml", archive.namelist())
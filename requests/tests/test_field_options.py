@@ -0,0 +1,93 @@
+from django.core.exceptions import ValidationError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import User, Company
+from requests.field_options import missing_options
+from requests.field_values import clean_field_values
+from requests.models import RequestType, RequestField, RequestFieldOption
+from requests.schema import get_schema, registry
+
+
+@override_settings(CHOICE_OPTIONS_THRESHOLD=5)
+class FieldOptionTests(TestCase):
+    def setUp(self):
+        registry.clear()
+        self.request_type = RequestType.objects.create(name="تجديد إقامة", code="iqama-renewal")
+        self.cities = [{"value": f"c{i:02d}", "label": f"مدينة {i:02d}"} for i in range(30)]
+        self.city = RequestField.objects.create(
+            request_type=self.request_type, label="المدينة", key="city",
+            field_type="choice", choices=self.cities,
+        )
+        self.bank = RequestField.objects.create(
+            request_type=self.request_type, label="البنك", key="bank",
+            field_type="choice", choices=["الراجحي", "الأهلي"],
+        )
+
+    def values(self, field):
+        return list(RequestFieldOption.objects.filter(field=field).values_list("value", "label"))
+
+    def test_large_choice_sets_are_synced_to_option_table(self):
+        self.assertEqual(len(self.values(self.city)), 30)
+        self.assertEqual(self.values(self.bank), [])
+
+        spec = get_schema(self.request_type.id).by_key["city"]
+        self.assertEqual(spec.option_count, 30)
+        self.assertEqual(spec.choice_values, frozenset())
+        fields = {f["key"]: f for f in self.client.get(
+            reverse("requests:get_fields", args=[self.request_type.id])
+        ).json()}
+        self.assertIsNone(fields["city"]["choices"])
+        self.assertEqual(fields["city"]["options_url"], reverse("requests:field_options", args=[self.city.id]))
+        self.assertEqual(fields["bank"]["choices"], ["الراجحي", "الأهلي"])
+        self.assertIsNone(fields["bank"]["options_url"])
+
+    def test_sync_applies_only_the_difference(self):
+        old_version = get_schema(self.request_type.id).version
+        kept = RequestFieldOption.objects.get(field=self.city, value="c01")
+        self.city.choices = [{"value": "c01", "label": "جدة"}] + self.cities[2:] + [{"value": "new", "label": "أبها"}]
+        self.city.save()
+
+        values = dict(self.values(self.city))
+        self.assertNotIn("c00", values)
+        self.assertEqual(values["c01"], "جدة")
+        self.assertIn("new", values)
+        self.assertEqual(RequestFieldOption.objects.get(field=self.city, value="c01").pk, kept.pk)
+        self.assertNotEqual(get_schema(self.request_type.id).version, old_version)
+
+        # أقل من الحد: الخيارات تعود للمخطط
+        self.city.choices = ["الرياض"]
+        self.city.save()
+        self.assertEqual(self.values(self.city), [])
+        self.assertEqual(get_schema(self.request_type.id).by_key["city"].choice_values, frozenset({"الرياض"}))
+
+    def test_search_endpoint_matches_prefix_with_pagination(self):
+        company = Company.objects.create(name="ClientCo", company_type="client")
+        self.client.force_login(User.objects.create_user(username="client", password="p", company=company))
+        url = reverse("requests:field_options", args=[self.city.id])
+
+        first = self.client.get(url).json()
+        self.assertEqual(len(first["results"]), 20)
+        second = self.client.get(url, {"cursor": first["next"]}).json()
+        self.assertEqual(
+            [o["value"] for o in first["results"] + second["results"]], [c["value"] for c in self.cities],
+        )
+        self.assertIsNone(second["next"])
+
+        self.assertEqual(
+            self.client.get(url, {"q": "مدينة 1"}).json()["results"][0], {"value": "c10", "label": "مدينة 10"},
+        )
+        self.assertEqual([o["value"] for o in self.client.get(url, {"q": "C2"}).json()["results"]][:2], ["c20", "c21"])
+
+    def test_submitted_values_are_checked_with_one_query(self):
+        schema = get_schema(self.request_type.id)
+        name = schema.by_key["city"].input_name
+        with self.assertNumQueries(1):
+            self.assertEqual(clean_field_values(schema, {name: "c05"})[self.city.id], "c05")
+        with self.assertRaises(ValidationError) as ctx:
+            clean_field_values(schema, {name: "مكة"})
+        self.assertIn(name, ctx.exception.message_dict)
+
+        cleaned = [{self.city.id: f"c{i:02d}"} for i in range(30)] + [{self.city.id: "x"}, {self.city.id: None}]
+        with self.assertNumQueries(1):
+            self.assertEqual(missing_options(schema, cleaned), {(self.city.id, "x")})
@@ -0,0 +1,111 @@
+from datetime import date, timedelta
+
+from django.test import override_settings
+from django.urls import reverse
+
+from requests import field_query
+from requests.field_values import rows_to_documents
+from requests.models import Request, RequestType, RequestField, RequestFieldValue
+from requests.schema import get_schema, registry
+from requests.tests.base import TenantTestCase
+
+
+class FieldQueryTests(TenantTestCase):
+    def setUp(self):
+        registry.clear()
+        super().setUp()
+        self.request_type = RequestType.objects.create(name="تجديد إقامة", code="iqama-renewal")
+        other_type = RequestType.objects.create(name="أخرى", code="other")
+        fields = {
+            key: RequestField.objects.create(request_type=self.request_type, label=key, key=key, field_type=field_type)
+            for key, field_type in (
+                ("expiry_date", "date"), ("months", "number"), ("city", "text"), ("urgent", "bool"), ("meta", "json"),
+            )
+        }
+        self.today = date(2026, 10, 18)
+        self.requests = Request.objects.bulk_create([
+            Request(
+                request_type=self.request_type, worker=self.worker, created_by=self.user, title=f"R{i}",
+                client_company=self.client_company, vendor_company=self.vendor_company,
+            )
+            for i in range(6)
+        ])
+        Request.objects.create(
+            request_type=other_type, worker=self.worker, created_by=self.user, title="other",
+            client_company=self.client_company, vendor_company=self.vendor_company,
+        )
+        values = []
+        for i, req in enumerate(self.requests):
+            values += [
+                RequestFieldValue(request=req, field=fields["expiry_date"], value_date=self.today + timedelta(days=10 * i)),
+                RequestFieldValue(request=req, field=fields["months"], value_number=i * 6),
+                RequestFieldValue(request=req, field=fields["city"], value_text="الرياض" if i % 2 else "جدة"),
+                RequestFieldValue(request=req, field=fields["urgent"], value_bool=i == 0),
+                RequestFieldValue(request=req, field=fields["meta"], value_json={"tags": ["vip"] if i < 2 else [], "n": i}),
+            ]
+        RequestFieldValue.objects.bulk_create(values)
+        self.schema = get_schema(self.request_type.id)
+
+    def ids(self, lookups):
+        qs = field_query.filter_fields(Request.objects.all(), self.schema, lookups)
+        return sorted(qs.values_list("pk", flat=True))
+
+    def pks(self, *indexes):
+        return sorted(self.requests[i].pk for i in indexes)
+
+    def test_typed_operators(self):
+        self.assertEqual(self.ids([("expiry_date", "lt", "2026-11-10")]), self.pks(0, 1, 2))
+        # المدى على نفس الحقل في EXISTS واحد
+        self.assertEqual(self.ids([("months", "gte", "6"), ("months", "lte", "18")]), self.pks(1, 2, 3))
+        self.assertEqual(self.ids([("city", "exact", "الرياض")]), self.pks(1, 3, 5))
+        self.assertEqual(self.ids([("city", "in", "الرياض,جدة")]), self.pks(0, 1, 2, 3, 4, 5))
+        self.assertEqual(self.ids([("urgent", "exact", "true")]), self.pks(0))
+        self.assertEqual(self.ids([("meta", "contains", '{"tags": ["vip"]}')]), self.pks(0, 1))
+        self.assertEqual(
+            self.ids([("city", "exact", "جدة"), ("expiry_date", "gt", "2026-10-20")]), self.pks(2, 4),
+        )
+
+    def test_invalid_lookups(self):
+        with self.assertRaises(field_query.FieldQueryError):
+            self.ids([("missing", "exact", "x")])
+        with self.assertRaises(field_query.FieldQueryError):
+            self.ids([("city", "lt", "x")])
+        with self.assertRaises(field_query.FieldQueryError):
+            self.ids([("months", "gt", "abc")])
+
+    def test_json_contains_semantics(self):
+        self.assertTrue(field_query.json_contains({"a": [1, 2], "b": {"c": 1}}, {"a": [2], "b": {}}))
+        self.assertTrue(field_query.json_contains(["x", "y"], "x"))
+        self.assertFalse(field_query.json_contains({"a": 1}, {"a": 1, "b": 2}))
+        self.assertFalse(field_query.json_contains([1], [1, 2]))
+
+    def test_request_list_filters_and_sorts(self):
+        self.client.force_login(self.user)
+        url = reverse("requests:list")
+        response = self.client.get(url, {
+            "type": self.request_type.id, "f.months__gte": "6", "sort": "-f.expiry_date",
+        })
+        listed = [req.pk for req in response.context["page_obj"]]
+        self.assertEqual(listed, [self.requests[i].pk for i in (5, 4, 3, 2, 1)])
+        self.assertFalse(response.context["page_obj"].has_next)
+
+        second = self.client.get(url, {"type": self.request_type.id, "sort": "f.months"})
+        page = second.context["page_obj"]
+        self.assertEqual([req.pk for req in page], [self.requests[i].pk for i in range(5)])
+        # المؤشر يحمل قيمة الحقل ومعاملات الفلترة تبقى في روابط الصفحات
+        self.assertIn("sort=f.months", second.context["filter_query"])
+        rest = self.client.get(url, {"type": self.request_type.id, "sort": "f.months", "cursor": page.next_cursor})
+        self.assertEqual([req.pk for req in rest.context["page_obj"]], [self.requests[5].pk])
+
+        invalid = self.client.get(url, {"type": self.request_type.id, "f.months__gt": "abc"})
+        self.assertEqual(len(invalid.context["page_obj"]), 0)
+
+
+@override_settings(REQUEST_FIELD_STORAGE="document")
+class DocumentFieldQueryTests(FieldQueryTests):
+    """نفس الشروط على Request.field_data بعد نقل القيم من الصفوف."""
+
+    def setUp(self):
+        super().setUp()
+        rows_to_documents(clear_source=True)
+        self.assertFalse(RequestFieldValue.objects.exists())
@@ -0,0 +1,80 @@
+import datetime
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.test import override_settings
+from django.urls import reverse
+
+from requests.field_values import (
+    documents_to_rows, read_field_values, rows_to_documents, validate_document, with_field_values,
+)
+from requests.models import Request, RequestType, RequestField, RequestFieldValue
+from requests.schema import get_schema, registry
+from requests.tests.base import TenantTestCase
+
+
+class DocumentStorageTests(TenantTestCase):
+    def setUp(self):
+        registry.clear()
+        super().setUp()
+        self.request_type = RequestType.objects.create(name="Type", code="type")
+        self.months = RequestField.objects.create(
+            request_type=self.request_type, label="المدة", key="months", field_type="number",
+        )
+        self.expiry = RequestField.objects.create(
+            request_type=self.request_type, label="الانتهاء", key="expiry", field_type="date",
+        )
+        self.city = RequestField.objects.create(
+            request_type=self.request_type, label="المدينة", key="city", field_type="text",
+        )
+        self.client.force_login(self.user)
+        self.post_data = {
+            "worker": self.worker.id, "request_type": self.request_type.id, "title": "T",
+            f"field_{self.months.id}": "12.5", f"field_{self.expiry.id}": "2026-12-31",
+            f"field_{self.city.id}": "الرياض",
+        }
+        self.expected = {
+            self.months.id: Decimal("12.50"),
+            self.expiry.id: datetime.date(2026, 12, 31),
+            self.city.id: "الرياض",
+        }
+
+    def read(self, req):
+        req = with_field_values(Request.objects.filter(pk=req.pk)).get()
+        return read_field_values(req, get_schema(self.request_type.id))
+
+    @override_settings(REQUEST_FIELD_STORAGE="document")
+    def test_wizard_writes_single_document(self):
+        self.client.post(reverse("requests:create_wizard"), self.post_data)
+        req = Request.objects.get()
+        self.assertFalse(RequestFieldValue.objects.exists())
+        self.assertEqual(req.field_data[f"f{self.months.id}"], 12.5)
+        self.assertEqual(self.read(req), self.expected)
+
+        response = self.client.get(reverse("requests:detail", args=[req.pk]))
+        self.assertContains(response, "2026-12-31")
+        self.assertContains(response, "الرياض")
+
+    def test_read_api_is_the_same_in_both_modes(self):
+        self.client.post(reverse("requests:create_wizard"), self.post_data)
+        req = Request.objects.get()
+        self.assertEqual(self.read(req), self.expected)
+
+        self.assertEqual(rows_to_documents(batch_size=1, clear_source=True), (1, 3))
+        with override_settings(REQUEST_FIELD_STORAGE="document"):
+            self.assertEqual(self.read(req), self.expected)
+
+        self.assertEqual(documents_to_rows(clear_source=True), (1, 3))
+        self.assertEqual(Request.objects.get().field_data, {})
+        self.assertEqual(self.read(req), self.expected)
+
+    def test_document_validation(self):
+        schema = get_schema(self.request_type.id)
+        validate_document(schema, {f"f{self.months.id}": 3, f"f{self.expiry.id}": "2026-01-01"})
+        for invalid in ({"f999999": 1}, {f"f{self.months.id}": "3"}, {f"f{self.expiry.id}": "01/01/2026"}):
+            with self.assertRaises(ValidationError):
+                validate_document(schema, invalid)
+
+        req = Request(request_type=self.request_type, field_data={f"f{self.months.id}": "many"})
+        with self.assertRaises(ValidationError):
+            req.clean()
@@ -0,0 +1,85 @@
+import datetime
+from decimal import Decimal
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from requests.models import Request, RequestType, RequestField, RequestFieldValue
+from requests.schema import registry
+from requests.tests.base import TenantTestCase
+
+
+class FieldValueWriteTests(TenantTestCase):
+    def setUp(self):
+        registry.clear()
+        super().setUp()
+        self.request_type = RequestType.objects.create(name="Type", code="type")
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def _add_text_fields(self, start, stop):
+        return [
+            RequestField.objects.create(
+                request_type=self.request_type, label=f"F{i}", key=f"f{i}", field_type="text", sort_order=i,
+            )
+            for i in range(start, stop)
+        ]
+
+    def _post_wizard(self, fields):
+        data = {"worker": self.worker.id, "request_type": self.request_type.id, "title": "T"}
+        data.update({f"field_{f.id}": f"value {f.id}" for f in fields})
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse("requests:create_wizard"), data)
+        self.assertEqual(response.status_code, 302)
+        return len(ctx.captured_queries)
+
+    def test_wizard_query_count_is_independent_of_field_count(self):
+        fields = self._add_text_fields(0, 3)
+        self._post_wizard(fields)  # warm the schema
+        small = self._post_wizard(fields)
+
+        fields += self._add_text_fields(3, 30)
+        self._post_wizard(fields)
+        large = self._post_wizard(fields)
+
+        self.assertEqual(small, large)
+        self.assertEqual(RequestFieldValue.objects.filter(request=Request.objects.first()).count(), 30)
+
+    def test_resubmit_updates_every_field_type(self):
+        date_field = RequestField.objects.create(request_type=self.request_type, label="D", key="d", field_type="date")
+        bool_field = RequestField.objects.create(request_type=self.request_type, label="B", key="b", field_type="bool")
+        json_field = RequestField.objects.create(request_type=self.request_type, label="J", key="j", field_type="json")
+        num_field = RequestField.objects.create(request_type=self.request_type, label="N", key="n", field_type="number")
+
+        req = Request.objects.create(
+            request_type=self.request_type, worker=self.worker, created_by=self.user,
+            status="returned", current_company=self.client_company,
+        )
+        RequestFieldValue.objects.create(request=req, field=date_field, value_date="2025-01-01")
+
+        self.client.post(reverse("requests:detail", args=[req.pk]), {
+            "action": "resubmit",
+            f"field_{date_field.id}": "2025-06-30",
+            f"field_{bool_field.id}": "False",
+            f"field_{json_field.id}": '{"a": [1, 2]}',
+            f"field_{num_field.id}": "1,250.5",
+        })
+
+        values = {fv.field_id: fv for fv in req.field_values.all()}
+        self.assertEqual(values[date_field.id].value_date, datetime.date(2025, 6, 30))
+        self.assertIs(values[bool_field.id].value_bool, False)
+        self.assertEqual(values[json_field.id].value_json, {"a": [1, 2]})
+        self.assertEqual(values[num_field.id].value_number, Decimal("1250.50"))
+        req.refresh_from_db()
+        self.assertEqual(req.status, "submitted")
+
+    def test_invalid_value_does_not_create_draft(self):
+        field = RequestField.objects.create(request_type=self.request_type, label="D", key="d", field_type="date")
+        response = self.client.post(reverse("requests:create_wizard"), {
+            "worker": self.worker.id, "request_type": self.request_type.id, "title": "T",
+            f"field_{field.id}": "not-a-date",
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Request.objects.exists())
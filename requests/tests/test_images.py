@@ -0,0 +1,83 @@
+import io
+import os
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from PIL import Image
+
+from requests import images
+from requests.models import Request, RequestAttachment, RequestType
+from requests.outbox import drain
+from requests.serving import IMMUTABLE_CACHE
+from requests.tests.base import TenantTestCase, use_temp_media
+
+
+def jpeg_bytes(size=(1200, 600), color="red"):
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientation: تدوير 90 درجة
+    exif[0x010F] = "PhoneMaker"
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, "JPEG", exif=exif)
+    return buffer.getvalue()
+
+
+class ImageDerivativeTests(TenantTestCase):
+    def setUp(self):
+        use_temp_media(self, IMAGE_DERIVATIVE_FORMAT="WEBP")
+        super().setUp()
+        request_type = RequestType.objects.create(name="Type", code="type")
+        self.req = Request.objects.create(
+            request_type=request_type, worker=self.worker, created_by=self.user,
+            status="draft", current_company=self.client_company,
+        )
+
+    def attach(self, content, name="photo.jpg"):
+        return RequestAttachment.objects.create(
+            request=self.req, uploaded_by=self.user, file=SimpleUploadedFile(name, content),
+        )
+
+    def test_background_derivatives_are_resized_and_stripped(self):
+        att = self.attach(jpeg_bytes())
+        self.assertEqual(drain(), (1, 0))
+
+        storage = att.file.storage
+        digest = images.source_digest(storage, att.file.name)
+        thumb_path = storage.path(images.derivative_name(digest, "thumb"))
+        with Image.open(thumb_path) as thumb:
+            self.assertEqual(thumb.format, "WEBP")
+            # الاتجاه مطبّق (العرض والارتفاع متبادلان) وبيانات EXIF محذوفة
+            self.assertEqual(thumb.size, (160, 320))
+            self.assertEqual(len(thumb.getexif()), 0)
+        self.assertTrue(os.path.exists(storage.path(images.derivative_name(digest, "web"))))
+
+    def test_preview_view(self):
+        att = self.attach(jpeg_bytes())
+        self.client.login(username="client", password="p")
+        response = self.client.get(att.thumbnail_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/webp")
+        self.assertEqual(response["Cache-Control"], IMMUTABLE_CACHE)
+
+        document = self.attach(b"%PDF-1.4", name="doc.pdf")
+        self.assertEqual(self.client.get(document.thumbnail_url).status_code, 404)
+        self.assertEqual(self.client.get(att.preview_url("huge")).status_code, 404)
+
+    def test_process_pool_generation(self):
+        sources = []
+        for color in ("red", "blue", "green"):
+            att = self.attach(jpeg_bytes(color=color))
+            sources.append((att.file.storage, att.file.name))
+        self.assertEqual(images.generate(sources, workers=2), (6, 0))
+        self.assertEqual(images.generate(sources, workers=2), (0, 0))
+
+    @override_settings(AVATAR_STORAGE="local")
+    def test_local_avatar(self):
+        self.vendor.avatar = SimpleUploadedFile("logo.png", jpeg_bytes(size=(800, 800)))
+        self.vendor.save()
+        self.assertTrue(self.vendor.avatar.name.startswith("avatars/"))
+        self.assertIn("?v=", self.vendor.avatar_url)
+
+        self.client.login(username="client", password="p")
+        response = self.client.get(self.vendor.avatar_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/webp")
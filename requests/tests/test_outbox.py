@@ -0,0 +1,67 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from requests import outbox
+from requests.models import OutboxMessage
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.calls = []
+
+        @outbox.handler("test.flaky")
+        def flaky(fail=False):
+            self.calls.append(fail)
+            if fail:
+                raise RuntimeError("boom")
+
+    def test_claimed_message_is_not_claimed_twice(self):
+        outbox.enqueue("test.flaky")
+        first = outbox.claim_batch(worker_id="a")
+        second = outbox.claim_batch(worker_id="b")
+        self.assertEqual(len(first), 1)
+        self.assertEqual(second, [])
+
+        outbox.process_claimed(first)
+        self.assertEqual(OutboxMessage.objects.get().status, "done")
+
+    def test_failure_is_retried_with_backoff_then_dead(self):
+        message = outbox.enqueue("test.flaky", fail=True)
+        outbox.process_claimed(outbox.claim_batch(), max_attempts=2)
+
+        message.refresh_from_db()
+        self.assertEqual(message.status, "pending")
+        self.assertEqual(message.attempts, 1)
+        self.assertGreater(message.available_at, timezone.now())
+        self.assertEqual(outbox.claim_batch(), [])
+
+        OutboxMessage.objects.filter(pk=message.pk).update(available_at=timezone.now() - timedelta(seconds=1))
+        outbox.process_claimed(outbox.claim_batch(), max_attempts=2)
+        message.refresh_from_db()
+        self.assertEqual(message.status, "dead")
+        self.assertIn("boom", message.last_error)
+
+    def test_reclaimed_message_rolls_back_handler_writes(self):
+        @outbox.handler("test.slow")
+        def slow():
+            OutboxMessage.objects.create(topic="test.side_effect")
+
+        outbox.enqueue("test.slow")
+        stale = outbox.claim_batch(worker_id="a")
+        # انتهت مهلة "a" وهو ما زال ينفذ الرسالة، فحجزتها "b"
+        OutboxMessage.objects.update(claimed_at=timezone.now() - timedelta(seconds=outbox.LEASE_SECONDS + 1))
+        self.assertEqual(len(outbox.claim_batch(worker_id="b")), 1)
+
+        self.assertEqual(outbox.process_claimed(stale), (0, 1))
+        message = OutboxMessage.objects.get(topic="test.slow")
+        self.assertEqual((message.status, message.claimed_by, message.attempts), ("processing", "b", 0))
+        self.assertFalse(OutboxMessage.objects.filter(topic="test.side_effect").exists())
+
+    def test_expired_lease_is_reclaimed(self):
+        outbox.enqueue("test.flaky")
+        outbox.claim_batch(worker_id="crashed")
+        OutboxMessage.objects.update(claimed_at=timezone.now() - timedelta(seconds=outbox.LEASE_SECONDS + 1))
+
+        self.assertEqual(len(outbox.claim_batch(worker_id="b")), 1)
@@ -0,0 +1,58 @@
+from datetime import timedelta
+
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from requests import counters
+from requests.models import Request, RequestType
+from requests.pagination import KeysetPaginator
+from requests.tests.base import TenantTestCase
+
+
+class KeysetPaginationTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        request_type = RequestType.objects.create(name="Type", code="type")
+        Request.objects.bulk_create([
+            Request(
+                request_type=request_type, worker=self.worker, created_by=self.user, title=f"R{i}",
+                client_company=self.client_company, vendor_company=self.vendor_company,
+            )
+            for i in range(12)
+        ])
+        # نصف الطلبات بنفس الوقت لاختبار كسر التعادل بالـ id
+        now = timezone.now()
+        for i, req in enumerate(Request.objects.order_by("id")):
+            Request.objects.filter(pk=req.pk).update(created_at=now - timedelta(minutes=i // 2))
+        counters.rebuild()
+        self.expected = list(Request.objects.order_by("-created_at", "-id").values_list("id", flat=True))
+
+    def test_walks_forward_and_back_without_gaps(self):
+        paginator = KeysetPaginator(Request.objects.all(), 5)
+        seen = []
+        page = paginator.get_page()
+        pages = [page]
+        while True:
+            seen += [r.id for r in page]
+            if not page.has_next:
+                break
+            page = paginator.get_page(page.next_cursor)
+            pages.append(page)
+        self.assertEqual(seen, self.expected)
+
+        back = paginator.get_page(pages[-1].prev_cursor)
+        self.assertEqual([r.id for r in back], [r.id for r in pages[-2]])
+        self.assertTrue(back.has_next)
+
+    def test_request_list_uses_cursor(self):
+        client = Client()
+        client.force_login(self.user)
+        first = client.get(reverse("requests:list"))
+        cursor = first.context["page_obj"].next_cursor
+        second = client.get(reverse("requests:list"), {"cursor": cursor})
+        self.assertEqual([r.id for r in second.context["requests"]], self.expected[5:10])
+        self.assertEqual(first.context["page_obj"].approx_total, 12)
+
+        broken = client.get(reverse("requests:list"), {"cursor": "not-a-cursor"})
+        self.assertEqual(broken.status_code, 200)
@@ -0,0 +1,66 @@
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from requests.models import (
+    Request, RequestType, RequestField, RequestFieldValue,
+    RequestComment, RequestAttachment, RequestTimeline,
+)
+from requests.schema import get_schema
+from requests.tests.base import TenantTestCase
+
+
+class PerformanceRequestDetailTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        request_type = RequestType.objects.create(name="Type", code="type")
+        self.fields = [
+            RequestField.objects.create(request_type=request_type, label=f"F{i}", key=f"f{i}")
+            for i in range(20)
+        ]
+        # المخطط يُخزن داخل العملية بعد أول تحميل؛ الصفحة تتحقق من إصداره فقط (استعلام واحد)
+        get_schema(request_type.id)
+        self.req = Request.objects.create(
+            request_type=request_type, worker=self.worker, created_by=self.user,
+            status="in_progress", current_company=self.vendor_company,
+        )
+        self.authors = [self.user, self.vendor_user]
+        self.rows = 0
+
+    def grow(self, count):
+        """إضافة count من التعليقات والمرفقات والحركات والقيم."""
+        start, self.rows = self.rows, self.rows + count
+        RequestComment.objects.bulk_create([
+            RequestComment(request=self.req, author=self.authors[i % 2], body=f"comment {i}")
+            for i in range(start, self.rows)
+        ])
+        RequestAttachment.objects.bulk_create([
+            RequestAttachment(request=self.req, uploaded_by=self.authors[i % 2], file=f"requests/{i}.pdf")
+            for i in range(start, self.rows)
+        ])
+        RequestTimeline.objects.bulk_create([
+            RequestTimeline(request=self.req, user=self.authors[i % 2], action_name=f"event {i}")
+            for i in range(start, self.rows)
+        ])
+        RequestFieldValue.objects.bulk_create([
+            RequestFieldValue(request=self.req, field=field, value_text="v")
+            for field in self.fields[start % 20:min(self.rows, 20)]
+        ])
+
+    def count_queries(self, user):
+        client = Client()
+        client.force_login(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(reverse("requests:detail", args=[self.req.pk]))
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_query_count_is_constant_as_related_rows_grow(self):
+        self.grow(3)
+        small_client, small_vendor = self.count_queries(self.user), self.count_queries(self.vendor_user)
+
+        self.grow(300)
+        self.assertEqual(self.count_queries(self.user), small_client)
+        self.assertEqual(self.count_queries(self.vendor_user), small_vendor)
+        self.assertLessEqual(small_client, 13)
@@ -0,0 +1,78 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from requests.models import Request, RequestType, RequestTimeline, RequestStatusDuration
+from requests.rollups import process_new_events, rebuild, vendor_status_durations
+from requests.tests.base import TenantTestCase
+from requests.transitions import apply_transition, apply_batch_transition
+
+
+class LifecycleRollupTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        self.request_type = RequestType.objects.create(name="Type", code="type")
+
+    def make_request(self):
+        return Request.objects.create(
+            request_type=self.request_type, worker=self.worker, created_by=self.user,
+            status="draft", current_company=self.client_company,
+        )
+
+    def age_events(self, hours):
+        # نقل الحركات للماضي حتى تتجاوز مهلة الأمان
+        past = timezone.now() - timedelta(hours=hours)
+        RequestTimeline.objects.update(created_at=past)
+
+    def test_submission_keeps_created_at_and_records_lifecycle(self):
+        req = self.make_request()
+        created_at = req.created_at
+        apply_transition(req, "confirm_submission", self.user)
+        apply_transition(req, "start_processing", self.vendor_user)
+        apply_transition(req, "return_defect", self.vendor_user, note="نقص")
+
+        req.refresh_from_db()
+        self.assertEqual(req.created_at, created_at)
+        self.assertIsNotNone(req.submitted_at)
+        self.assertIsNotNone(req.processing_started_at)
+        self.assertIsNotNone(req.returned_at)
+        self.assertEqual(req.status_changed_at, req.returned_at)
+        self.assertFalse(RequestTimeline.objects.filter(request=req, duration_seconds__isnull=True).exists())
+
+    def test_rollup_processes_only_new_events(self):
+        req = self.make_request()
+        apply_transition(req, "confirm_submission", self.user)
+        Request.objects.filter(pk=req.pk).update(status_changed_at=timezone.now() - timedelta(hours=3))
+        req.refresh_from_db()
+        apply_transition(req, "start_processing", self.vendor_user)
+        self.age_events(1)
+
+        self.assertEqual(process_new_events(), 2)
+        self.assertEqual(process_new_events(), 0)
+        submitted = RequestStatusDuration.objects.get(vendor_company=self.vendor_company, status="submitted")
+        self.assertEqual(submitted.count, 1)
+        self.assertGreaterEqual(submitted.total_seconds, 3 * 3600)
+
+        # حركات جديدة (عبر الإجراء الجماعي) تُضاف إلى نفس التجميع
+        other = self.make_request()
+        apply_transition(other, "confirm_submission", self.user)
+        apply_batch_transition([other.pk], "start_processing", self.vendor_user)
+        self.age_events(1)
+        self.assertEqual(process_new_events(), 2)
+        submitted.refresh_from_db()
+        self.assertEqual(submitted.count, 2)
+
+        report = {row["status"]: row for row in vendor_status_durations(self.vendor_company)}
+        self.assertEqual(report["submitted"]["count"], 2)
+        self.assertGreaterEqual(report["submitted"]["max_hours"], 3)
+
+        self.assertEqual(rebuild(), 4)
+        submitted = RequestStatusDuration.objects.get(vendor_company=self.vendor_company, status="submitted")
+        self.assertEqual(submitted.count, 2)
+
+    def test_recent_events_wait_for_the_safety_lag(self):
+        req = self.make_request()
+        apply_transition(req, "confirm_submission", self.user)
+        self.assertEqual(process_new_events(), 0)
+        self.age_events(1)
+        self.assertEqual(process_new_events(), 1)
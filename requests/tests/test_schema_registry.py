@@ -0,0 +1,120 @@
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase
+from django.urls import reverse
+from django.test.utils import CaptureQueriesContext
+
+from requests.models import RequestType, RequestField
+from requests.schema import get_schema, get_schemas, registry
+
+
+class SchemaRegistryTests(TestCase):
+    def setUp(self):
+        registry.clear()
+        self.request_type = RequestType.objects.create(name="تجديد إقامة", code="iqama-renewal")
+        self.expiry = RequestField.objects.create(
+            request_type=self.request_type, label="تاريخ الانتهاء", key="expiry_date",
+            field_type="date", is_required=True, sort_order=2,
+        )
+        self.city = RequestField.objects.create(
+            request_type=self.request_type, label="المدينة", key="city",
+            field_type="choice", choices=["الرياض", "جدة"], sort_order=1,
+        )
+        RequestField.objects.create(
+            request_type=self.request_type, label="قديم", key="old",
+            field_type="text", is_active=False,
+        )
+
+    def test_compiles_ordered_active_fields(self):
+        schema = get_schema(self.request_type.id)
+        self.assertEqual([f.key for f in schema.fields], ["city", "expiry_date"])
+        self.assertEqual(schema.by_key["city"].choice_values, frozenset({"الرياض", "جدة"}))
+        with self.assertRaises(ValidationError):
+            schema.by_key["city"].coerce("مكة")
+        with self.assertRaises(ValidationError):
+            schema.by_key["expiry_date"].coerce("31/12/2025")
+
+    def test_warm_lookup_only_checks_the_version(self):
+        schema = get_schema(self.request_type.id)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertIs(get_schema(self.request_type.id), schema)
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+    def test_edit_from_another_process_is_seen(self):
+        # عملية أخرى عدّلت الحقل: لا إشارة ولا إلغاء في هذه العملية، فقط الإصدار في قاعدة البيانات
+        old = get_schema(self.request_type.id)
+        RequestField.objects.filter(pk=self.city.pk).update(label="مدينة الإقامة")
+        RequestType.objects.filter(pk=self.request_type.pk).update(schema_version=F("schema_version") + 1)
+        self.assertEqual(get_schema(self.request_type.id).by_key["city"].label, "مدينة الإقامة")
+        self.assertNotEqual(get_schema(self.request_type.id).version, old.version)
+
+    def test_field_edit_invalidates_schema(self):
+        old = get_schema(self.request_type.id)
+        self.city.label = "مدينة الإقامة"
+        self.city.save()
+        new = get_schema(self.request_type.id)
+        self.assertEqual(new.by_key["city"].label, "مدينة الإقامة")
+        self.assertNotEqual(old.version, new.version)
+
+        self.expiry.delete()
+        self.assertNotIn("expiry_date", get_schema(self.request_type.id).by_key)
+
+    def test_unknown_type_returns_none(self):
+        self.assertIsNone(get_schema(999999))
+
+    def test_get_many_loads_missing_types_together(self):
+        other = RequestType.objects.create(name="خروج وعودة", code="exit-reentry")
+        get_schema(self.request_type.id)
+        with CaptureQueriesContext(connection) as ctx:
+            schemas = get_schemas([self.request_type.id, other.id, 999999])
+        self.assertEqual(set(schemas), {self.request_type.id, other.id})
+        # استعلام الإصدارات، ثم للنوع غير المخزن: استعلام الأنواع + استعلام الحقول
+        self.assertEqual(len(ctx.captured_queries), 3)
+
+
+class GetFieldsApiTests(TestCase):
+    def setUp(self):
+        registry.clear()
+        self.request_type = RequestType.objects.create(name="تجديد إقامة", code="iqama-renewal")
+        self.field = RequestField.objects.create(
+            request_type=self.request_type, label="المدينة", key="city", field_type="text",
+        )
+        self.url = reverse("requests:get_fields", args=[self.request_type.id])
+
+    def test_etag_and_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+        self.assertEqual(etag, f'"{get_schema(self.request_type.id).version}"')
+        self.assertIn("no-cache", response["Cache-Control"])
+        self.assertEqual(response.json()[0]["key"], "city")
+
+        cached = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.content, b"")
+
+        self.field.label = "مدينة الإقامة"
+        self.field.save()
+        changed = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], etag)
+
+    def test_batch_omits_fields_for_known_versions(self):
+        other = RequestType.objects.create(name="خروج وعودة", code="exit-reentry")
+        version = get_schema(self.request_type.id).version
+        url = reverse("requests:get_fields_batch")
+        response = self.client.get(url, {
+            "types": f"{self.request_type.id},{other.id},999999",
+            "known": f"{self.request_type.id}:{version}",
+        })
+        schemas = response.json()["schemas"]
+        self.assertEqual(schemas[str(self.request_type.id)], {"version": version})
+        self.assertEqual(schemas[str(other.id)]["fields"], [])
+        self.assertNotIn("999999", schemas)
+
+        again = self.client.get(url, {
+            "types": f"{self.request_type.id},{other.id},999999",
+            "known": f"{self.request_type.id}:{version}",
+        }, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(again.status_code, 304)
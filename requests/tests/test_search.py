@@ -0,0 +1,55 @@
+from django.test import Client
+from django.urls import reverse
+
+from requests import search
+from requests.models import Request, RequestType, RequestField, RequestFieldValue
+from requests.search import search_requests
+from requests.tests.base import TenantTestCase, make_worker
+
+
+class RequestSearchTests(TenantTestCase):
+    worker_name = "أحمد محمد"
+    worker_iqama = "2345678901"
+
+    def setUp(self):
+        super().setUp()
+        other = make_worker(self.vendor, "Sami Khan", "2999999999")
+        request_type = RequestType.objects.create(name="تأشيرة خروج", code="exit")
+        field = RequestField.objects.create(request_type=request_type, label="الوجهة", key="destination")
+        self.exit_req = Request.objects.create(
+            request_type=request_type, worker=self.worker, created_by=self.user, title="Exit visa",
+        )
+        RequestFieldValue.objects.create(request=self.exit_req, field=field, value_text="Jakarta")
+        self.other_req = Request.objects.create(
+            request_type=request_type, worker=other, created_by=self.user, title="Renewal",
+        )
+        search.rebuild()
+
+    def ids(self, q):
+        return list(search_requests(Request.objects.all(), q).order_by("-search_rank", "-id").values_list("id", flat=True))
+
+    def test_matches_prefixes_dynamic_values_and_normalized_arabic(self):
+        self.assertEqual(self.ids("jakar"), [self.exit_req.id])
+        self.assertEqual(self.ids("احمد"), [self.exit_req.id])
+        self.assertEqual(self.ids("23456"), [self.exit_req.id])
+        self.assertEqual(self.ids("sami renewal"), [self.other_req.id])
+
+    def test_request_id_ranks_first(self):
+        self.assertEqual(self.ids(str(self.other_req.id))[0], self.other_req.id)
+
+    def test_worker_rename_refreshes_documents(self):
+        self.worker.full_name = "Yusuf"
+        self.worker.save()
+        self.assertEqual(self.ids("yusuf"), [self.exit_req.id])
+        self.assertEqual(self.ids("احمد"), [])
+
+    def test_deleted_request_leaves_index(self):
+        self.other_req.delete()
+        self.assertEqual(self.ids("sami"), [])
+
+    def test_list_view_searches_by_relevance(self):
+        client = Client()
+        client.force_login(self.user)
+        response = client.get(reverse("requests:list"), {"q": "jakarta"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r.id for r in response.context["page_obj"]], [self.exit_req.id])
@@ -0,0 +1,100 @@
+import hashlib
+import os
+
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from requests.models import AttachmentBlob, Request, RequestAttachment, RequestType
+from requests.storage import acquire, attachment_storage, blob_path, migrate_legacy_files
+from requests.tests.base import TenantTestCase, use_temp_media
+
+
+class ContentAddressedStorageTests(TenantTestCase):
+    def setUp(self):
+        use_temp_media(self)
+        super().setUp()
+        request_type = RequestType.objects.create(name="Type", code="type")
+        self.requests = [
+            Request.objects.create(
+                request_type=request_type, worker=self.worker, created_by=self.user,
+                status="draft", current_company=self.client_company,
+            )
+            for _ in range(2)
+        ]
+
+    def attach(self, req, name, content):
+        return RequestAttachment.objects.create(
+            request=req, uploaded_by=self.user, file=SimpleUploadedFile(name, content),
+        )
+
+    def test_identical_uploads_share_one_blob(self):
+        content = b"scan of iqama" * 100
+        first = self.attach(self.requests[0], "iqama.PDF", content)
+        second = self.attach(self.requests[1], "copy.pdf", content)
+
+        expected = blob_path(hashlib.sha256(content).hexdigest(), ".pdf")
+        self.assertEqual(first.file.name, expected)
+        self.assertEqual(second.file.name, expected)
+        self.assertEqual(first.filename(), "iqama.PDF")
+        self.assertEqual(AttachmentBlob.objects.get(path=expected).ref_count, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertTrue(attachment_storage.exists(expected))
+        self.assertEqual(AttachmentBlob.objects.get(path=expected).ref_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.requests[1].delete()
+        self.assertFalse(attachment_storage.exists(expected))
+        self.assertFalse(AttachmentBlob.objects.exists())
+        self.assertEqual(os.listdir(attachment_storage.path("blobs/tmp")), [])
+
+    def test_reupload_during_release_keeps_the_file(self):
+        content = b"passport" * 100
+        expected = blob_path(hashlib.sha256(content).hexdigest(), ".pdf")
+        first = self.attach(self.requests[0], "a.pdf", content)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            first.delete()
+        # مرفق جديد بنفس المحتوى قبل تنفيذ حذف الملف
+        self.attach(self.requests[1], "b.pdf", content)
+        for callback in callbacks:
+            callback()
+        self.assertTrue(attachment_storage.exists(expected))
+        self.assertEqual(AttachmentBlob.objects.get(path=expected).ref_count, 1)
+
+        # الملف حُذف بعد أن وجده _save وقبل أخذ المرجع: acquire يعيد كتابته
+        attachment_storage.delete(expected)
+        AttachmentBlob.objects.all().delete()
+        acquire(expected, content=ContentFile(content))
+        self.assertEqual(attachment_storage.open(expected).read(), content)
+        self.assertEqual(AttachmentBlob.objects.get(path=expected).ref_count, 1)
+
+    def test_migrate_legacy_files(self):
+        content = b"legacy"
+        legacy = []
+        for req in self.requests:
+            name = f"request_docs/request_{req.pk}/doc.png"
+            path = attachment_storage.path(name)
+            os.makedirs(os.path.dirname(path))
+            with open(path, "wb") as f:
+                f.write(content)
+            legacy.append(RequestAttachment.objects.create(request=req, uploaded_by=self.user, file=name))
+
+        self.assertEqual(migrate_legacy_files(dry_run=True)["converted"], 2)
+        stats = migrate_legacy_files()
+        self.assertEqual(stats["converted"], 2)
+        self.assertEqual(stats["bytes_added"], len(content))
+
+        expected = blob_path(hashlib.sha256(content).hexdigest(), ".png")
+        for att in legacy:
+            att.refresh_from_db()
+            self.assertEqual(att.file.name, expected)
+            self.assertEqual(att.filename(), "doc.png")
+        self.assertEqual(AttachmentBlob.objects.get(path=expected).ref_count, 2)
+        self.assertEqual(os.listdir(attachment_storage.path("request_docs")), [])
+        self.assertEqual(attachment_storage.open(expected).read(), content)
+
+    def test_storage_save_returns_content_path(self):
+        name = attachment_storage.save("anything/name.txt", ContentFile(b"abc"))
+        self.assertEqual(name, blob_path(hashlib.sha256(b"abc").hexdigest(), ".txt"))
@@ -0,0 +1,62 @@
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from requests import counters
+from requests.models import Request, RequestType
+from requests.tests.base import TenantTestCase, make_vendor, make_worker
+from vendors.models import Worker
+
+
+class TenantColumnsTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        self.vendor_b = make_vendor("VendorB", contact_phone="2")
+        self.req = Request.objects.create(
+            request_type=RequestType.objects.create(name="Type", code="type"),
+            worker=self.worker, created_by=self.user,
+        )
+        counters.record_created(self.req)
+
+    def test_columns_are_set_on_create_and_worker_change(self):
+        self.assertEqual(self.req.client_company_id, self.client_company.id)
+        self.assertEqual(self.req.vendor_company_id, self.vendor.company_id)
+
+        req = Request.objects.get(pk=self.req.pk)
+        req.worker = make_worker(self.vendor_b, iqama_number="6001")
+        req.save()
+        req.refresh_from_db()
+        self.assertEqual(req.vendor_company_id, self.vendor_b.company_id)
+
+    def test_moving_worker_to_another_vendor_moves_requests_and_counters(self):
+        self.worker.vendor = self.vendor_b
+        self.worker.save()
+
+        self.req.refresh_from_db()
+        self.assertEqual(self.req.vendor_company_id, self.vendor_b.company_id)
+        self.assertEqual(counters.company_stats(self.vendor.company)["total"], 0)
+        self.assertEqual(counters.company_stats(self.client_company)["by_status"]["draft"], 1)
+
+    def test_unrelated_worker_edit_leaves_requests_alone(self):
+        worker = Worker.objects.get(pk=self.worker.pk)
+        worker.job_title = "Driver"
+        with CaptureQueriesContext(connection) as ctx:
+            worker.save()
+        # تحديث العامل فقط، دون نقل الطلبات أو إعادة بناء نص البحث
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+        worker.vendor = self.vendor_b
+        worker.save()
+        self.req.refresh_from_db()
+        self.assertEqual(self.req.vendor_company_id, self.vendor_b.company_id)
+
+    def test_list_filters_without_joining_workers(self):
+        client = Client()
+        client.force_login(self.user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(reverse("requests:list"))
+        self.assertEqual([r.id for r in response.context["page_obj"]], [self.req.id])
+        list_sql = next(q["sql"] for q in ctx.captured_queries if 'FROM "requests_request"' in q["sql"])
+        self.assertIn('"requests_request"."client_company_id" = ', list_sql)
+        self.assertNotIn('"vendors_vendor"', list_sql)
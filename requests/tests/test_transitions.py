@@ -0,0 +1,117 @@
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import User
+from notifications.models import Notification
+from requests.models import Request, RequestType, RequestTimeline
+from requests.outbox import drain
+from requests.tests.base import TenantTestCase
+from requests.transitions import BATCH_LIMIT, apply_transition, apply_batch_transition, TransitionError
+
+
+class TransitionEngineTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        request_type = RequestType.objects.create(name="Type", code="type")
+        self.req = Request.objects.create(
+            request_type=request_type, worker=self.worker, created_by=self.user,
+            status="submitted", current_company=self.client_company,
+        )
+
+    def test_transition_updates_only_changed_columns(self):
+        with CaptureQueriesContext(connection) as ctx:
+            apply_transition(self.req, "start_processing", self.vendor_user)
+
+        update_sql = next(q["sql"] for q in ctx.captured_queries if q["sql"].startswith("UPDATE"))
+        self.assertIn('"status" = ', update_sql)
+        self.assertIn('"current_company_id" = ', update_sql)
+        self.assertNotIn('"title"', update_sql)
+        self.assertEqual(self.req.status, "in_progress")
+        drain()
+        self.assertEqual(Notification.objects.filter(recipient=self.user).count(), 1)
+
+    def test_stale_transition_loses_the_race(self):
+        stale = Request.objects.get(pk=self.req.pk)
+        apply_transition(self.req, "start_processing", self.vendor_user)
+
+        with self.assertRaises(TransitionError):
+            apply_transition(stale, "start_processing", self.vendor_user)
+
+        drain()
+        self.assertEqual(RequestTimeline.objects.filter(request=self.req).count(), 1)
+        self.assertEqual(Notification.objects.count(), 1)
+
+    def test_actor_must_match_company_type(self):
+        with self.assertRaises(TransitionError):
+            apply_transition(self.req, "start_processing", self.user)
+        self.req.refresh_from_db()
+        self.assertEqual(self.req.status, "submitted")
+
+
+class BatchTransitionTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        request_type = RequestType.objects.create(name="Type", code="type")
+        self.creators = [
+            self.user, User.objects.create_user(username="client2", password="p", company=self.client_company),
+        ]
+        self.requests = [
+            Request.objects.create(
+                request_type=request_type, worker=self.worker, created_by=self.creators[i % 2],
+                status="submitted", current_company=self.client_company,
+            )
+            for i in range(6)
+        ]
+
+    def test_batch_updates_matching_and_reports_skipped(self):
+        stale = self.requests[0]
+        apply_transition(stale, "start_processing", self.vendor_user)
+        ids = [r.pk for r in self.requests]
+
+        done, skipped = apply_batch_transition(ids, "start_processing", self.vendor_user)
+
+        self.assertEqual(skipped, [stale.pk])
+        self.assertEqual(sorted(done), ids[1:])
+        self.assertEqual(Request.objects.filter(status="in_progress").count(), 6)
+        self.assertEqual(RequestTimeline.objects.count(), 6)
+        drain()
+        # إشعار مجمّع واحد لكل منشئ طلب (+ إشعار الانتقال الفردي)
+        self.assertEqual(Notification.objects.filter(recipient=self.creators[0]).count(), 2)
+        self.assertEqual(Notification.objects.filter(recipient=self.creators[1]).count(), 1)
+
+    def test_batch_query_count_does_not_grow_with_selection(self):
+        def run(requests):
+            Request.objects.filter(pk__in=[r.pk for r in requests]).update(status="submitted")
+            with CaptureQueriesContext(connection) as ctx:
+                apply_batch_transition([r.pk for r in requests], "start_processing", self.vendor_user)
+            return len(ctx.captured_queries)
+
+        run(self.requests[:2])  # إنشاء صفوف العدادات
+        self.assertEqual(run(self.requests[:2]), run(self.requests))
+
+    def test_batch_endpoint_requires_reason_for_reject(self):
+        client = Client()
+        client.force_login(self.vendor_user)
+        ids = [r.pk for r in self.requests]
+        Request.objects.filter(pk__in=ids).update(status="in_progress")
+
+        client.post(reverse("requests:batch_action"), {"action": "reject", "ids": ids})
+        self.assertFalse(Request.objects.filter(status="rejected").exists())
+
+        response = client.post(reverse("requests:batch_action"), {"action": "reject", "ids": ids, "note": "ناقص"})
+        self.assertRedirects(response, reverse("requests:list"), fetch_redirect_response=False)
+        self.assertEqual(Request.objects.filter(status="rejected", rejection_reason="ناقص").count(), 6)
+
+    def test_oversized_selection_is_rejected_whole(self):
+        client = Client()
+        client.force_login(self.vendor_user)
+        ids = [r.pk for r in self.requests] + list(range(10**6, 10**6 + BATCH_LIMIT))
+
+        with self.assertRaises(TransitionError):
+            apply_batch_transition(ids, "start_processing", self.vendor_user)
+        response = client.post(reverse("requests:batch_action"), {"action": "start_processing", "ids": ids}, follow=True)
+
+        self.assertEqual(Request.objects.filter(status="submitted").count(), 6)
+        self.assertIn(str(BATCH_LIMIT), str(list(response.context["messages"])[0]))
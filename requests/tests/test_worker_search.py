@@ -0,0 +1,48 @@
+from django.urls import reverse
+
+from requests.models import RequestType
+from requests.tests.base import TenantTestCase, make_vendor, make_worker
+from vendors.models import Worker
+
+
+class WorkerSearchTests(TenantTestCase):
+    def setUp(self):
+        super().setUp()
+        self.workers = [make_worker(self.vendor, f"Ahmed {i:02d}", f"21000{i:02d}") for i in range(25)]
+        self.khalid = make_worker(self.vendor, "Khalid", "2200000")
+        make_worker(make_vendor("OtherVendor"), "Ahmed Other", "2100099")
+        self.client.force_login(self.user)
+        self.url = reverse("requests:worker_search")
+
+    def test_prefix_search_is_scoped_and_paginated(self):
+        first = self.client.get(self.url, {"q": "ahm"}).json()
+        self.assertEqual(len(first["results"]), 20)
+        self.assertEqual(first["results"][0]["full_name"], "Ahmed 00")
+        self.assertIsNotNone(first["next"])
+
+        second = self.client.get(self.url, {"q": "ahm", "cursor": first["next"]}).json()
+        names = [w["full_name"] for w in first["results"] + second["results"]]
+        self.assertEqual(names, [w.full_name for w in self.workers])
+        self.assertIsNone(second["next"])
+
+        by_iqama = self.client.get(self.url, {"q": "2200"}).json()["results"]
+        self.assertEqual([w["id"] for w in by_iqama], [self.khalid.id])
+        # بداية الاسم فقط، وليس أي جزء منه
+        self.assertEqual(self.client.get(self.url, {"q": "hmed"}).json()["results"], [])
+
+    def test_wizard_page_does_not_render_all_workers(self):
+        response = self.client.get(reverse("requests:create_wizard"))
+        self.assertNotContains(response, "Ahmed 00")
+        self.assertContains(response, self.url)
+
+    def test_wizard_rejects_uncontracted_worker(self):
+        outsider = Worker.objects.get(full_name="Ahmed Other")
+        response = self.client.get(self.url, {"q": "Ahmed Other"})
+        self.assertEqual(response.json()["results"], [])
+
+        request_type = RequestType.objects.create(name="Type", code="type")
+        response = self.client.post(reverse("requests:create_wizard"), {
+            "worker": outsider.id, "request_type": request_type.id, "title": "T",
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("worker", response.context["form"].errors)
@@ -0,0 +1,280 @@
+"""
+محرك انتقالات حالة الطلب
+
+كل انتقال معرّف بشكل تصريحي في جدول TRANSITIONS: الحالة المصدر، الحالة الهدف،
+الأعمدة التي تتغير، وسجل التايم لاين والإشعارات المرتبطة به.
+
+يتم التنفيذ عبر UPDATE مشروط (compare-and-swap):
+    UPDATE ... SET <الأعمدة المتغيرة فقط> WHERE id=<pk> AND status=<المصدر>
+فإذا ضغط مستخدمان على نفس الإجراء في نفس اللحظة ينجح واحد فقط، ويُكتب التايم لاين
+ورسائل الإشعارات (في صندوق الصادر) داخل نفس المعاملة.
+
+كل انتقال يسجل status_changed_at، وتسجل حركة التايم لاين المدة التي قضاها الطلب
+في الحالة السابقة (duration_seconds) لتجميعات SLA في rollups.py.
+"""
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from django.utils import timezone
+
+from .counters import apply_deltas, record_transition
+from .models import Request, RequestTimeline
+from .outbox import enqueue
+
+# قيم رمزية تُستبدل وقت التنفيذ
+ACTOR = "actor"
+ACTOR_COMPANY = "actor_company"
+NOW = "now"
+NOTE = "note"
+
+
+class TransitionError(Exception):
+    """الانتقال غير مسموح، أو أن حالة الطلب تغيّرت من مستخدم آخر."""
+
+
+@dataclass(frozen=True)
+class Transition:
+    action: str
+    actor: str  # نوع الشركة المسموح لها: client / vendor
+    source: str
+    target: str
+    timeline_action: str
+    timeline_description: str = NOTE
+    sets: dict = field(default_factory=dict)
+    notify: str = ""  # creator / vendor_staff
+    notification_title: str = ""
+    notification_message: str = ""
+
+
+TRANSITIONS = {t.action: t for t in (
+    # ----- العميل -----
+    Transition(
+        action="confirm_submission", actor="client",
+        source="draft", target="submitted",
+        timeline_action="إرسال الطلب", timeline_description="تم الاعتماد والإرسال",
+        sets={"submitted_at": NOW},
+        notify="vendor_staff", notification_title="طلب جديد",
+        notification_message="طلب جديد #{req_id} للعامل {worker}",
+    ),
+    Transition(
+        action="resubmit", actor="client",
+        source="returned", target="submitted",
+        timeline_action="إعادة إرسال", timeline_description="تم التصحيح",
+        sets={"rejection_reason": "", "return_reason": ""},
+    ),
+    # ----- المورد -----
+    Transition(
+        action="start_processing", actor="vendor",
+        source="submitted", target="in_progress",
+        timeline_action="بدء المعالجة", timeline_description="بدأ المورد في العمل",
+        sets={"current_company": ACTOR_COMPANY, "processing_started_at": NOW},
+        notify="creator", notification_title="الطلب قيد المعالجة",
+        notification_message="بدأ {company} العمل على الطلب.",
+    ),
+    Transition(
+        action="return_defect", actor="vendor",
+        source="in_progress", target="returned",
+        timeline_action="إعادة (نواقص)",
+        sets={"return_reason": NOTE, "returned_at": NOW},
+        notify="creator", notification_title="نقص في الطلب",
+        notification_message="سبب الإعادة: {note}",
+    ),
+    Transition(
+        action="reject", actor="vendor",
+        source="in_progress", target="rejected",
+        timeline_action="رفض الطلب",
+        sets={"rejection_reason": NOTE, "closed_by": ACTOR, "closed_at": NOW},
+        notify="creator", notification_title="الطلب مرفوض",
+        notification_message="السبب: {note}",
+    ),
+    Transition(
+        action="complete", actor="vendor",
+        source="in_progress", target="completed",
+        timeline_action="إكمال الطلب",
+        sets={"closure_note": NOTE, "closed_by": ACTOR, "closed_at": NOW},
+    ),
+)}
+
+
+def _resolve(value, user, note, now):
+    if value == ACTOR:
+        return user
+    if value == ACTOR_COMPANY:
+        return user.company
+    if value == NOW:
+        return now
+    if value == NOTE:
+        return note
+    return value
+
+
+def _duration(started_at, now):
+    """الثواني منذ دخول الحالة السابقة (None إذا كان وقت الدخول غير معروف)."""
+    if started_at is None:
+        return None
+    return max(0, int((now - started_at).total_seconds()))
+
+
+def _recipients(req, transition):
+    if transition.notify == "creator":
+        return {"user_ids": [req.created_by_id]}
+    if transition.notify == "vendor_staff":
+        return {"company_id": req.vendor_company_id}
+    return {}
+
+
+def get_transition(action, user):
+    transition = TRANSITIONS.get(action)
+    if transition is None or user.company is None or user.company.company_type != transition.actor:
+        return None
+    return transition
+
+
+def apply_transition(req, action, user, note="", changes=None):
+    """
+    تنفيذ الانتقال `action` على الطلب `req` بشكل ذري.
+    changes: أعمدة إضافية تُحدَّث في نفس الـ UPDATE (مثل العنوان عند إعادة الإرسال).
+    ترفع TransitionError إذا لم يكن الانتقال مسموحاً أو إذا تغيّرت الحالة قبل التنفيذ.
+    """
+    transition = get_transition(action, user)
+    if transition is None:
+        raise TransitionError("هذا الإجراء غير مسموح.")
+
+    now = timezone.now()
+    values = {"status": transition.target, "status_changed_at": now, "updated_at": now}
+    for column, value in transition.sets.items():
+        values[column] = _resolve(value, user, note, now)
+    values.update(changes or {})
+    entered_at = req.status_changed_at or req.created_at
+
+    with transaction.atomic():
+        updated = Request.objects.filter(pk=req.pk, status=transition.source).update(**values)
+        if not updated:
+            raise TransitionError("تم تحديث حالة الطلب من مستخدم آخر، يرجى تحديث الصفحة.")
+
+        record_transition(req, transition.source, transition.target)
+
+        RequestTimeline.objects.create(
+            request=req,
+            user=user,
+            action_name=transition.timeline_action,
+            description=_resolve(transition.timeline_description, user, note, now),
+            old_status=transition.source,
+            new_status=transition.target,
+            duration_seconds=_duration(entered_at, now),
+        )
+
+        if transition.notify:
+            message = transition.notification_message.format(
+                req_id=req.pk, worker=req.worker.full_name, company=user.company.name, note=note,
+            )
+            # الإشعارات تُنفذ في العملية الخلفية عبر صندوق الصادر
+            enqueue(
+                "notifications.fan_out",
+                request_id=req.pk, title=transition.notification_title, message=message,
+                **_recipients(req, transition),
+            )
+
+    for column, value in values.items():
+        setattr(req, column, value)
+    return transition
+
+
+# =========================
+# Batch Transitions
+# =========================
+# الحد الأقصى للطلبات في إجراء جماعي واحد
+BATCH_LIMIT = 500
+
+
+def _batch_notifications(transition, rows, user, note):
+    """
+    إشعار واحد لكل مستلم بدلاً من إشعار لكل طلب.
+    rows: [(id, created_by_id, vendor_company_id, worker_name)]
+    """
+    groups = defaultdict(list)
+    for row in rows:
+        if transition.notify == "creator":
+            groups[("user_ids", row[1])].append(row)
+        elif transition.notify == "vendor_staff":
+            groups[("company_id", row[2])].append(row)
+
+    for (recipient, recipient_id), group in groups.items():
+        if len(group) == 1:
+            request_id, _, _, worker_name = group[0]
+            message = transition.notification_message.format(
+                req_id=request_id, worker=worker_name, company=user.company.name, note=note,
+            )
+        else:
+            request_id = None
+            ids = "، ".join(f"#{row[0]}" for row in group)
+            message = f"{transition.timeline_action} ({len(group)} طلبات): {ids}"
+            if note:
+                message += f" — {note}"
+        enqueue(
+            "notifications.fan_out",
+            request_id=request_id, title=transition.notification_title, message=message,
+            **{recipient: [recipient_id] if recipient == "user_ids" else recipient_id},
+        )
+
+
+def apply_batch_transition(request_ids, action, user, note=""):
+    """
+    تنفيذ نفس الانتقال على مجموعة طلبات بعمليات جماعية:
+    UPDATE واحد مشروط بالحالة المصدر، bulk_create للتايم لاين، إشعار مجمّع لكل مستلم.
+    ترجع (ids المنفذة، ids المتخطاة لأن حالتها تغيّرت أو غير متاحة للمستخدم).
+    ترفع TransitionError إذا تجاوز التحديد BATCH_LIMIT.
+    """
+    transition = get_transition(action, user)
+    if transition is None:
+        raise TransitionError("هذا الإجراء غير مسموح.")
+    request_ids = list(dict.fromkeys(int(pk) for pk in request_ids))
+    if len(request_ids) > BATCH_LIMIT:
+        # رفض التحديد كاملاً بدل تنفيذ جزء منه وإسقاط الباقي بصمت
+        raise TransitionError(f"لا يمكن تنفيذ الإجراء على أكثر من {BATCH_LIMIT} طلب في المرة الواحدة.")
+
+    now = timezone.now()
+    values = {"status": transition.target, "status_changed_at": now, "updated_at": now}
+    for column, value in transition.sets.items():
+        values[column] = _resolve(value, user, note, now)
+
+    tenant = "vendor_company" if transition.actor == "vendor" else "client_company"
+    with transaction.atomic():
+        # قفل الطلبات المرشحة حتى لا يغيّرها إجراء آخر بين القراءة والتحديث
+        rows = list(
+            Request.objects.select_for_update()
+            .filter(pk__in=request_ids, status=transition.source, **{tenant: user.company})
+            .order_by("pk")
+            .values_list(
+                "id", "created_by_id", "vendor_company_id", "worker__full_name", "client_company_id",
+                "status_changed_at", "created_at",
+            )
+        )
+        done_ids = [row[0] for row in rows]
+        if done_ids:
+            Request.objects.filter(pk__in=done_ids, status=transition.source).update(**values)
+
+            deltas = Counter()
+            for _, _, vendor_id, _, client_id, *_ in rows:
+                deltas[(client_id, vendor_id, transition.source)] -= 1
+                deltas[(client_id, vendor_id, transition.target)] += 1
+            apply_deltas(deltas)
+
+            description = _resolve(transition.timeline_description, user, note, now)
+            RequestTimeline.objects.bulk_create([
+                RequestTimeline(
+                    request_id=row[0], user=user,
+                    action_name=transition.timeline_action, description=description,
+                    old_status=transition.source, new_status=transition.target,
+                    # row[5]: status_changed_at، row[6]: created_at
+                    duration_seconds=_duration(row[5] or row[6], now),
+                )
+                for row in rows
+            ])
+
+            if transition.notify:
+                _batch_notifications(transition, [row[:4] for row in rows], user, note)
+
+    done = set(done_ids)
+    return done_ids, [pk for pk in request_ids if pk not in done]
@@ -6,11 +6,22 @@ app_name = 'requests'
 urlpatterns = [
 
     path('', views.request_list, name='list'),
+    path('batch/', views.batch_action, name='batch_action'),
+    path('export/', views.export_requests, name='export'),
+    path('attachments/zip/', views.attachments_bundle, name='attachments_bundle'),
     
     path('new/', views.create_request_wizard, name='create_wizard'),    
+    path('bulk/', views.bulk_create_requests, name='bulk_create'),
+    path('api/workers/', views.search_workers, name='worker_search'),
+    path('api/get-fields/', views.get_request_fields_batch, name='get_fields_batch'),
     path('api/get-fields/<int:type_id>/', views.get_request_fields, name='get_fields'),
+    path('api/fields/<int:field_id>/options/', views.search_field_options, name='field_options'),
     
     
     # 4. رابط تفاصيل طلب معين (سنحتاجه لاحقاً)
     path('<int:pk>/', views.request_detail, name='detail'),
+    path('<int:pk>/activity/', views.request_activity, name='activity'),
+    path('<int:pk>/attachments/zip/', views.request_attachments_zip, name='attachments_zip'),
+    path('<int:pk>/attachments/<int:attachment_id>/', views.download_attachment, name='attachment'),
+    path('<int:pk>/attachments/<int:attachment_id>/<str:rendition>/', views.attachment_preview, name='attachment_preview'),
 ]
\ No newline at end of file
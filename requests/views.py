@@ -1,39 +1,53 @@
+import hashlib
+import os
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse, HttpResponseForbidden
-from django.contrib import messages
+from django.views.decorators.http import require_http_methods, require_POST
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag, url_has_allowed_host_and_scheme
+from django.http import Http404, JsonResponse, HttpResponseForbidden, StreamingHttpResponse
 from django.utils import timezone
-from django.db.models import Q
-from django.core.paginator import Paginator
-
-from .models import Request, RequestType, RequestField, RequestFieldValue, RequestTimeline, RequestAttachment
+from django.contrib import messages
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
+
+from .models import Request, RequestType, RequestAttachment
+from . import activity, bundles, field_query, images
+from .schema import get_schema, get_schemas
+from .field_options import search_options
+from .field_values import clean_field_values, prefetch_field_values, read_field_items, save_field_values
+from .transitions import apply_transition, apply_batch_transition, TransitionError
+from .counters import company_stats, record_created
+from .pagination import KeysetPaginator, InvalidCursor, approximate_count
+from .search import search_requests, refresh_document
+from .bulk import BulkImportError, create_for_workers, import_rows, iter_upload_rows
+from .export import export_header, iter_export_rows
+from .streaming import stream_csv, stream_xlsx
+from .serving import serve_file
 from .forms import (
     RequestCreateForm, CommentForm, AttachmentForm, 
-    RejectRequestForm, ReturnRequestForm, CompleteRequestForm
+    RejectRequestForm, ReturnRequestForm, CompleteRequestForm, BulkRequestForm, worker_queryset
 )
-from notifications.models import Notification
 from vendors.models import Worker  
 
-# دالة مساعدة لإنشاء الإشعارات
-def create_notification(user, request_obj, title, message):
-    if user:
-        Notification.objects.create(
-            recipient=user,
-            request=request_obj,
-            title=title,
-            message=message
-        )
-
-# دالة مساعدة لتسجيل التايم لاين
-def log_timeline(request_obj, user, action, desc="", old_status="", new_status=""):
-    RequestTimeline.objects.create(
-        request=request_obj,
-        user=user,
-        action_name=action,
-        description=desc,
-        old_status=old_status,
-        new_status=new_status
-    )
+# دالة مساعدة لتنفيذ انتقال الحالة وعرض سبب الفشل إن وجد
+def run_transition(request, req, action, note="", changes=None):
+    try:
+        apply_transition(req, action, request.user, note=note, changes=changes)
+    except TransitionError as e:
+        messages.error(request, str(e))
+        return False
+    return True
+
+# دالة مساعدة لعرض أخطاء الحقول الديناميكية كرسائل
+def field_errors_to_messages(request, schema, error):
+    for name, errors in error.message_dict.items():
+        spec = schema.by_id.get(int(name.split('_', 1)[1]))
+        label = spec.label if spec else name
+        messages.error(request, f"{label}: {' '.join(errors)}")
 
 # ==========================================
 # 1. إنشاء الطلب (Create Request)
@@ -49,132 +63,360 @@ def create_request_wizard(request):
         form = RequestCreateForm(request.POST, user=request.user)
         if form.is_valid():
             new_request = form.save(commit=False)
-            new_request.created_by = request.user
-            new_request.status = 'draft'
-            new_request.current_company = request.user.company
-            new_request.save()
-
-            # معالجة الحقول الديناميكية (تبقى يدوية لأنها تعتمد على النوع المختار)
-            type_id = new_request.request_type.id
-            fields = RequestField.objects.filter(request_type_id=type_id)
-            
-            for field in fields:
-                val = request.POST.get(f'field_{field.id}')
-                if val:
-                    fv = RequestFieldValue(request=new_request, field=field)
-                    if field.field_type == 'text': fv.value_text = val
-                    elif field.field_type == 'number': fv.value_number = val
-                    elif field.field_type == 'date': fv.value_date = val
-                    elif field.field_type == 'bool': fv.value_bool = (val == 'True')
-                    elif field.field_type == 'choice': fv.value_text = val
-                    fv.save()
-
-            messages.info(request, "تم حفظ المسودة. يرجى إضافة المرفقات ثم الإرسال.")
-            return redirect('requests:detail', pk=new_request.pk)
+            # معالجة الحقول الديناميكية (من سجل المخططات بدون استعلامات إضافية)
+            schema = get_schema(new_request.request_type_id)
+            try:
+                cleaned_values = clean_field_values(schema, request.POST)
+            except ValidationError as e:
+                cleaned_values = None
+                field_errors_to_messages(request, schema, e)
+
+            if cleaned_values is not None:
+                with transaction.atomic():
+                    new_request.created_by = request.user
+                    new_request.status = 'draft'
+                    new_request.current_company = request.user.company
+                    new_request.save()
+                    save_field_values(new_request, schema, cleaned_values, created=True)
+                    record_created(new_request)
+                    refresh_document(new_request)
+
+                messages.info(request, "تم حفظ المسودة. يرجى إضافة المرفقات ثم الإرسال.")
+                return redirect('requests:detail', pk=new_request.pk)
         else:
             messages.error(request, "يرجى التأكد من صحة البيانات المدخلة.")
     else:
         form = RequestCreateForm(user=request.user)
-    workers = form.fields['worker'].queryset
+    # العمالة تُحمّل عند البحث (api/workers/)؛ فقط العامل المختار سابقاً يُعرض عند إعادة الفورم
+    selected_worker = None
+    worker_id = form['worker'].value()
+    if worker_id and str(worker_id).isdigit():
+        selected_worker = (
+            form.fields['worker'].queryset.select_related('vendor__company').filter(pk=worker_id).first()
+        )
     # نحتاج قائمة الأنواع للعرض في القائمة المنسدلة الأولية في الـ Wizard
     request_types = RequestType.objects.filter(is_active=True)
     
     context = {
         'form': form,
-        'workers': workers,
+        'selected_worker': selected_worker,
         'request_types': request_types,
     }
     return render(request, 'requests-templates/create_wizard.html', context)
 
 
 # ==========================================
-# 2. قائمة الطلبات (Request List)
+# 1.1 الإنشاء بالجملة (Bulk Create)
 # ==========================================
+# عدد أخطاء الصفوف المعروضة في الصفحة
+BULK_ERRORS_SHOWN = 200
+
 @login_required
-def request_list(request):
+def bulk_create_requests(request):
+
+    if request.user.company.company_type != 'client':
+        messages.error(request, "عذراً، إنشاء الطلبات متاح لشركات العملاء فقط.")
+        return redirect('dashboard')
+
+    result = None
+    if request.method == 'POST':
+        form = BulkRequestForm(request.POST, request.FILES, user=request.user)
+        if form.is_valid():
+            schema = get_schema(form.cleaned_data['request_type'].pk)
+            if form.cleaned_data['workers']:
+                # نفس الطلب ونفس قيم الحقول لكل العمال المختارين
+                try:
+                    cleaned_values = clean_field_values(schema, request.POST)
+                except ValidationError as e:
+                    field_errors_to_messages(request, schema, e)
+                else:
+                    result = create_for_workers(
+                        request.user, schema, form.cleaned_data['workers'],
+                        form.cleaned_data['title'], form.cleaned_data['notes'], cleaned_values,
+                    )
+            else:
+                try:
+                    result = import_rows(request.user, schema, iter_upload_rows(form.cleaned_data['file']))
+                except BulkImportError as e:
+                    form.add_error('file', str(e))
+
+            if result is not None and result.file_error:
+                messages.error(
+                    request,
+                    f"تم إنشاء {result.created} طلب، ثم توقف الاستيراد عند الصف {result.stopped_at_row}: "
+                    f"{result.file_error} الصفوف من {result.stopped_at_row} لم تُستورد.",
+                )
+            elif result is not None and result.created:
+                messages.success(request, f"تم إنشاء {result.created} طلب كمسودة.")
+        else:
+            messages.error(request, "يرجى التأكد من صحة البيانات المدخلة.")
+    else:
+        form = BulkRequestForm(user=request.user)
+
+    # العمال يُحمّلون عند البحث (api/workers/)؛ فقط المختارون سابقاً يُعرضون عند إعادة الفورم
+    worker_ids = [w for w in (form['workers'].value() or []) if str(w).isdigit()]
+    selected_workers = (
+        form.fields['workers'].queryset.filter(pk__in=worker_ids).order_by('full_name', 'id') if worker_ids else []
+    )
+    context = {
+        'form': form,
+        'result': result,
+        'row_errors': result.errors[:BULK_ERRORS_SHOWN] if result else [],
+        'selected_workers': selected_workers,
+    }
+    return render(request, 'requests-templates/bulk_create.html', context)
+
+
+# ==========================================
+# 2. قائمة الطلبات (Request List)
+# ==========================================
+# دالة مساعدة: طلبات المستخدم بعد الصلاحية والبحث وفلترة الحالة (مشتركة بين القائمة والتصدير)
+def filter_requests(request):
     user = request.user
-    
-    # 1. الاستعلام الأساسي
-    qs = Request.objects.select_related('worker', 'request_type', 'created_by').order_by('-created_at')
+    qs = Request.objects.all()
 
-    # 2. التصفية حسب الصلاحية
+    # التصفية حسب الصلاحية (أعمدة الجهات على جدول الطلبات مباشرة)
     if user.company.company_type == 'client':
-        qs = qs.filter(created_by__company=user.company)
+        qs = qs.filter(client_company=user.company)
     elif user.company.company_type == 'vendor':
-        qs = qs.filter(worker__vendor__company=user.company).exclude(status='draft')
+        qs = qs.filter(vendor_company=user.company).exclude(status='draft')
     else:
         qs = qs.none()
 
-    # إنشاء نسخة للإحصائيات قبل الفلترة بالبحث
-    qs_all = qs 
-
-    # 3. البحث
+    # البحث النصي (مرتب حسب الصلة)
     search_query = request.GET.get('q')
+    ordering = ('-created_at', '-id')
     if search_query:
-        qs = qs.filter(
-            Q(id__icontains=search_query) |
-            Q(title__icontains=search_query) |
-            Q(worker__full_name__icontains=search_query) |
-            Q(worker__iqama_number__icontains=search_query)
-        )
+        qs = search_requests(qs, search_query)
+        ordering = ('-search_rank', '-id')
 
-    # 4. فلترة الحالة
+    # فلترة الحالة
     status_filter = request.GET.get('status')
     if status_filter:
         qs = qs.filter(status=status_filter)
 
-    # 5. الترحيل (Pagination)
-    paginator = Paginator(qs, 5)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # نوع الطلب + شروط الحقول الديناميكية (f.<key>__<op>=...) والترتيب حسب حقل (sort=f.<key>)
+    type_id = request.GET.get('type')
+    if type_id and type_id.isdigit():
+        qs = qs.filter(request_type_id=type_id)
+        schema = get_schema(int(type_id))
+        lookups = field_query.parse_params(request.GET)
+        sort = field_query.parse_sort(request.GET.get('sort'))
+        try:
+            if schema is not None and lookups:
+                qs = field_query.filter_fields(qs, schema, lookups)
+            if schema is not None and sort:
+                qs, ordering = field_query.order_by_field(qs, schema, *sort)
+        except field_query.FieldQueryError as e:
+            messages.error(request, str(e))
+            qs = qs.none()
+
+    return qs, ordering, search_query, status_filter
+
+
+@login_required
+def request_list(request):
+    user = request.user
+
+    # 1-4. الاستعلام الأساسي + الصلاحية + البحث + الحالة
+    qs, ordering, search_query, status_filter = filter_requests(request)
+    qs = qs.select_related('worker', 'request_type', 'client_company', 'vendor_company')
+
+    # 5. الترحيل بالمؤشر (Keyset) على (-created_at, -id) أو (-search_rank, -id)
+    paginator = KeysetPaginator(qs, 5, ordering=ordering)
+    try:
+        page_obj = paginator.get_page(request.GET.get('cursor'))
+    except InvalidCursor:
+        page_obj = paginator.get_page()
+
+    # 6. الإحصائيات (من جدول العدادات باستعلام واحد)
+    stats = company_stats(user.company) if user.company.company_type in ('client', 'vendor') else None
+    by_status = stats['by_status'] if stats else {}
+    # العدد الإجمالي: دقيق من العدادات عند عدم وجود بحث، وتقريبي من خطة التنفيذ مع البحث
+    type_id = request.GET.get('type', '')
+    schema = get_schema(int(type_id)) if type_id.isdigit() else None
+    if stats and not search_query and schema is None:
+        page_obj.approx_total = by_status.get(status_filter, 0) if status_filter else stats['total']
+    elif search_query or schema is not None:
+        page_obj.approx_total = approximate_count(qs)
+
+    # معاملات الفلترة الحالية لروابط الصفحات (بدون المؤشر)
+    filter_params = request.GET.copy()
+    filter_params.pop('cursor', None)
 
-    # 6. حساب الإحصائيات
     context = {
         'requests': page_obj, # نستخدم requests ليتوافق مع القالب
         'page_obj': page_obj,
-        'total_count': qs_all.count(),
-        'submitted_count': qs_all.filter(status='submitted').count(),
-        'in_progress_count': qs_all.filter(status='in_progress').count(),
-        'completed_count': qs_all.filter(status='completed').count(),
-        'rejected_count': qs_all.filter(status='rejected').count(),
-        'companies_count': qs_all.values('worker__vendor__company').distinct().count(),
+        'total_count': stats['total'] if stats else 0,
+        'submitted_count': by_status.get('submitted', 0),
+        'in_progress_count': by_status.get('in_progress', 0),
+        'completed_count': by_status.get('completed', 0),
+        'rejected_count': by_status.get('rejected', 0),
+        'companies_count': stats['partners_count'] if stats else 0,
         'current_q': search_query or '',
         'current_status': status_filter or '',
+        'current_type': type_id if schema is not None else '',
+        'current_sort': request.GET.get('sort', ''),
+        'field_filters': _field_filter_inputs(schema, request.GET) if schema is not None else [],
+        'filter_query': filter_params.urlencode(),
+        'request_types': RequestType.objects.filter(is_active=True).only('id', 'name'),
     }
     
     return render(request, 'requests-templates/request_list.html', context)
 
 
+# مدخلات فلترة الحقول الديناميكية في قائمة الطلبات: (الحقل، [(اسم المعامل، التسمية، القيمة)])
+FIELD_FILTER_INPUTS = {
+    'number': (('gte', 'من'), ('lte', 'إلى')),
+    'date': (('gte', 'من'), ('lte', 'إلى')),
+    'text': (('', ''),),
+    'choice': (('', ''),),
+    'bool': (('', ''),),
+}
+
+
+def _field_filter_inputs(schema, params):
+    filters = []
+    for spec in schema.fields:
+        inputs = []
+        for op, label in FIELD_FILTER_INPUTS.get(spec.field_type, ()):
+            name = f"{field_query.PARAM_PREFIX}{spec.key}" + (f"__{op}" if op else "")
+            inputs.append({'name': name, 'label': label, 'value': params.get(name, '')})
+        if inputs:
+            filters.append({'spec': spec, 'inputs': inputs, 'sort_key': f"{field_query.SORT_PREFIX}{spec.key}"})
+    return filters
+
+
+# ==========================================
+# 2.2 تصدير الطلبات (Export)
+# ==========================================
+@login_required
+def export_requests(request):
+    qs, ordering, _, _ = filter_requests(request)
+
+    # الحقول الديناميكية تُصدّر كأعمدة عند اختيار نوع طلب
+    type_id = request.GET.get('type')
+    schema = get_schema(int(type_id)) if type_id and type_id.isdigit() else None
+    if type_id and schema is None:
+        qs = qs.none()
+
+    header = export_header(schema)
+    rows = iter_export_rows(qs.order_by(*ordering), schema)
+    filename = f"requests-{timezone.localdate():%Y%m%d}"
+
+    if request.GET.get('format') == 'xlsx':
+        response = StreamingHttpResponse(
+            stream_xlsx(header, rows, sheet_name="الطلبات"),
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        )
+        filename += '.xlsx'
+    else:
+        response = StreamingHttpResponse(stream_csv(header, rows), content_type='text/csv; charset=utf-8')
+        filename += '.csv'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+# ==========================================
+# 2.1 الإجراءات الجماعية (Batch Actions)
+# ==========================================
+# الإجراءات المتاحة من قائمة الطلبات، وهل تتطلب سبباً / ملاحظة
+BATCH_ACTIONS = {
+    'start_processing': False,
+    'complete': False,
+    'return_defect': True,
+    'reject': True,
+}
+
+@login_required
+@require_POST
+def batch_action(request):
+    back = request.POST.get('next')
+    if not back or not url_has_allowed_host_and_scheme(back, allowed_hosts={request.get_host()}):
+        back = reverse('requests:list')
+
+    action = request.POST.get('action')
+    note = request.POST.get('note', '').strip()
+    ids = [pk for pk in request.POST.getlist('ids') if pk.isdigit()]
+
+    if request.user.company.company_type != 'vendor' or action not in BATCH_ACTIONS:
+        messages.error(request, "هذا الإجراء غير مسموح.")
+        return redirect(back)
+    if not ids:
+        messages.error(request, "يرجى اختيار طلب واحد على الأقل.")
+        return redirect(back)
+    if BATCH_ACTIONS[action] and not note:
+        messages.error(request, "يرجى كتابة السبب.")
+        return redirect(back)
+
+    try:
+        done, skipped = apply_batch_transition(ids, action, request.user, note=note)
+    except TransitionError as e:
+        messages.error(request, str(e))
+        return redirect(back)
+
+    if done:
+        messages.success(request, f"تم تنفيذ الإجراء على {len(done)} طلب.")
+    if skipped:
+        messages.warning(
+            request,
+            "لم يتم تنفيذ الإجراء على الطلبات التالية لأن حالتها تغيّرت: "
+            + "، ".join(f"#{pk}" for pk in skipped)
+        )
+    return redirect(back)
+
+
+# ==========================================
+# 2.2 تحميل مرفقات الطلبات المحددة (ZIP متدفق)
+# ==========================================
+@login_required
+@require_http_methods(['GET', 'POST'])
+def attachments_bundle(request):
+    data = request.POST if request.method == 'POST' else request.GET
+    ids = list(dict.fromkeys(int(pk) for pk in data.getlist('ids') if pk.isdigit()))
+    if len(ids) > bundles.MAX_REQUESTS:
+        # رفض التحديد كاملاً بدل تحميل جزء منه وإسقاط الباقي بصمت
+        messages.error(request, f"لا يمكن تحميل مرفقات أكثر من {bundles.MAX_REQUESTS} طلب في المرة الواحدة.")
+        return redirect('requests:list')
+    # نفس صلاحيات قائمة الطلبات: الطلبات غير المتاحة للمستخدم تُتجاهل
+    qs, _, _, _ = filter_requests(request)
+    request_ids = list(qs.filter(pk__in=ids).order_by().values_list('pk', flat=True))
+    if not request_ids:
+        messages.error(request, "يرجى اختيار طلب واحد على الأقل.")
+        return redirect('requests:list')
+
+    response = StreamingHttpResponse(bundles.stream_bundle(request_ids), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="attachments-{timezone.localdate():%Y%m%d}.zip"'
+    return response
+
+
 # ==========================================
 # 3. تفاصيل الطلب (Request Detail & Actions)
 # ==========================================
+# دالة مساعدة: الطلب إذا كان متاحاً للمستخدم (404 إذا لم يوجد، None إذا لا يملك الصلاحية)
+def get_request_for_user(user, pk, base_qs=None):
+    base_qs = base_qs if base_qs is not None else Request.objects.all()
+    if user.company.company_type == 'client':
+        return get_object_or_404(base_qs, pk=pk, client_company=user.company)
+    if user.company.company_type == 'vendor':
+        req = get_object_or_404(base_qs, pk=pk, vendor_company=user.company)
+        # المورد لا يرى المسودات
+        return None if req.status == 'draft' else req
+    return None
+
 @login_required
 def request_detail(request, pk):
     # جلب الطلب مع التحقق من الصلاحية
     user = request.user
-    base_qs = Request.objects.select_related('worker', 'request_type', 'created_by')
-    
-    if user.company.company_type == 'client':
-        req = get_object_or_404(base_qs, pk=pk, created_by__company=user.company)
-    elif user.company.company_type == 'vendor':
-        req = get_object_or_404(base_qs, pk=pk, worker__vendor__company=user.company)
-        # المورد لا يرى المسودات
-        if req.status == 'draft':
-            return HttpResponseForbidden("لا تملك صلاحية الوصول لهذا الطلب.")
-    else:
-        return HttpResponseForbidden()
-
-    # تعريف الفورمز (فارغة افتراضياً)
-    comment_form = CommentForm()
-    attachment_form = AttachmentForm()
-    reject_form = RejectRequestForm()
-    return_form = ReturnRequestForm()
-    complete_form = CompleteRequestForm()
+    req = get_request_for_user(
+        user, pk, Request.objects.select_related('worker', 'request_type', 'created_by', 'vendor_company')
+    )
+    if req is None:
+        return HttpResponseForbidden("لا تملك صلاحية الوصول لهذا الطلب.")
 
     # معالجة الـ POST (الإجراءات)
     if request.method == 'POST':
         action = request.POST.get('action')
-        current_status = req.status
 
         # --- إضافة تعليق ---
         if action == 'add_comment':
@@ -200,24 +442,16 @@ def request_detail(request, pk):
 
         # --- إجراءات المورد ---
         if user.company.company_type == 'vendor':
-            if action == 'start_processing' and req.status == 'submitted':
-                req.status = 'in_progress'
-                req.current_company = user.company
-                req.save()
-                log_timeline(req, user, "بدء المعالجة", "بدأ المورد في العمل", current_status, 'in_progress')
-                messages.success(request, "تم تغيير الحالة إلى قيد المعالجة.")
-                create_notification(req.created_by, req, "الطلب قيد المعالجة", f"بدأ {user.company.name} العمل على الطلب.")
-            
+            if action == 'start_processing':
+                if run_transition(request, req, action):
+                    messages.success(request, "تم تغيير الحالة إلى قيد المعالجة.")
+
             elif action == 'return_defect':
                 return_form = ReturnRequestForm(request.POST)
                 if return_form.is_valid():
                     reason = return_form.cleaned_data['return_reason']
-                    req.status = 'returned'
-                    req.return_reason = reason
-                    req.save()
-                    log_timeline(req, user, "إعادة (نواقص)", reason, current_status, 'returned')
-                    messages.warning(request, "تم إعادة الطلب للعميل.")
-                    create_notification(req.created_by, req, "نقص في الطلب", f"سبب الإعادة: {reason}")
+                    if run_transition(request, req, action, note=reason):
+                        messages.warning(request, "تم إعادة الطلب للعميل.")
                 else:
                     messages.error(request, "يرجى كتابة سبب الإعادة.")
 
@@ -225,14 +459,8 @@ def request_detail(request, pk):
                 reject_form = RejectRequestForm(request.POST)
                 if reject_form.is_valid():
                     reason = reject_form.cleaned_data['rejection_reason']
-                    req.status = 'rejected'
-                    req.rejection_reason = reason
-                    req.closed_by = user
-                    req.closed_at = timezone.now()
-                    req.save()
-                    log_timeline(req, user, "رفض الطلب", reason, current_status, 'rejected')
-                    messages.error(request, "تم رفض الطلب.")
-                    create_notification(req.created_by, req, "الطلب مرفوض", f"السبب: {reason}")
+                    if run_transition(request, req, action, note=reason):
+                        messages.error(request, "تم رفض الطلب.")
                 else:
                     messages.error(request, "يرجى كتابة سبب الرفض.")
 
@@ -240,57 +468,45 @@ def request_detail(request, pk):
                 complete_form = CompleteRequestForm(request.POST)
                 if complete_form.is_valid():
                     note = complete_form.cleaned_data['closure_note']
-                    req.status = 'completed'
-                    req.closure_note = note
-                    req.closed_by = user
-                    req.closed_at = timezone.now()
-                    req.save()
-                    log_timeline(req, user, "إكمال الطلب", note, current_status, 'completed')
-                    messages.success(request, "تم إكمال الطلب بنجاح.")
+                    if run_transition(request, req, action, note=note):
+                        messages.success(request, "تم إكمال الطلب بنجاح.")
 
         # --- إجراءات العميل ---
         elif user.company.company_type == 'client':
-            if action == 'confirm_submission' and req.status == 'draft':
-                req.status = 'submitted'
-                req.created_at = timezone.now()
-                req.save()
-                log_timeline(req, user, "إرسال الطلب", "تم الاعتماد والإرسال", 'draft', 'submitted')
-                messages.success(request, "تم إرسال الطلب.")
-                
-                # إشعار موظفي المورد
-                staff_members = req.worker.vendor.get_all_staff
-                for staff in staff_members:
-                    if staff.is_active:
-                        create_notification(staff, req, "طلب جديد", f"طلب جديد #{req.id} للعامل {req.worker.full_name}")
+            if action == 'confirm_submission':
+                if run_transition(request, req, action):
+                    messages.success(request, "تم إرسال الطلب.")
 
             elif action == 'delete_draft' and req.status == 'draft':
                 req.delete()
                 messages.success(request, "تم حذف المسودة.")
                 return redirect('requests:list')
 
-            elif action == 'resubmit' and req.status == 'returned':
+            elif action == 'resubmit':
                 # تحديث البيانات (يمكن استخدام فورم هنا أيضاً، لكن للتبسيط سنكتفي بالتحديث المباشر للقيم الأساسية)
+                changes = {}
                 new_title = request.POST.get('title')
                 new_notes = request.POST.get('notes')
-                if new_title: req.title = new_title
-                if new_notes: req.notes = new_notes
-                
-                # تحديث الحقول الديناميكية
-                for fv in req.field_values.all():
-                    val = request.POST.get(f'field_{fv.field.id}')
-                    if val is not None:
-                        # منطق حفظ مبسط
-                        if fv.field.field_type in ['text', 'choice']: fv.value_text = val
-                        elif fv.field.field_type == 'number': fv.value_number = val
-                        # ... بقية الأنواع
-                        fv.save()
-
-                req.status = 'submitted'
-                req.rejection_reason = ""
-                req.return_reason = ""
-                req.save()
-                log_timeline(req, user, "إعادة إرسال", "تم التصحيح", 'returned', 'submitted')
-                messages.success(request, "تم إعادة الإرسال.")
+                if new_title: changes['title'] = new_title
+                if new_notes: changes['notes'] = new_notes
+
+                # تحديث الحقول الديناميكية (كل الأنواع، دفعة واحدة)
+                schema = get_schema(req.request_type_id)
+                try:
+                    cleaned_values = clean_field_values(schema, request.POST, partial=True)
+                except ValidationError as e:
+                    field_errors_to_messages(request, schema, e)
+                    return redirect('requests:detail', pk=pk)
+
+                # القيم والانتقال في معاملة واحدة: إذا فشل الانتقال لا تُحفظ القيم
+                with transaction.atomic():
+                    save_field_values(req, schema, cleaned_values)
+                    if run_transition(request, req, action, changes=changes):
+                        refresh_document(req)
+                    else:
+                        transaction.set_rollback(True)
+                if req.status == 'submitted':
+                    messages.success(request, "تم إعادة الإرسال.")
 
             elif action == 'delete_attachment':
                 att_id = request.POST.get('attachment_id')
@@ -304,23 +520,218 @@ def request_detail(request, pk):
         return redirect('requests:detail', pk=pk)
 
     # Context (GET Request)
+    # كل العلاقات المعروضة تُجلب مسبقاً: عدد الاستعلامات ثابت مهما زادت التعليقات والمرفقات والحركات
+    prefetch_related_objects(
+        [req],
+        Prefetch('attachments', queryset=RequestAttachment.objects.select_related('uploaded_by')),
+    )
+    prefetch_field_values([req])
+    # التعليقات وسجل النشاط: آخر N فقط، والأقدم يُحمّل عند الطلب من واجهة النشاط
+    comments = activity.feed(req, kinds=('comment',))
+    events = activity.feed(req)
+
+    # الفورمز المطلوبة لحالة الطلب ونوع المستخدم فقط
+    is_open = req.status not in ('completed', 'rejected')
+    vendor_in_progress = user.company.company_type == 'vendor' and req.status == 'in_progress'
     context = {
         'req': req,
-        'dynamic_values': req.field_values.all().select_related('field'),
-        'timeline': req.timeline_events.all().order_by('-created_at'),
+        'dynamic_values': read_field_items(req, get_schema(req.request_type_id)),
+        'comments': comments,
+        'activity': events,
         # Forms
-        'comment_form': comment_form,
-        'attachment_form': attachment_form,
-        'reject_form': reject_form,
-        'return_form': return_form,
-        'complete_form': complete_form,
+        'comment_form': CommentForm() if is_open else None,
+        'attachment_form': AttachmentForm() if is_open else None,
+        'reject_form': RejectRequestForm() if vendor_in_progress else None,
+        'return_form': ReturnRequestForm() if vendor_in_progress else None,
+        'complete_form': CompleteRequestForm() if vendor_in_progress else None,
     }
     return render(request, 'requests-templates/request_detail.html', context)
 
 
-# دالة API للحقول الديناميكية (تبقى كما هي)
+# ==========================================
+# API الحقول الديناميكية (تُقرأ من سجل المخططات المجمّعة)
+# ETag = رقم إصدار المخطط، فالمتصفح يعيد التحقق بـ If-None-Match ويحصل على 304
+# بدون إعادة إرسال الحقول إلا إذا تغير المخطط
+# ==========================================
+SCHEMA_CACHE_CONTROL = 'private, no-cache'
+MAX_SCHEMA_BATCH = 100
+
+
+def _schema_response(request, payload, etag):
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is None:
+        response = JsonResponse(payload, safe=False)
+        response['ETag'] = etag
+    else:
+        response = not_modified
+    response['Cache-Control'] = SCHEMA_CACHE_CONTROL
+    return response
+
+
 def get_request_fields(request, type_id):
-    fields = RequestField.objects.filter(request_type_id=type_id, is_active=True).values(
-        'id', 'label', 'field_type', 'is_required', 'help_text', 'choices'
-    ).order_by('sort_order')
-    return JsonResponse(list(fields), safe=False)
\ No newline at end of file
+    schema = get_schema(type_id)
+    if schema is None:
+        return JsonResponse([], safe=False)
+    return _schema_response(request, schema.as_list(), quote_etag(schema.version))
+
+
+def get_request_fields_batch(request):
+    """
+    مخططات عدة أنواع في استجابة واحدة: ?types=1,2,3
+    known=1:<version>,2:<version> (الإصدارات المخزنة في المتصفح): الأنواع التي لم تتغير
+    تُرجع version فقط بدون الحقول.
+    """
+    type_ids = [t for t in request.GET.get('types', '').split(',') if t.strip().isdigit()][:MAX_SCHEMA_BATCH]
+    known = dict(
+        item.split(':', 1) for item in request.GET.get('known', '').split(',') if ':' in item
+    )
+    schemas = get_schemas(type_ids)
+    payload = {}
+    for type_id, schema in sorted(schemas.items()):
+        entry = {'version': schema.version}
+        if known.get(str(type_id)) != schema.version:
+            entry['fields'] = schema.as_list()
+        payload[str(type_id)] = entry
+    versions = ','.join(f'{type_id}:{entry["version"]}' for type_id, entry in payload.items())
+    etag = quote_etag(hashlib.sha1(versions.encode()).hexdigest()[:16])
+    return _schema_response(request, {'schemas': payload}, etag)
+
+
+# ==========================================
+# API البحث عن العمالة (Typeahead) لمعالج إنشاء الطلب
+# مطابقة بداية الاسم أو رقم الإقامة (فهارس prefix)، وترحيل بالمؤشر حسب الاسم
+# ==========================================
+WORKER_PAGE_SIZE = 20
+WORKER_ORDERING = ('full_name', 'id')
+
+
+@login_required
+def search_workers(request):
+    workers = worker_queryset(request.user).select_related('vendor__company')
+    term = request.GET.get('q', '').strip()
+    if term:
+        if term.isdigit():
+            workers = workers.filter(iqama_number__startswith=term)
+        else:
+            workers = workers.filter(full_name__istartswith=term)
+
+    paginator = KeysetPaginator(workers, WORKER_PAGE_SIZE, ordering=WORKER_ORDERING)
+    try:
+        page = paginator.get_page(request.GET.get('cursor'))
+    except InvalidCursor:
+        return JsonResponse({'error': 'invalid cursor'}, status=400)
+    return JsonResponse({
+        'results': [
+            {
+                'id': w.id,
+                'full_name': w.full_name,
+                'iqama_number': w.iqama_number,
+                'job_title': w.job_title,
+                'vendor': w.vendor.company.name,
+            }
+            for w in page
+        ],
+        'next': page.next_cursor if page.has_next else None,
+    })
+
+
+# ==========================================
+# API البحث في خيارات القوائم الكبيرة (حقول choice التي لا تُرسل خياراتها مع المخطط)
+# مطابقة بداية النص أو القيمة، وترحيل بالمؤشر حسب ترتيب العرض
+# ==========================================
+OPTION_PAGE_SIZE = 20
+OPTION_ORDERING = ('sort_order', 'id')
+
+
+@login_required
+def search_field_options(request, field_id):
+    options = search_options(field_id, request.GET.get('q', ''))
+    paginator = KeysetPaginator(options, OPTION_PAGE_SIZE, ordering=OPTION_ORDERING)
+    try:
+        page = paginator.get_page(request.GET.get('cursor'))
+    except InvalidCursor:
+        return JsonResponse({'error': 'invalid cursor'}, status=400)
+    return JsonResponse({
+        'results': [{'value': o.value, 'label': o.label} for o in page],
+        'next': page.next_cursor if page.has_next else None,
+    })
+
+
+# ==========================================
+# تحميل المرفقات (بعد التحقق من صلاحية الوصول للطلب)
+# ==========================================
+@login_required
+def download_attachment(request, pk, attachment_id):
+    req = get_request_for_user(request.user, pk)
+    if req is None:
+        return HttpResponseForbidden("لا تملك صلاحية الوصول لهذا الطلب.")
+    att = get_object_or_404(RequestAttachment, pk=attachment_id, request=req)
+    try:
+        return serve_file(
+            request, att.file.storage, att.file.name, att.filename(),
+            as_attachment=request.GET.get('download') == '1',
+        )
+    except FileNotFoundError:
+        raise Http404("الملف غير موجود.")
+
+
+@login_required
+def attachment_preview(request, pk, attachment_id, rendition):
+    """نسخة مصغرة من مرفق صورة (thumb / web) بدلاً من الملف الأصلي."""
+    if rendition not in images.RENDITIONS:
+        raise Http404
+    req = get_request_for_user(request.user, pk)
+    if req is None:
+        return HttpResponseForbidden("لا تملك صلاحية الوصول لهذا الطلب.")
+    att = get_object_or_404(RequestAttachment, pk=attachment_id, request=req)
+    if not att.is_image():
+        raise Http404
+    storage = att.file.storage
+    try:
+        name = images.ensure_derivative(storage, att.file.name, rendition)
+    except FileNotFoundError:
+        raise Http404("الملف غير موجود.")
+    except images.ImageProcessingError:
+        # صورة غير قابلة للمعالجة: عرض الملف الأصلي
+        return redirect(att.get_absolute_url())
+    stem = os.path.splitext(att.filename())[0]
+    return serve_file(request, storage, name, f"{stem}-{rendition}{os.path.splitext(name)[1]}")
+
+
+@login_required
+def request_attachments_zip(request, pk):
+    """كل مرفقات الطلب في ملف ZIP واحد."""
+    req = get_request_for_user(request.user, pk)
+    if req is None:
+        return HttpResponseForbidden("لا تملك صلاحية الوصول لهذا الطلب.")
+    response = StreamingHttpResponse(
+        bundles.stream_bundle([req.pk], per_request_folder=False), content_type='application/zip',
+    )
+    response['Content-Disposition'] = f'attachment; filename="request-{req.pk}-attachments.zip"'
+    return response
+
+
+# دالة API لسجل النشاط: ?cursor= للأقدم، ?since= للأحدث، ?kinds=comment,timeline,attachment
+@login_required
+def request_activity(request, pk):
+    req = get_request_for_user(request.user, pk)
+    if req is None:
+        return HttpResponseForbidden()
+
+    limit = request.GET.get('limit', '')
+    try:
+        page = activity.feed(
+            req,
+            kinds=activity.parse_kinds(request.GET.get('kinds')),
+            cursor=request.GET.get('cursor') or None,
+            since=request.GET.get('since') or None,
+            limit=int(limit) if limit.isdigit() else activity.PAGE_SIZE,
+        )
+    except InvalidCursor:
+        return JsonResponse({'error': 'invalid cursor'}, status=400)
+
+    return JsonResponse({
+        'events': [event.as_dict(request.user) for event in page['events']],
+        'has_more': page['has_more'],
+        'next_cursor': page['next_cursor'],
+    })
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.10 on 2026-10-18 19:41
+
+import requests.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0004_alter_vendor_profile_picture'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vendor',
+            name='avatar',
+            field=models.ImageField(blank=True, max_length=255, storage=requests.storage.get_avatar_storage, upload_to='avatars/', verbose_name='الصورة (تخزين محلي)'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.10 on 2026-10-18 19:51
+
+from django.db import migrations, models
+
+
+def create_prefix_indexes(apps, schema_editor):
+    # في PostgreSQL لا يُستخدم فهرس btree العادي مع LIKE 'x%' إلا بـ pattern_ops
+    # (أو collation "C")؛ istartswith يستخدم UPPER(full_name)
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS worker_name_prefix_idx "
+            "ON vendors_worker (UPPER(full_name) text_pattern_ops)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS worker_iqama_prefix_idx "
+            "ON vendors_worker (iqama_number varchar_pattern_ops)"
+        )
+
+
+def drop_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS worker_name_prefix_idx")
+        schema_editor.execute("DROP INDEX IF EXISTS worker_iqama_prefix_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0005_vendor_avatar'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='worker',
+            index=models.Index(fields=['full_name', 'id'], name='worker_name_id_idx'),
+        ),
+        migrations.RunPython(create_prefix_indexes, drop_prefix_indexes),
+    ]
@@ -1,6 +1,9 @@
+from django.conf import settings
 from django.db import models
+from django.urls import reverse
 from accounts.models import Company
 from cloudinary.models import CloudinaryField
+from requests.storage import blob_digest, get_avatar_storage
 
 
 class Vendor(models.Model):
@@ -33,6 +36,22 @@ class Vendor(models.Model):
     )
     clients = models.ManyToManyField(Company,related_name='contracted_vendors',limit_choices_to={'company_type': 'client'},verbose_name='العملاء المتعاقد معهم',blank=True)
     profile_picture = CloudinaryField(blank=True, null=True, verbose_name='صورة الملف التعريفي')
+    # وضع التخزين المحلي (AVATAR_STORAGE = "local"): الصورة تُحفظ حسب المحتوى وتُعرض بنسخ مصغرة
+    avatar = models.ImageField(
+        upload_to='avatars/', storage=get_avatar_storage, max_length=255, blank=True,
+        verbose_name='الصورة (تخزين محلي)'
+    )
+
+    @property
+    def avatar_url(self):
+        """رابط الصورة المصغرة حسب وضع التخزين (فارغ إذا لم توجد صورة)."""
+        if getattr(settings, 'AVATAR_STORAGE', 'cloudinary') == 'local' and self.avatar:
+            url = reverse('vendors:avatar', args=[self.pk, 'thumb'])
+            # الرابط يتغير مع المحتوى، فيمكن تخزينه في المتصفح بدون إعادة تحقق
+            return f"{url}?v={blob_digest(self.avatar.name)[:12]}"
+        if self.profile_picture:
+            return self.profile_picture.url
+        return ''
 
     @property
     def get_all_staff(self):
@@ -125,5 +144,33 @@ class Worker(models.Model):
         verbose_name='تاريخ الإضافة'
     )
 
+    # حقول منسوخة إلى طلبات العامل (شركة التوريد ونص البحث)؛ تُقارن قيمها بعد الحفظ
+    # حتى لا يُعاد تحديث كل الطلبات عند تعديل حقل آخر
+    TRACKED_FIELDS = ("vendor_id", "full_name", "iqama_number")
+
+    class Meta:
+        indexes = [
+            # البحث في معالج إنشاء الطلب: ترتيب وترحيل حسب الاسم
+            models.Index(fields=["full_name", "id"], name="worker_name_id_idx"),
+        ]
+
     def __str__(self):
         return f"{self.full_name} - {self.iqama_number}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.reset_tracked_fields()
+        return instance
+
+    def reset_tracked_fields(self):
+        # الحقول المؤجلة (only / defer) لا تُحمّل هنا وتُعتبر متغيرة
+        self._loaded_values = {name: self.__dict__[name] for name in self.TRACKED_FIELDS if name in self.__dict__}
+
+    def changed_tracked_fields(self):
+        """الحقول المتتبعة التي تغيرت منذ التحميل (كلها إذا لم يُحمّل الكائن من قاعدة البيانات)."""
+        loaded = getattr(self, "_loaded_values", {})
+        return {
+            name for name in self.TRACKED_FIELDS
+            if name not in loaded or self.__dict__.get(name) != loaded[name]
+        }
@@ -1,3 +1,6 @@
+import os
+
+from django.http import Http404
 from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.db.models import Count, Q
@@ -8,6 +11,8 @@ from django.views.generic.edit import CreateView
 from django.views.generic import ListView, DetailView
 from django.core.exceptions import PermissionDenied
 from accounts.models import Company
+from requests import images
+from requests.serving import serve_file
 
 
 # تأكد من استيراد موديل الطلبات إذا كان موجوداً في تطبيق requests
@@ -41,6 +46,20 @@ def vendor_detail_view(request, pk):
     
     return render(request, 'vendors-templates/vendor_detail.html', context)
 
+@login_required
+def vendor_avatar(request, pk, rendition):
+    """نسخة مصغرة من صورة شركة التوريد (وضع التخزين المحلي)."""
+    vendor = get_object_or_404(Vendor, pk=pk)
+    if rendition not in images.RENDITIONS or not vendor.avatar:
+        raise Http404
+    storage = vendor.avatar.storage
+    try:
+        name = images.ensure_derivative(storage, vendor.avatar.name, rendition)
+    except (FileNotFoundError, images.ImageProcessingError):
+        raise Http404
+    return serve_file(request, storage, name, f"{vendor.pk}-{rendition}{os.path.splitext(name)[1]}")
+
+
 class VendorCreateView(LoginRequiredMixin, CreateView):
     model = Vendor
     fields = ['company', 'contact_name', 'contact_phone', 'is_active']